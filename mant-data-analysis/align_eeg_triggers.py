@@ -0,0 +1,186 @@
+""" Aligns the markers recorded by the EEG system (exported as a text or CSV marker list) to a session's behavioural trials,
+which carry no timestamps of their own.
+
+Every trial starts with a cue marker, so cue markers are the trial anchors:
+1. every marker is assigned to the latest cue marker before it (a sorted 'merge_asof' join)
+2. the sequence of cue types in the markers is matched to the one in the behavioural trials (difflib's longest matching
+   blocks), so that a lost or spurious cue marker only affects its own trial
+3. every matched trial is checked for missing or extra target, response and TMS markers
+
+The output is an epoching-ready event table: one row per marker, with its trial's behavioural data and a 'flag' column.
+Trigger codes are those sent by task-and-eeg and task-and-eeg-tms (see their docs/neurone-triggers.md).
+
+Usage:
+python align_eeg_triggers.py <beh_data_folder> <marker_file> <eeg|eeg-tms> <output_file> [--time-scale 0.001] [--sampling-rate 5000]
+                             [--training-trials 12] """
+
+import argparse
+import difflib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import analysis_utils as utils
+
+
+trigger_codes = {"eeg": {2: "cue_valid",
+                         3: "cue_double",
+                         4: "target_congruent",
+                         5: "target_incongruent",
+                         6: "response"},
+                 "eeg-tms": {4: "cue_valid",
+                             8: "cue_double",
+                             16: "target_congruent",
+                             32: "target_incongruent",
+                             64: "response",
+                             1: "tms_pulse"}}
+time_column_names = ["time", "latency", "onset", "time (s)", "time_s", "timestamp"]
+code_column_names = ["code", "value", "marker", "type", "trigger", "description"]
+
+def read_marker_list(marker_file: Path, time_scale: float = 1.0) -> pd.DataFrame:
+    """Reads a marker list exported from the EEG system (any delimiter, with a header row).
+
+    Parameters:
+    marker_file -- the path to the marker list (type: Path)
+    time_scale -- the factor that converts the file's time unit to seconds (e.g., 0.001 for milliseconds) (type: float)
+
+    Returns:
+    markers -- one row per marker, sorted by time, with columns 'time' (s) and 'code' (type: pd.DataFrame)
+    """
+
+    raw_markers = pd.read_csv(filepath_or_buffer=marker_file,
+                              sep=None,
+                              engine="python")
+    columns = {column.strip().lower(): column for column in raw_markers.columns}
+    time_column = next((columns[name] for name in time_column_names if name in columns), None)
+    code_column = next((columns[name] for name in code_column_names if name in columns), None)
+    if time_column is None or code_column is None:
+        raise ValueError(f"Could not find a time column (one of {time_column_names}) "
+                         f"and a code column (one of {code_column_names}) in {marker_file}")
+    codes = pd.to_numeric(raw_markers[code_column].astype(str).str.extract(r"(\d+)", expand=False), errors="coerce")
+    markers = pd.DataFrame({"time": pd.to_numeric(raw_markers[time_column], errors="coerce")*time_scale,
+                            "code": codes}).dropna()
+    return markers.astype({"code": int}).sort_values(by="time", kind="stable").reset_index(drop=True)
+
+def read_session_trials(beh_data_folder: Path) -> pd.DataFrame:
+    """Reads one session's behavioural files, in trial order."""
+
+    file_index = utils.index_mant_files(data_dir=beh_data_folder,
+                                        data_type="beh")
+    trials = utils.read_single_row_files(files=list(file_index["path"]))
+    trials.insert(loc=0,
+                  column="trial",
+                  value=file_index["trial"].to_numpy())
+    return trials
+
+def align_markers(markers: pd.DataFrame, trials: pd.DataFrame, variant: str, training_trials: int = 0) -> pd.DataFrame:
+    """Aligns EEG markers to behavioural trials and flags anything unexpected.
+
+    Parameters:
+    markers -- the output of 'read_marker_list()' (type: pd.DataFrame)
+    trials -- the output of 'read_session_trials()' (type: pd.DataFrame)
+    variant -- "eeg" or "eeg-tms" (selects the trigger codes) (type: str)
+    training_trials -- the number of leading cue markers that belong to training trials, whose behavioural files were
+                       overwritten by the experimental ones (type: int)
+
+    Returns:
+    events -- one row per marker, with columns 'time', 'code', 'event', 'trial' (NaN if unmatched), the trial's behavioural
+              data, and 'flag' ("ok", "extra", "duplicate", "wrong_code", "training", or "unknown_code") (type: pd.DataFrame)
+    """
+
+    codes = trigger_codes[variant]
+    markers = markers.assign(event=markers["code"].map(codes).fillna("unknown"))
+    is_cue = markers["event"].str.startswith("cue_")
+    cue_markers = markers.loc[is_cue, ["time"]].assign(marker_trial=np.arange(is_cue.sum()))
+    markers = pd.merge_asof(left=markers,
+                            right=cue_markers,
+                            on="time",
+                            direction="backward",
+                            allow_exact_matches=True)                                # markers before the first cue get NaN
+    markers["marker_trial"] = markers["marker_trial"].fillna(-1).astype(int)
+
+    target_events = markers.loc[markers["event"].str.startswith("target_")].drop_duplicates(subset="marker_trial")
+    marker_trials = pd.DataFrame({"marker_trial": cue_markers["marker_trial"].to_numpy(),
+                                  "cue": markers.loc[is_cue, "event"].str.removeprefix("cue_").to_numpy()})
+    marker_trials = marker_trials.merge(target_events[["marker_trial","event"]], on="marker_trial", how="left")
+    marker_trials["target"] = marker_trials.pop("event").str.removeprefix("target_").fillna("missing")
+    marker_trials = marker_trials.iloc[training_trials:]
+
+    marker_cues = marker_trials["cue"].tolist()
+    trial_cues = trials["cue_type"].map({"spatial valid": "valid", "double": "double"}).tolist()
+    matcher = difflib.SequenceMatcher(a=marker_cues, b=trial_cues, autojunk=False)    # match on cue types (a missing target marker must not break alignment)
+    marker_to_trial = {}
+    for marker_start, trial_start, size in matcher.get_matching_blocks():
+        for offset in range(size):
+            marker_to_trial[marker_trials["marker_trial"].iloc[marker_start+offset]] = trials["trial"].iloc[trial_start+offset]
+    markers["trial"] = markers["marker_trial"].map(marker_to_trial).astype("Int64")
+
+    events = markers.merge(trials, on="trial", how="left")
+    events["flag"] = "ok"
+    events.loc[events["event"] == "unknown", "flag"] = "unknown_code"
+    events.loc[events["marker_trial"] < training_trials, "flag"] = "training"
+    events.loc[events["trial"].isna() & (events["flag"] == "ok"), "flag"] = "extra"
+    is_duplicate = events.duplicated(subset=["marker_trial","event"]) & (events["flag"] == "ok")
+    events.loc[is_duplicate, "flag"] = "duplicate"
+    mismatched_target = (events["event"].str.startswith("target_") & (events["flag"] == "ok")
+                         & (events["event"].str.removeprefix("target_") != events["target_congruent"].map({"yes": "congruent", "no": "incongruent"})))
+    events.loc[mismatched_target, "flag"] = "wrong_code"
+    return events.drop(columns="marker_trial")
+
+def find_missing_markers(events: pd.DataFrame, trials: pd.DataFrame, variant: str) -> pd.DataFrame:
+    """Lists the markers that each behavioural trial should have produced but did not.
+
+    Returns:
+    missing -- one row per missing marker, with columns 'trial' and 'event' (type: pd.DataFrame)
+    """
+
+    expected = {"cue": np.ones(len(trials), dtype=bool),
+                "target": np.ones(len(trials), dtype=bool),
+                "response": (trials["response"] != "miss").to_numpy()}                  # escape presses also send a response marker
+    if variant == "eeg-tms":
+        expected["tms_pulse"] = np.ones(len(trials), dtype=bool)
+    received = events.loc[events["flag"] == "ok"].assign(event_group=lambda ok_events: ok_events["event"].str.split("_").str[0]
+                                                                                        .replace({"tms": "tms_pulse"}))
+    received_pairs = set(zip(received["trial"], received["event_group"]))
+    missing = [(trial, event_group) for event_group, is_expected in expected.items()
+               for trial, expected_here in zip(trials["trial"], is_expected)
+               if expected_here and (trial, event_group) not in received_pairs]
+    return pd.DataFrame(missing, columns=["trial","event"]).sort_values(by="trial").reset_index(drop=True)
+
+def to_mne_events(events: pd.DataFrame, sampling_rate: float) -> np.ndarray:
+    """Converts the aligned markers (flag "ok" only) to an MNE-style events array (sample, 0, code)."""
+
+    ok_events = events.loc[events["flag"] == "ok"]
+    return np.column_stack([np.round(ok_events["time"].to_numpy()*sampling_rate).astype(int),
+                            np.zeros(len(ok_events), dtype=int),
+                            ok_events["code"].to_numpy()])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Align EEG markers to mANT behavioural trials")
+    parser.add_argument("beh_data_folder", type=Path, help="e.g., outputs/sub-01/ses-eeg/beh")
+    parser.add_argument("marker_file", type=Path, help="marker list exported from the EEG system (text or CSV, with a header row)")
+    parser.add_argument("variant", choices=list(trigger_codes))
+    parser.add_argument("output_file", type=Path, help="where to save the event table (.tsv)")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="factor from the marker file's time unit to seconds")
+    parser.add_argument("--sampling-rate", type=float, default=None, help="if given, a 'sample' column is added")
+    parser.add_argument("--training-trials", type=int, default=0, help="leading cue markers that belong to training trials")
+    arguments = parser.parse_args()
+
+    trials = read_session_trials(beh_data_folder=arguments.beh_data_folder)
+    events = align_markers(markers=read_marker_list(marker_file=arguments.marker_file, time_scale=arguments.time_scale),
+                           trials=trials,
+                           variant=arguments.variant,
+                           training_trials=arguments.training_trials)
+    if arguments.sampling_rate:
+        events.insert(loc=1,
+                      column="sample",
+                      value=np.round(events["time"]*arguments.sampling_rate).astype(int))
+    events.to_csv(path_or_buf=arguments.output_file,
+                  sep="\t",
+                  index=False,
+                  na_rep="n/a")
+    missing = find_missing_markers(events=events, trials=trials, variant=arguments.variant)
+    print(events["flag"].value_counts().to_string())
+    print(f"{len(missing)} missing markers" + (":\n" + missing.groupby("event")["trial"].apply(list).to_string() if len(missing) else ""))
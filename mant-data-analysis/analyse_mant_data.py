@@ -1,13 +1,13 @@
 from pathlib import Path
 
-import pandas as pd
-import scipy.stats as stats
-from statsmodels.stats.anova import AnovaRM
-from statsmodels.stats import multicomp as mc
-
 import analysis_utils as utils
 import analysis_config as config
+import analysis_group as group
+
 
+if config.profile_pipeline:
+    utils.enable_profiling(use_cprofile=config.cprofile_pipeline,
+                           trace_memory=config.trace_memory_pipeline)
 
 statistics_dir, figures_dir = utils.set_output_directories(experiment_name=config.experiment + "-experiment")
 
@@ -20,6 +20,7 @@ for subject_number in range(1,sample_size+1):
     if not Path(config.data_dir + f"{subject_id}").is_dir():
         print(f"Data for subject {subject_id} not found - skipping to next subject")
         continue
+    utils.set_profiling_subject(subject_id)
     figures_subdir = utils.set_figures_subdir(figures_dir=figures_dir,
                                               subject=subject_id,
                                               group=False)
@@ -29,7 +30,8 @@ for subject_number in range(1,sample_size+1):
                                      trials_per_subject=config.TRIALS_PER_SUBJECT,
                                      data_type="beh",
                                      sort_key=config.subject_sort_key,
-                                     drop_nans=True)
+                                     drop_nans=True,
+                                     trials_per_block=config.TRIALS_PER_BLOCK)
 
     separate_conditions_data = utils.fetch_mant_conditions(all_trials=mant_data,
                                                            pure=False)
@@ -82,69 +84,18 @@ for subject_number in range(1,sample_size+1):
 ### now do the  same things, but at group level (plus statistical tests) ###
 ############################################################################
 
-figures_subdir = utils.set_figures_subdir(figures_dir=figures_dir,
-                                          subject=None,
-                                          group=True)
-
+utils.set_profiling_subject("group")
 mant_data = utils.read_mant_data(data_dir=config.data_dir,
                                  sample_size=sample_size,
                                  data_type="beh",
                                  trials_per_subject=config.TRIALS_PER_SUBJECT,
                                  sort_key=config.group_sort_key,
-                                 drop_nans=True)
-
-separate_conditions_data = utils.fetch_mant_conditions(all_trials=mant_data,
-                                                       pure=False)
-descriptives_dataframes = utils.get_condition_descriptives(conditions=separate_conditions_data,
-                                                           condition_names=config.abbreviated_condition_names)
-group_statistics_dir = Path(statistics_dir / "group")
-if not group_statistics_dir.is_dir():
-    group_statistics_dir.mkdir()
-descriptives_dataframes.to_csv(path_or_buf=group_statistics_dir / f"descriptives.csv",
-                               sep=",")
-
-for plot_title, plot_type in zip(config.plot_titles, config.plot_types):
-    utils.plot_reaction_times(title=plot_title + f"(N={sample_size})",
-                              conditions=separate_conditions_data,
-                              condition_names=config.condition_names,
-                              figures_savedir=figures_subdir,
-                              plot_type=plot_type)
-    
-utils.plot_compact_boxplots(separate_conditions_data=separate_conditions_data,
-                            group=True,
-                            sample_size=sample_size,
-                            subject_id=None,
-                            figures_savedir=figures_subdir)
-
-utils.plot_rt_over_conditions(conditions=separate_conditions_data,
-                              condition_names=config.abbreviated_condition_names,
-                              data_id="group",
-                              sample_size=sample_size,
-                              figures_savedir=figures_subdir)
-
-relevant_data = utils.get_only_cues_and_targets(mant_data=mant_data)
-for variable in ["cues","targets"]:
-    utils.plot_target_cue_interactions(mant_data=relevant_data,
-                                       data_id="group",
-                                       specific_jitter=None,
-                                       on_x_axis=variable,
-                                       sample_size=sample_size,
-                                       figures_savedir=figures_subdir)
-
-
-anova_table = AnovaRM(data=mant_data,
-                      depvar="rt", 
-                      subject="subject",
-                      within=["cue_type","target_congruent"],
-                      aggregate_func="mean").fit()
-print(anova_table)
-anova_table.to_csv(path_or_buf=group_statistics_dir / "parametric-rm-anova-table.csv",
-                   sep=",")
-cue_post_hoc_tests = mc.MultiComparison(data=mant_data["rt"].astype(dtype="float"),
-                                        groups=mant_data["cue_type"])
-summary_table, _, _ = cue_post_hoc_tests.allpairtest(stats.ttest_ind, 
-                                                     method="bonf")
-writeable_summary_table = pd.DataFrame(summary_table)
-writeable_summary_table.to_csv(path_or_buf=group_statistics_dir / "post-hoc-cues-ttest-bonferroni.csv",
-                               sep=",")
-print(summary_table)
\ No newline at end of file
+                                 drop_nans=True,
+                                 trials_per_block=config.TRIALS_PER_BLOCK)
+group.analyse_group(mant_data=mant_data,
+                    sample_size=sample_size,
+                    statistics_dir=statistics_dir,
+                    figures_dir=figures_dir)
+
+if config.profile_pipeline:
+    utils.write_timing_report(output_dir=statistics_dir)
@@ -0,0 +1,78 @@
+""" Group-level analysis of several mANT experiments in one go (one worker process per experiment).
+Which experiments to analyse is set by 'batch_experiments' in analysis_config.py.
+Sample sizes are inferred from the number of 'sub-xx' folders in each experiment's data folder. """
+
+import os
+os.environ.setdefault("MPLBACKEND", "Agg")                                                 # workers have no display
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+import analysis_utils as utils
+import analysis_config as config
+import analysis_group as group
+
+
+def analyse_experiment(experiment_config: config.ExperimentConfig, cache_dir: str) -> tuple[pd.DataFrame]:
+    """Reads one experiment's data through the ingest cache and runs 'analysis_group.analyse_group()' on it.
+
+    Parameters:
+    experiment_config -- the experiment's settings (type: config.ExperimentConfig)
+    cache_dir -- the path to the ingest cache shared by all experiments (type: str)
+
+    Returns:
+    descriptives_dataframe -- condition-wise descriptives (type: pd.DataFrame)
+    network_effects -- subject-wise network effects (type: pd.DataFrame)
+    """
+
+    if config.profile_pipeline:
+        utils.enable_profiling(use_cprofile=config.cprofile_pipeline,
+                               trace_memory=config.trace_memory_pipeline)
+        utils.set_profiling_subject("group")
+
+    statistics_dir, figures_dir = utils.set_output_directories(experiment_name=experiment_config.name + "-experiment")
+    sample_size = utils.count_subjects(data_dir=experiment_config.data_dir)
+    mant_data = utils.read_mant_data_cached(cache_dir=cache_dir,
+                                            data_dir=experiment_config.data_dir,
+                                            sample_size=sample_size,
+                                            data_type="beh",
+                                            trials_per_subject=experiment_config.trials_per_subject,
+                                            sort_key=experiment_config.group_sort_key,
+                                            drop_nans=True,
+                                            trials_per_block=experiment_config.trials_per_block)
+
+    descriptives_dataframe, network_effects = group.analyse_group(mant_data=mant_data,
+                                                                  sample_size=sample_size,
+                                                                  statistics_dir=statistics_dir,
+                                                                  figures_dir=figures_dir,
+                                                                  verbose=False)
+    if config.profile_pipeline:
+        utils.write_timing_report(output_dir=statistics_dir / "group")
+    return descriptives_dataframe, network_effects
+
+
+if __name__ == "__main__":
+    experiment_configs = [config.experiments[name] for name in config.batch_experiments]
+    cache_dir = str(Path.cwd() / config.ingest_cache_dir)
+
+    all_descriptives = []
+    all_network_effects = []
+    with ProcessPoolExecutor(max_workers=len(experiment_configs)) as pool:             # experiments run side by side, so the whole set takes about as long as the slowest one
+        futures = [pool.submit(analyse_experiment, experiment_config, cache_dir) for experiment_config in experiment_configs]
+        for experiment_config, future in zip(experiment_configs, futures):
+            descriptives_dataframe, network_effects = future.result()
+            all_descriptives.append(descriptives_dataframe.assign(experiment=experiment_config.name))
+            all_network_effects.append(network_effects.assign(experiment=experiment_config.name))
+            print(f"Finished analysing the {experiment_config.name} experiment")
+
+    cross_experiment_dir = Path(Path.cwd() / "results" / "cross-experiment")
+    cross_experiment_dir.mkdir(parents=True, exist_ok=True)
+    pd.concat(objs=all_descriptives, axis=0).to_csv(path_or_buf=cross_experiment_dir / "descriptives.csv",
+                                                    sep=",",
+                                                    index=False)
+    cross_experiment_effects = pd.concat(objs=all_network_effects, axis=0)
+    cross_experiment_effects.to_csv(path_or_buf=cross_experiment_dir / "network-effects.csv",
+                                    sep=",",
+                                    index=False)
+    print(cross_experiment_effects.groupby("experiment")[["orienting","conflict","interaction"]].agg(["mean","std"]))
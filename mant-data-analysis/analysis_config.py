@@ -1,33 +1,101 @@
-experiment = "eeg"
-
-NUMBER_OF_BLOCKS = 10 if experiment == "mri" else 9
-TRIALS_PER_BLOCK = 24 if experiment == "mri" else 48                                        
-TRIALS_PER_SUBJECT = NUMBER_OF_BLOCKS*TRIALS_PER_BLOCK
-
-if experiment == "beh":
-    data_dir = "/home/matteo/Documents/phd/abcc/abcc-data/behavioural-pilots-cimec/beh-pilot-2/"
-    subject_sort_key = lambda path : int(path.stem.rsplit("_")[3])                          # sort by trial
-    group_sort_key = lambda path : path.stem.rsplit("_")[0]                                 # sort by subject
-    blockwise_boxplots_nrows = 3
-    blockwise_boxplots_ncols = 3
-elif experiment == "eeg":
-    data_dir = "/home/matteo/Documents/phd/abcc/abcc-data/eeg-experiment-cimec/beh-data/"
-    subject_sort_key = lambda path : int(path.stem.rsplit("_")[3])                          # sort by trial
-    group_sort_key = lambda path : path.stem.rsplit("_")[0]                                 # sort by subject
-    blockwise_boxplots_nrows = 3
-    blockwise_boxplots_ncols = 3
-elif experiment == "mri":
-    data_dir = "/home/matteo/Documents/phd/abcc/abcc-data/mri-experiment-cimec/beh-data/"
-    subject_sort_key = lambda path : path.stem.rsplit("_")[2]                               # sort by run
-    group_sort_key = lambda path : path.stem.rsplit("_")[0]                                 # sort by subject
-    blockwise_boxplots_nrows = 2
-    blockwise_boxplots_ncols = 5
-elif experiment == "eeg-tms":
-    data_dir = "/home/matteo/Documents/phd/abcc/ant/attention-network-test/outputs/eeg-tms-pilot/"
-    subject_sort_key = lambda path : int(path.stem.rsplit("_")[3])                          # sort by trial
-    group_sort_key = lambda path : path.stem.rsplit("_")[0]                                 # sort by subject
-    blockwise_boxplots_nrows = 3
-    blockwise_boxplots_ncols = 3
+from dataclasses import dataclass
+from typing import Callable
+
+
+def sort_by_trial(path):
+    """Sort key for single-trial output files (e.g., 'sub-01_task-mANT_beh_12.tsv' --> 12)
+    and block files (e.g., 'sub-01_task-mANT_beh_block-02.tsv' --> 2)."""
+    return int(path.stem.rsplit("_")[3].removeprefix("block-"))
+
+def sort_by_run(path):
+    """Sort key for fMRI output files (e.g., 'sub-01_task-mANT_run-01_beh_12.tsv' --> 'run-01')."""
+    return path.stem.rsplit("_")[2]
+
+def sort_by_subject(path):
+    """Sort key for group-level reading (e.g., 'sub-01_task-mANT_beh_12.tsv' --> 'sub-01')."""
+    return path.stem.rsplit("_")[0]
+
+
+@dataclass(frozen=True)
+class ExperimentConfig:
+    """Experiment-specific settings. Sort keys are module-level functions (not lambdas)
+    so that instances can be sent to worker processes.
+
+    Attributes:
+    name -- the experiment's short name (e.g., "eeg") (type: str)
+    data_dir -- the path to the folder that stores the experiment's data (type: str)
+    number_of_blocks -- the number of experimental blocks (or fMRI runs) (type: int)
+    trials_per_block -- the number of trials per block (or fMRI run) (type: int)
+    subject_sort_key -- the criterion to sort one subject's files before reading them (function)
+    group_sort_key -- the criterion to sort all subjects' files before reading them (function)
+    blockwise_boxplots_nrows -- the number of rows in blockwise boxplots (type: int)
+    blockwise_boxplots_ncols -- the number of columns in blockwise boxplots (type: int)
+    """
+
+    name: str
+    data_dir: str
+    number_of_blocks: int
+    trials_per_block: int
+    subject_sort_key: Callable
+    group_sort_key: Callable
+    blockwise_boxplots_nrows: int
+    blockwise_boxplots_ncols: int
+
+    @property
+    def trials_per_subject(self) -> int:
+        return self.number_of_blocks*self.trials_per_block
+
+
+experiments = {"beh": ExperimentConfig(name="beh",
+                                       data_dir="/home/matteo/Documents/phd/abcc/abcc-data/behavioural-pilots-cimec/beh-pilot-2/",
+                                       number_of_blocks=9,
+                                       trials_per_block=48,
+                                       subject_sort_key=sort_by_trial,
+                                       group_sort_key=sort_by_subject,
+                                       blockwise_boxplots_nrows=3,
+                                       blockwise_boxplots_ncols=3),
+               "eeg": ExperimentConfig(name="eeg",
+                                       data_dir="/home/matteo/Documents/phd/abcc/abcc-data/eeg-experiment-cimec/beh-data/",
+                                       number_of_blocks=9,
+                                       trials_per_block=48,
+                                       subject_sort_key=sort_by_trial,
+                                       group_sort_key=sort_by_subject,
+                                       blockwise_boxplots_nrows=3,
+                                       blockwise_boxplots_ncols=3),
+               "mri": ExperimentConfig(name="mri",
+                                       data_dir="/home/matteo/Documents/phd/abcc/abcc-data/mri-experiment-cimec/beh-data/",
+                                       number_of_blocks=10,
+                                       trials_per_block=24,
+                                       subject_sort_key=sort_by_run,
+                                       group_sort_key=sort_by_subject,
+                                       blockwise_boxplots_nrows=2,
+                                       blockwise_boxplots_ncols=5),
+               "eeg-tms": ExperimentConfig(name="eeg-tms",
+                                           data_dir="/home/matteo/Documents/phd/abcc/ant/attention-network-test/outputs/eeg-tms-pilot/",
+                                           number_of_blocks=9,
+                                           trials_per_block=48,
+                                           subject_sort_key=sort_by_trial,
+                                           group_sort_key=sort_by_subject,
+                                           blockwise_boxplots_nrows=3,
+                                           blockwise_boxplots_ncols=3)}
+
+experiment = "eeg"                                                                          # used by analyse_mant_data.py
+batch_experiments = ["beh", "eeg", "mri", "eeg-tms"]                                        # used by analyse_multiple_experiments.py
+ingest_cache_dir = "ingest-cache"                                                           # shared by all experiments (relative to the working directory)
+import_time_budget_seconds = 1.0                                                            # checked by check_import_time.py
+profile_pipeline = False                                                                    # save per-stage timings to timing-report.json/.csv
+cprofile_pipeline = False                                                                   # also save a cProfile dump (only if profile_pipeline is True)
+trace_memory_pipeline = False                                                               # also trace each stage's peak allocations (slow; only if profile_pipeline is True)
+fmri_repetition_time_seconds = 2.0                                                          # default TR for compile_fmri_events.py
+
+NUMBER_OF_BLOCKS = experiments[experiment].number_of_blocks
+TRIALS_PER_BLOCK = experiments[experiment].trials_per_block
+TRIALS_PER_SUBJECT = experiments[experiment].trials_per_subject
+data_dir = experiments[experiment].data_dir
+subject_sort_key = experiments[experiment].subject_sort_key
+group_sort_key = experiments[experiment].group_sort_key
+blockwise_boxplots_nrows = experiments[experiment].blockwise_boxplots_nrows
+blockwise_boxplots_ncols = experiments[experiment].blockwise_boxplots_ncols
 
 condition_names = ["Valid cue, congruent target",
                    "Valid cue, incongruent target",
@@ -49,4 +117,4 @@ plot_types = ["line",
 
 plot_titles = ["Reaction times over trials per condition",
                "Reaction time histogram per condition",
-               "Reaction time boxplot per condition"]
\ No newline at end of file
+               "Reaction time boxplot per condition"]
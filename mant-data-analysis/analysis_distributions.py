@@ -0,0 +1,202 @@
+""" Reaction time distribution analyses: vincentiles (per-subject quantiles averaged across subjects), delta plots for the
+congruency and cue effects, and conditional accuracy functions (accuracy per RT bin).
+
+Every subject x condition cell is handled at once: the cohort's trials are sorted by (subject, condition, RT) a single time,
+'np.searchsorted' finds where each cell starts and ends, and quantiles and bins are then index arithmetic on that one array. """
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import analysis_utils as utils
+import analysis_config as config
+
+
+default_quantiles = (0.1, 0.3, 0.5, 0.7, 0.9)
+
+def sort_by_cell(mant_data: pd.DataFrame, correct_only: bool) -> dict[str, np.ndarray]:
+    """Sorts trials by subject, condition (VC, VI, DC, DI) and reaction time, and finds where each subject x condition cell starts.
+
+    Parameters:
+    mant_data -- a dataframe containing mANT data, without missed trials (type: pd.DataFrame)
+    correct_only -- whether to keep correct trials only (type: bool)
+
+    Returns:
+    sorted_trials -- 'subjects' (unique subject ids), 'rt', 'correct', 'cell' (subject index*4 + condition index) for every trial,
+                     and 'starts'/'counts' for every cell (type: dict[str, np.ndarray])
+    """
+
+    if correct_only:
+        mant_data = mant_data.loc[mant_data["correct"].astype(int) == 1]
+    subjects, subject_indices = np.unique(mant_data["subject"].to_numpy(), return_inverse=True)
+    condition_indices = 2*(mant_data["cue_type"].to_numpy() == "double") + (mant_data["target_congruent"].to_numpy() == "no")
+    cells = subject_indices*4 + condition_indices
+    reaction_times = mant_data["rt"].to_numpy(dtype=float)
+    order = np.lexsort((reaction_times, cells))
+    cells = cells[order]
+    all_cells = np.arange(len(subjects)*4)
+    starts = np.searchsorted(cells, all_cells, side="left")
+    counts = np.searchsorted(cells, all_cells, side="right") - starts
+    return {"subjects": subjects,
+            "rt": reaction_times[order],
+            "correct": mant_data["correct"].to_numpy(dtype=int)[order],
+            "cell": cells,
+            "starts": starts,
+            "counts": counts}
+
+def cells_to_dataframe(subjects: np.ndarray, values: np.ndarray, value_name: str, level_name: str, levels) -> pd.DataFrame:
+    """Turns a (subjects*4, levels) array into a long dataframe with 'subject', 'cue_type', 'target_congruent' columns."""
+
+    cell_subjects = np.repeat(subjects, 4)
+    cue_types = np.tile(["spatial valid","spatial valid","double","double"], len(subjects))
+    target_congruent = np.tile(["yes","no","yes","no"], len(subjects))
+    return pd.DataFrame({"subject": np.repeat(cell_subjects, len(levels)),
+                         "cue_type": np.repeat(cue_types, len(levels)),
+                         "target_congruent": np.repeat(target_congruent, len(levels)),
+                         level_name: np.tile(levels, len(cell_subjects)),
+                         value_name: values.ravel()})
+
+@utils.profiled
+def compute_vincentiles(mant_data: pd.DataFrame, quantiles: tuple[float] = default_quantiles, correct_only: bool = True) -> pd.DataFrame:
+    """Computes RT quantiles for every subject x condition cell (linear interpolation, as 'np.quantile').
+
+    Parameters:
+    mant_data -- a dataframe containing mANT data, without missed trials (type: pd.DataFrame)
+    quantiles -- the quantiles to compute (type: tuple[float])
+    correct_only -- whether to use correct trials only (type: bool)
+
+    Returns:
+    vincentiles -- one row per subject x condition x quantile, with an 'rt' column (NaN for empty cells) (type: pd.DataFrame)
+    """
+
+    sorted_trials = sort_by_cell(mant_data=mant_data, correct_only=correct_only)
+    starts = sorted_trials["starts"][:, None]
+    counts = sorted_trials["counts"][:, None]
+    positions = np.asarray(quantiles)[None, :]*(counts - 1)                          # fractional rank within each cell
+    lower = np.floor(positions).astype(int)
+    upper = np.minimum(lower + 1, counts - 1)
+    weights = positions - lower
+    reaction_times = np.append(sorted_trials["rt"], np.nan)                          # empty cells index the trailing NaN
+    lower_indices = np.where(counts > 0, starts + lower, len(reaction_times) - 1)
+    upper_indices = np.where(counts > 0, starts + upper, len(reaction_times) - 1)
+    values = (1 - weights)*reaction_times[lower_indices] + weights*reaction_times[upper_indices]
+    return cells_to_dataframe(subjects=sorted_trials["subjects"],
+                              values=values,
+                              value_name="rt",
+                              level_name="quantile",
+                              levels=np.asarray(quantiles))
+
+def compute_delta_plots(vincentiles: pd.DataFrame) -> pd.DataFrame:
+    """Computes delta plots from vincentiles: at every quantile, the effect (difference) against the mean of the two conditions.
+    - congruency: incongruent minus congruent target, separately for each cue type
+    - cue: double minus spatially valid cue, separately for each target type
+
+    Parameters:
+    vincentiles -- the output of 'compute_vincentiles()' (type: pd.DataFrame)
+
+    Returns:
+    delta_plots -- one row per subject x effect x level x quantile, with columns 'mean_rt' and 'delta' (type: pd.DataFrame)
+    """
+
+    wide = vincentiles.pivot_table(index=["subject","quantile"], columns=["cue_type","target_congruent"], values="rt", dropna=False)
+    all_deltas = []
+    for effect, level_name, levels, slower, faster in [("congruency", "cue_type", ["spatial valid","double"], "no", "yes"),
+                                                       ("cue", "target_congruent", ["yes","no"], "double", "spatial valid")]:
+        for level in levels:
+            if effect == "congruency":
+                slower_rt, faster_rt = wide[(level, slower)], wide[(level, faster)]
+            else:
+                slower_rt, faster_rt = wide[(slower, level)], wide[(faster, level)]
+            all_deltas.append(pd.DataFrame({"effect": effect,
+                                            "level": level,
+                                            "mean_rt": (slower_rt + faster_rt)/2,
+                                            "delta": slower_rt - faster_rt}).reset_index())
+    return pd.concat(objs=all_deltas, axis=0, ignore_index=True)
+
+@utils.profiled
+def compute_conditional_accuracy(mant_data: pd.DataFrame, number_of_bins: int = 5) -> pd.DataFrame:
+    """Computes conditional accuracy functions: each subject x condition cell's trials (correct and incorrect) are split
+    into equally populated RT bins, and accuracy is computed within each bin.
+
+    Parameters:
+    mant_data -- a dataframe containing mANT data, without missed trials (type: pd.DataFrame)
+    number_of_bins -- the number of RT bins (type: int)
+
+    Returns:
+    conditional_accuracy -- one row per subject x condition x bin, with columns 'mean_rt' and 'accuracy' (%) (type: pd.DataFrame)
+    """
+
+    sorted_trials = sort_by_cell(mant_data=mant_data, correct_only=False)
+    cells = sorted_trials["cell"]
+    rank_in_cell = np.arange(cells.size) - sorted_trials["starts"][cells]
+    bins = rank_in_cell*number_of_bins//sorted_trials["counts"][cells]
+    flat_bins = cells*number_of_bins + bins
+    number_of_flat_bins = sorted_trials["starts"].size*number_of_bins
+    trials_per_bin = np.bincount(flat_bins, minlength=number_of_flat_bins)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_rt = np.bincount(flat_bins, weights=sorted_trials["rt"], minlength=number_of_flat_bins)/trials_per_bin
+        accuracy = 100*np.bincount(flat_bins, weights=sorted_trials["correct"] == 1, minlength=number_of_flat_bins)/trials_per_bin
+    conditional_accuracy = cells_to_dataframe(subjects=sorted_trials["subjects"],
+                                              values=mean_rt,
+                                              value_name="mean_rt",
+                                              level_name="bin",
+                                              levels=np.arange(1, number_of_bins+1))
+    conditional_accuracy["accuracy"] = accuracy
+    return conditional_accuracy
+
+@utils.profiled
+def plot_distributions(vincentiles: pd.DataFrame,
+                       delta_plots: pd.DataFrame,
+                       conditional_accuracy: pd.DataFrame,
+                       data_id: str,
+                       sample_size: int,
+                       figures_savedir: Path):
+    """Plots group-averaged vincentiles (as cumulative distributions), delta plots, and conditional accuracy functions.
+
+    Parameters:
+    vincentiles -- the output of 'compute_vincentiles()' (type: pd.DataFrame)
+    delta_plots -- the output of 'compute_delta_plots()' (type: pd.DataFrame)
+    conditional_accuracy -- the output of 'compute_conditional_accuracy()' (type: pd.DataFrame)
+    data_id -- an arbitrary label for the data (e.g., "sub-01" or "group") (type: str)
+    sample_size -- the sample size (type: int)
+    figures_savedir -- where to save the output (type: Path object)
+    """
+
+    import matplotlib.pyplot as plt
+
+    plt.rcParams["font.family"] = "monospace"
+    data_label = f"{data_id}, N={int(sample_size)}" if data_id == "group" else data_id
+    condition_labels = dict(zip([("spatial valid","yes"), ("spatial valid","no"), ("double","yes"), ("double","no")],
+                                config.condition_names))
+
+    _, ax = plt.subplots(figsize=(12,8))
+    for (cue_type, target_congruent), condition in vincentiles.groupby(["cue_type","target_congruent"], sort=False):
+        group_average = condition.groupby("quantile")["rt"].mean()
+        ax.plot(group_average.to_numpy(), group_average.index, marker="o", label=condition_labels[(cue_type, target_congruent)])
+    ax.set(xlabel="Reaction time (s)", ylabel="Cumulative probability", title=f"Vincentised RT distributions ({data_label})")
+    ax.legend()
+    plt.savefig(figures_savedir / f"rt-vincentiles-{data_id}.pdf", bbox_inches="tight")
+    plt.close()
+
+    _, axs = plt.subplots(nrows=1, ncols=2, figsize=(12,5), sharey=True)
+    for ax, (effect, effect_deltas) in zip(axs, delta_plots.groupby("effect", sort=False)):
+        for level, level_deltas in effect_deltas.groupby("level", sort=False):
+            group_average = level_deltas.groupby("quantile")[["mean_rt","delta"]].mean()
+            ax.plot(group_average["mean_rt"], group_average["delta"], marker="o", label=level)
+        ax.axhline(y=0, color="grey", linewidth=0.8)
+        ax.set(xlabel="Mean RT (s)", title=f"{effect.capitalize()} effect")
+        ax.legend()
+    axs[0].set(ylabel="Effect (s)")
+    plt.suptitle(t=f"Delta plots ({data_label})", fontweight="bold")
+    plt.savefig(figures_savedir / f"rt-delta-plots-{data_id}.pdf", bbox_inches="tight")
+    plt.close()
+
+    _, ax = plt.subplots(figsize=(12,8))
+    for (cue_type, target_congruent), condition in conditional_accuracy.groupby(["cue_type","target_congruent"], sort=False):
+        group_average = condition.groupby("bin")[["mean_rt","accuracy"]].mean()
+        ax.plot(group_average["mean_rt"], group_average["accuracy"], marker="o", label=condition_labels[(cue_type, target_congruent)])
+    ax.set(xlabel="Mean RT in bin (s)", ylabel="Accuracy (%)", title=f"Conditional accuracy functions ({data_label})")
+    ax.legend()
+    plt.savefig(figures_savedir / f"conditional-accuracy-{data_id}.pdf", bbox_inches="tight")
+    plt.close()
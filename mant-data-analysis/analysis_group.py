@@ -0,0 +1,136 @@
+""" Group-level analysis of one experiment's mANT data: descriptives, figures, jitter and reaction time distribution
+statistics, repeated-measures ANOVA, post-hoc cue tests and network effects.
+
+'analyse_group()' is the single implementation shared by 'analyse_mant_data.py' (one experiment) and
+'analyse_multiple_experiments.py' (several experiments in parallel), so that both produce the same files. """
+
+from pathlib import Path
+
+import pandas as pd
+
+import analysis_utils as utils
+import analysis_config as config
+import analysis_distributions as distributions
+
+
+def analyse_group(mant_data: pd.DataFrame,
+                  sample_size: int,
+                  statistics_dir: Path,
+                  figures_dir: Path,
+                  verbose: bool = True) -> tuple[pd.DataFrame]:
+    """Runs every group-level stage on data read with drop_nans=True. Tables are saved in 'statistics_dir/group', figures
+    in 'figures_dir/group'.
+
+    Parameters:
+    mant_data -- all subjects' trials (type: pd.DataFrame)
+    sample_size -- the number of subjects (type: int)
+    statistics_dir -- the experiment's statistics folder (type: Path)
+    figures_dir -- the experiment's figures folder (type: Path)
+    verbose -- whether to print the ANOVA and post-hoc tables (type: bool)
+
+    Returns:
+    descriptives_dataframe -- condition-wise descriptives (type: pd.DataFrame)
+    network_effects -- subject-wise network effects (type: pd.DataFrame)
+    """
+
+    figures_subdir = utils.set_figures_subdir(figures_dir=figures_dir,
+                                              subject=None,
+                                              group=True)
+    group_statistics_dir = Path(statistics_dir / "group")
+    group_statistics_dir.mkdir(exist_ok=True)
+
+    separate_conditions_data = utils.fetch_mant_conditions(all_trials=mant_data,
+                                                           pure=False)
+    descriptives_dataframe = utils.get_condition_descriptives(conditions=separate_conditions_data,
+                                                              condition_names=config.abbreviated_condition_names)
+    descriptives_dataframe.to_csv(path_or_buf=group_statistics_dir / "descriptives.csv",
+                                  sep=",")
+
+    for plot_title, plot_type in zip(config.plot_titles, config.plot_types):
+        utils.plot_reaction_times(title=plot_title + f"(N={sample_size})",
+                                  conditions=separate_conditions_data,
+                                  condition_names=config.condition_names,
+                                  figures_savedir=figures_subdir,
+                                  plot_type=plot_type)
+
+    utils.plot_compact_boxplots(separate_conditions_data=separate_conditions_data,
+                                group=True,
+                                sample_size=sample_size,
+                                subject_id=None,
+                                figures_savedir=figures_subdir)
+
+    utils.plot_rt_over_conditions(conditions=separate_conditions_data,
+                                  condition_names=config.abbreviated_condition_names,
+                                  data_id="group",
+                                  sample_size=sample_size,
+                                  figures_savedir=figures_subdir)
+
+    relevant_data = utils.get_only_cues_and_targets(mant_data=mant_data)
+    for variable in ["cues","targets"]:
+        utils.plot_target_cue_interactions(mant_data=relevant_data,
+                                           data_id="group",
+                                           specific_jitter=None,
+                                           on_x_axis=variable,
+                                           sample_size=sample_size,
+                                           figures_savedir=figures_subdir)
+
+    if {"pre_cue_jitter","post_cue_jitter"} <= set(mant_data.rename(columns=utils.jitter_column_aliases).columns):     # only task-only and fMRI data have jitters
+        for jitter_column in ["pre_cue_jitter","post_cue_jitter"]:
+            jitter_statistics = utils.compute_jitter_statistics(mant_data=mant_data,
+                                                                jitter_column=jitter_column)
+            jitter_statistics.to_csv(path_or_buf=group_statistics_dir / f"{jitter_column}-statistics.csv",
+                                     sep=",",
+                                     index=False)
+            utils.plot_jitter_statistics(jitter_statistics=jitter_statistics,
+                                         jitter_column=jitter_column,
+                                         data_id="group",
+                                         sample_size=sample_size,
+                                         figures_savedir=figures_subdir)
+        foreperiod_slopes = utils.compute_foreperiod_slopes(mant_data=mant_data,
+                                                            jitter_column="post_cue_jitter")
+        foreperiod_slopes.to_csv(path_or_buf=group_statistics_dir / "foreperiod-slopes.csv",
+                                 sep=",",
+                                 index=False)
+
+    vincentiles = distributions.compute_vincentiles(mant_data=mant_data)
+    delta_plots = distributions.compute_delta_plots(vincentiles=vincentiles)
+    conditional_accuracy = distributions.compute_conditional_accuracy(mant_data=mant_data)
+    for table_name, table in [("vincentiles", vincentiles), ("delta-plots", delta_plots), ("conditional-accuracy", conditional_accuracy)]:
+        table.to_csv(path_or_buf=group_statistics_dir / f"{table_name}.csv",
+                     sep=",",
+                     index=False)
+    distributions.plot_distributions(vincentiles=vincentiles,
+                                     delta_plots=delta_plots,
+                                     conditional_accuracy=conditional_accuracy,
+                                     data_id="group",
+                                     sample_size=sample_size,
+                                     figures_savedir=figures_subdir)
+
+    import scipy.stats as stats                                             # statistics dependencies are only loaded when statistics are run
+    from statsmodels.stats.anova import AnovaRM
+    from statsmodels.stats import multicomp as mc
+
+    with utils.profile_stage(stage="anova", rows=len(mant_data)):
+        anova_table = AnovaRM(data=mant_data,
+                              depvar="rt",
+                              subject="subject",
+                              within=["cue_type","target_congruent"],
+                              aggregate_func="mean").fit()
+    anova_table.anova_table.to_csv(path_or_buf=group_statistics_dir / "parametric-rm-anova-table.csv",
+                                   sep=",")
+    cue_post_hoc_tests = mc.MultiComparison(data=mant_data["rt"].astype(dtype="float"),
+                                            groups=mant_data["cue_type"])
+    with utils.profile_stage(stage="post_hoc_cue_ttests", rows=len(mant_data)):
+        summary_table, _, _ = cue_post_hoc_tests.allpairtest(stats.ttest_ind,
+                                                             method="bonf")
+    pd.DataFrame(summary_table).to_csv(path_or_buf=group_statistics_dir / "post-hoc-cues-ttest-bonferroni.csv",
+                                       sep=",")
+    if verbose:
+        print(anova_table)
+        print(summary_table)
+
+    network_effects = utils.compute_network_effects(mant_data=mant_data)
+    network_effects.to_csv(path_or_buf=group_statistics_dir / "network-effects.csv",
+                           sep=",",
+                           index=False)
+    return descriptives_dataframe, network_effects
@@ -0,0 +1,172 @@
+""" Split-half reliability of the orienting and conflict effects (see 'analysis_utils.compute_network_effects()').
+
+For every random split, each subject's trials are shuffled within each condition and cut in two halves; both effects are
+computed on each half, correlated across subjects, and corrected with the Spearman-Brown formula (2r/(1 + r)). Thousands of
+splits give a distribution of reliability coefficients rather than a single, split-dependent value.
+
+Splits are generated as one batched index array per subject (splits x trials) and evaluated with matrix products.
+Batches of splits are spread over a process pool.
+
+Usage:
+python analysis_reliability.py [experiment names, default: analysis_config.batch_experiments] [--splits 5000] [--workers N] """
+
+import argparse
+import os
+os.environ.setdefault("MPLBACKEND", "Agg")
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import analysis_utils as utils
+import analysis_config as config
+
+
+effect_names = ["orienting", "conflict"]
+
+def prepare_subjects(mant_data: pd.DataFrame, correct_only: bool = True) -> list[tuple[np.ndarray, np.ndarray]]:
+    """Extracts each subject's reaction times and condition indices (0: VC, 1: VI, 2: DC, 3: DI), sorted by condition.
+
+    Parameters:
+    mant_data -- a dataframe containing mANT data, without missed trials (type: pd.DataFrame)
+    correct_only -- whether to keep correct trials only (type: bool)
+
+    Returns:
+    subjects -- one (reaction times, condition indices) pair per subject (type: list[tuple[np.ndarray]])
+    """
+
+    if correct_only:
+        mant_data = mant_data.loc[mant_data["correct"].astype(int) == 1]
+    conditions = 2*(mant_data["cue_type"].to_numpy() == "double") + (mant_data["target_congruent"].to_numpy() == "no")
+    subjects = []
+    for subject_rows in mant_data.groupby("subject").indices.values():
+        order = np.argsort(conditions[subject_rows], kind="stable")
+        subjects.append((mant_data["rt"].to_numpy(dtype=float)[subject_rows][order], conditions[subject_rows][order]))
+    return subjects
+
+def compute_split_effects(subjects: list[tuple[np.ndarray, np.ndarray]], number_of_splits: int, seed: tuple[int]) -> np.ndarray:
+    """Computes both effects on both halves of 'number_of_splits' random splits, for every subject.
+
+    Parameters:
+    subjects -- the output of 'prepare_subjects()' (type: list[tuple[np.ndarray]])
+    number_of_splits -- the number of random splits (type: int)
+    seed -- the seed of this batch of splits (type: tuple[int])
+
+    Returns:
+    split_effects -- an array of shape (splits, subjects, effects, halves) (type: np.ndarray)
+    """
+
+    split_effects = np.empty(shape=(number_of_splits, len(subjects), len(effect_names), 2))
+    for subject_index, (reaction_times, conditions) in enumerate(subjects):
+        rng = np.random.default_rng(seed + (subject_index,))
+        condition_counts = np.bincount(conditions, minlength=4)
+        condition_starts = np.cumsum(condition_counts) - condition_counts
+        shuffled = np.argsort(conditions + rng.random(size=(number_of_splits, conditions.size)), axis=1)   # shuffles trials within each condition, for every split at once
+        rank_in_condition = np.empty_like(shuffled)
+        np.put_along_axis(rank_in_condition, shuffled, np.arange(conditions.size)[None, :], axis=1)
+        rank_in_condition -= condition_starts[conditions]
+        first_half = (rank_in_condition < condition_counts[conditions]//2).astype(float)
+        condition_matrix = np.eye(4)[conditions]                                                          # trials x conditions
+        for half, mask in enumerate([first_half, 1 - first_half]):
+            with np.errstate(invalid="ignore", divide="ignore"):
+                condition_means = ((mask*reaction_times) @ condition_matrix)/(mask @ condition_matrix)
+            split_effects[:, subject_index, 0, half] = condition_means[:, 2:].mean(axis=1) - condition_means[:, :2].mean(axis=1)
+            split_effects[:, subject_index, 1, half] = condition_means[:, [1,3]].mean(axis=1) - condition_means[:, [0,2]].mean(axis=1)
+    return split_effects
+
+def correlate_halves(split_effects: np.ndarray) -> np.ndarray:
+    """Correlates (Pearson) the two halves across subjects, for every split and effect.
+
+    Returns:
+    correlations -- an array of shape (splits, effects) (type: np.ndarray)
+    """
+
+    first_half = split_effects[..., 0] - split_effects[..., 0].mean(axis=1, keepdims=True)
+    second_half = split_effects[..., 1] - split_effects[..., 1].mean(axis=1, keepdims=True)
+    return (first_half*second_half).sum(axis=1)/np.sqrt((first_half**2).sum(axis=1)*(second_half**2).sum(axis=1))
+
+@utils.profiled
+def compute_split_half_reliability(mant_data: pd.DataFrame,
+                                   number_of_splits: int = 5000,
+                                   splits_per_batch: int = 500,
+                                   workers: int | None = None,
+                                   seed: int = 0) -> pd.DataFrame:
+    """Computes the split-half reliability of the orienting and conflict effects over many random splits.
+
+    Parameters:
+    mant_data -- a dataframe containing mANT data from at least three subjects, without missed trials (type: pd.DataFrame)
+    number_of_splits -- the number of random splits (type: int)
+    splits_per_batch -- the number of splits sent to a worker process at once (type: int)
+    workers -- the number of worker processes (default: one per CPU) (type: int or None)
+    seed -- the random seed (type: int)
+
+    Returns:
+    reliability -- one row per split and effect, with columns 'split', 'effect', 'r' and 'spearman_brown' (type: pd.DataFrame)
+    """
+
+    subjects = prepare_subjects(mant_data=mant_data)
+    batch_sizes = [min(splits_per_batch, number_of_splits - start) for start in range(0, number_of_splits, splits_per_batch)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        batches = pool.map(compute_split_effects,
+                           [subjects]*len(batch_sizes),
+                           batch_sizes,
+                           [(seed, batch) for batch in range(len(batch_sizes))])
+        correlations = np.concatenate([correlate_halves(split_effects) for split_effects in batches], axis=0)
+    return pd.DataFrame({"split": np.repeat(np.arange(number_of_splits), len(effect_names)),
+                         "effect": np.tile(effect_names, number_of_splits),
+                         "r": correlations.ravel(),
+                         "spearman_brown": (2*correlations/(1 + correlations)).ravel()})
+
+def summarise_reliability(reliability: pd.DataFrame) -> pd.DataFrame:
+    """Summarises the distribution of Spearman-Brown coefficients (mean, median, 2.5th and 97.5th percentiles) per effect."""
+
+    return reliability.groupby("effect")["spearman_brown"].describe(percentiles=[0.025, 0.5, 0.975])
+
+def plot_reliability(reliability: pd.DataFrame, title: str, figure_path: Path):
+    """Plots one histogram of Spearman-Brown coefficients per effect."""
+
+    import matplotlib.pyplot as plt
+
+    plt.rcParams["font.family"] = "monospace"
+    _, ax = plt.subplots(figsize=(12,8))
+    for effect, effect_reliability in reliability.groupby("effect"):
+        ax.hist(effect_reliability["spearman_brown"], bins=50, alpha=.6, label=effect)
+    ax.set(xlabel="Spearman-Brown corrected split-half reliability", ylabel="Number of splits", title=title)
+    ax.legend()
+    plt.savefig(figure_path, bbox_inches="tight")
+    plt.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split-half reliability of mANT network effects")
+    parser.add_argument("experiments", nargs="*", default=config.batch_experiments, help="names of experiments in analysis_config.experiments")
+    parser.add_argument("--splits", type=int, default=5000, help="number of random splits")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+
+    reliability_dir = Path(Path.cwd() / "results" / "reliability")
+    reliability_dir.mkdir(parents=True, exist_ok=True)
+    for experiment_name in arguments.experiments:
+        experiment_config = config.experiments[experiment_name]
+        sample_size = utils.count_subjects(data_dir=experiment_config.data_dir)
+        mant_data = utils.read_mant_data_cached(cache_dir=str(Path.cwd() / config.ingest_cache_dir),
+                                                data_dir=experiment_config.data_dir,
+                                                sample_size=sample_size,
+                                                data_type="beh",
+                                                trials_per_subject=experiment_config.trials_per_subject,
+                                                sort_key=experiment_config.group_sort_key,
+                                                drop_nans=True,
+                                                trials_per_block=experiment_config.trials_per_block)
+        reliability = compute_split_half_reliability(mant_data=mant_data,
+                                                     number_of_splits=arguments.splits,
+                                                     workers=arguments.workers,
+                                                     seed=arguments.seed)
+        reliability.to_csv(path_or_buf=reliability_dir / f"{experiment_name}-split-half.csv",
+                           sep=",",
+                           index=False)
+        plot_reliability(reliability=reliability,
+                         title=f"Split-half reliability, {experiment_name} experiment (N={sample_size}, {arguments.splits} splits)",
+                         figure_path=reliability_dir / f"{experiment_name}-split-half.pdf")
+        print(f"{experiment_name} experiment (N={sample_size}):\n{summarise_reliability(reliability=reliability)}")
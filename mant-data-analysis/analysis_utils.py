@@ -1,10 +1,165 @@
+import cProfile
+import csv
+import functools
+import hashlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+from contextlib import contextmanager
 from pathlib import Path
-from tkinter import simpledialog
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+from analysis_streaming import StreamingDescriptives
+
+
+profiling = {"enabled": False,                  # switched on by enable_profiling()
+             "subject": None,                   # the subject whose data are being processed (if any)
+             "records": [],                     # one dictionary per completed stage
+             "open_stages": [],                 # the stages being run, outermost first (see profile_stage())
+             "trace_memory": False,             # whether allocations are traced with tracemalloc
+             "profiler": None}                  # a cProfile.Profile object, if requested
+
+def enable_profiling(use_cprofile: bool = False, trace_memory: bool = False):
+    """Starts recording per-stage timings (and, optionally, each stage's own peak memory and a cProfile trace of the whole run).
+
+    Parameters:
+    use_cprofile -- whether to also collect a cProfile trace (type: bool)
+    trace_memory -- whether to also trace allocations with tracemalloc, which makes allocation-heavy stages
+                    several times slower (type: bool)
+    """
+
+    profiling["enabled"] = True
+    profiling["records"] = []
+    profiling["open_stages"] = []
+    profiling["trace_memory"] = trace_memory
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if use_cprofile:
+        profiling["profiler"] = cProfile.Profile()
+        profiling["profiler"].enable()
+
+def set_profiling_subject(subject_id: str | None):
+    """Labels all following stages with the given subject (e.g., "sub-01" or "group"). 
+
+    Parameters:
+    subject_id -- the subject being processed (type: str or None)
+    """
+
+    profiling["subject"] = subject_id
+
+def get_peak_rss_mb() -> float | None:
+    """Returns the process's peak resident set size in MB (None where unavailable, e.g., on Windows)."""
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss/2**20 if sys.platform == "darwin" else peak_rss/2**10      # bytes on macOS, kilobytes on Linux
+
+def count_rows(data) -> int | None:
+    """Counts the rows in a dataframe or in a list of dataframes (None for anything else)."""
+
+    if isinstance(data, pd.DataFrame):
+        return len(data)
+    if isinstance(data, list) and data and all(isinstance(item, pd.DataFrame) for item in data):
+        return sum(len(item) for item in data)
+    return None
+
+@contextmanager
+def profile_stage(stage: str, rows: int | None = None):
+    """Records wall time, CPU time, memory and row count of the code it wraps. Does nothing unless 
+    'enable_profiling()' was called. The row count can be set (or updated) through the yielded dictionary. 
+
+    Memory is recorded as the rise of the process's peak RSS during the stage (zero unless the stage needed more memory
+    than any earlier one) and, if memory is traced, as the most memory allocated by Python, NumPy and pandas at any
+    point of the stage on top of what was allocated when it started (None otherwise).
+    Stages can be nested (e.g., a profiled function that calls another): each record holds its 'depth' (0 for
+    outermost stages) and 'parent' stage, and a parent's figures include those of its children, so totals should be
+    taken over depth-0 stages only.
+
+    Parameters:
+    stage -- the stage's name (e.g., "anova") (type: str)
+    rows -- the number of data rows the stage works on, if known (type: int or None)
+    """
+
+    if not profiling["enabled"]:
+        yield {}
+        return
+    open_stages = profiling["open_stages"]
+    record = {"stage": stage,
+              "subject": profiling["subject"],
+              "depth": len(open_stages),
+              "parent": open_stages[-1]["record"]["stage"] if open_stages else None,
+              "rows": rows}
+    open_stage = {"record": record,
+                  "peak_rss_mb": get_peak_rss_mb()}
+    if profiling["trace_memory"]:
+        allocated, peak_allocated = tracemalloc.get_traced_memory()
+        if open_stages:                                                     # the peak is reset below: keep the parent's so far
+            open_stages[-1]["peak_allocated"] = max(open_stages[-1]["peak_allocated"], peak_allocated)
+        tracemalloc.reset_peak()
+        open_stage["allocated"] = open_stage["peak_allocated"] = allocated
+    open_stages.append(open_stage)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield record
+    finally:
+        record["wall_time_s"] = time.perf_counter() - wall_start
+        record["cpu_time_s"] = time.process_time() - cpu_start
+        open_stages.pop()
+        peak_rss = get_peak_rss_mb()
+        record["peak_rss_increase_mb"] = None if peak_rss is None else peak_rss - open_stage["peak_rss_mb"]
+        record["peak_allocated_mb"] = None
+        if profiling["trace_memory"]:
+            peak_allocated = max(open_stage["peak_allocated"], tracemalloc.get_traced_memory()[1])
+            record["peak_allocated_mb"] = (peak_allocated - open_stage["allocated"])/2**20
+            if open_stages:
+                open_stages[-1]["peak_allocated"] = max(open_stages[-1]["peak_allocated"], peak_allocated)
+        profiling["records"].append(record)
+
+def profiled(function):
+    """Decorator version of 'profile_stage()'. The stage is named after the function and its row count 
+    is read from the function's output or, if the output has no rows (e.g., plots), from its first dataframe input."""
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not profiling["enabled"]:
+            return function(*args, **kwargs)
+        with profile_stage(stage=function.__name__) as record:
+            output = function(*args, **kwargs)
+            record["rows"] = count_rows(output)
+            if record["rows"] is None:
+                record["rows"] = next((count_rows(argument) for argument in [*args, *kwargs.values()] if count_rows(argument) is not None), None)
+        return output
+    return wrapper
+
+def write_timing_report(output_dir: Path):
+    """Saves all recorded stages to 'timing-report.json' and 'timing-report.csv' 
+    (plus 'timing-profile.prof', if cProfile was requested).
+
+    Parameters:
+    output_dir -- where to save the report (type: Path object)
+    """
+
+    output_dir = Path(output_dir)
+    fieldnames = ["stage", "subject", "depth", "parent", "rows", "wall_time_s", "cpu_time_s", "peak_rss_increase_mb", "peak_allocated_mb"]
+    with open(output_dir / "timing-report.json", "w") as json_file:
+        json.dump(profiling["records"], json_file, indent=1)
+    with open(output_dir / "timing-report.csv", "w", newline="") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(profiling["records"])
+    if profiling["profiler"] is not None:
+        profiling["profiler"].disable()
+        profiling["profiler"].dump_stats(output_dir / "timing-profile.prof")
+        profiling["profiler"].enable()
 
 
 def ask_sample_size():
@@ -13,6 +168,8 @@ def ask_sample_size():
     Returns
     sample_size -- the sample size inserted by the user (type: int)
     """
+
+    from tkinter import simpledialog
     
     dialog_title = "Please insert sample size"
     dialog_prompt = "How many subjects are we analysing?"
@@ -69,7 +226,15 @@ def set_figures_subdir(figures_dir: Path, subject: str | None, group: bool = Tru
         pass
     return figures_subdir
 
-def read_mant_data(data_dir: str, sample_size: int, trials_per_subject: int, data_type: str, sort_key, drop_nans: bool) -> pd.DataFrame:
+@profiled
+def read_mant_data(data_dir: str,
+                   sample_size: int,
+                   trials_per_subject: int,
+                   data_type: str,
+                   sort_key,
+                   drop_nans: bool,
+                   trials_per_block: int | None = None,
+                   validate: bool = True) -> pd.DataFrame:
     """Reads mANT data into a pandas dataframe.
     
     Parameters:
@@ -79,28 +244,45 @@ def read_mant_data(data_dir: str, sample_size: int, trials_per_subject: int, dat
     data_type -- the type of data to read (e.g., "beh" vs. "onsets") (type: str)
     sort_key -- the criterion to sort files before reading them (e.g., by run vs. by trial) (lambda function)
     drop_nans -- whether to drop nans from mANT data (type: bool)
+    trials_per_block -- the number of trials per block, to also check block lengths (type: int or None)
+    validate -- whether to check the data with 'validate_mant_data()' before dropping nans; problems are reported
+                in a warning and stored in 'all_trials.attrs["validation_report"]' (type: bool)
     
     Returns:
-    all_trials -- all mANT data found in the 'data_dir' folder (type: pd.DataFrame)
+    all_trials -- all mANT data found in the 'data_dir' folder, with subject numbers taken from file names (type: pd.DataFrame)
     """
 
     data_dir = Path(data_dir)
-    all_output_files = sorted(data_dir.rglob(f"*{data_type}*.tsv"),
+    all_output_files = sorted(find_mant_files(data_dir=data_dir,
+                                              data_type=data_type),
                               key=sort_key)
     
     all_single_trials = []
+    file_records = []
     for file in all_output_files:
         trial_dataframe = pd.read_csv(filepath_or_buffer=file,
                                       sep="\t")
+        file_record = parse_mant_file_path(file)
+        if "trial" in trial_dataframe:                                               # block files: one row per trial
+            file_records.extend(file_record | {"trial": trial} for trial in trial_dataframe.pop("trial"))
+        else:
+            file_records.append(file_record)
         all_single_trials.append(trial_dataframe)
     all_trials = pd.concat(objs=all_single_trials,
                            axis=0)
     del all_single_trials
 
-    subject_ids = np.array([[n]*trials_per_subject for n in range(1,sample_size+1)]).flatten()
+    file_index = pd.DataFrame(file_records)
+    subject_numbers = pd.to_numeric(file_index["subject"].str.removeprefix("sub-"), errors="coerce")
     all_trials.insert(loc=0,
                       column="subject",
-                      value=subject_ids)
+                      value=(subject_numbers if subject_numbers.notna().all() else file_index["subject"]).to_numpy())
+    if validate:
+        report = validate_mant_data(file_index=file_index,
+                                    all_trials=all_trials,
+                                    sample_size=sample_size,
+                                    trials_per_subject=trials_per_subject,
+                                    trials_per_block=trials_per_block)
     if drop_nans:
         with pd.option_context("future.no_silent_downcasting", True):
             all_trials.replace(to_replace="none",
@@ -108,8 +290,480 @@ def read_mant_data(data_dir: str, sample_size: int, trials_per_subject: int, dat
                                inplace=True)
         all_trials = all_trials.dropna(axis=0,
                                        how="any")
+    if validate:
+        all_trials.attrs["validation_report"] = report.to_dict(orient="records")      # records, not a dataframe: attrs are compared when dataframes are concatenated
+        if len(report) > 0:
+            warnings.warn(f"{len(report)} data integrity problem(s) in {data_dir}:\n{report.to_string(index=False)}")
+    return all_trials
+
+valid_categories = {"cue_location": ["up","down","both"],
+                    "sequence_location": ["up","down"],
+                    "cue_type": ["spatial valid","double"],
+                    "target_congruent": ["yes","no"],
+                    "target_direction": ["left","right"],
+                    "response": ["left","right","1","6","miss","escape"],   # "1" and "6" are task-and-fmri's response box keys
+                    "correct": ["1","0","-1"],
+                    "tms_timing": ["fixed","random"]}
+valid_rt_range = (0.0, 2.0)                                                  # seconds: responses are only collected while the target is shown
+
+@profiled
+def validate_mant_data(file_index: pd.DataFrame,
+                       all_trials: pd.DataFrame,
+                       sample_size: int | None,
+                       trials_per_subject: int,
+                       trials_per_block: int | None = None,
+                       rt_range: tuple[float, float] = valid_rt_range) -> pd.DataFrame:
+    """Checks mANT data for aborted blocks, missing or duplicated trial files and invalid values, using whole-column
+    operations only (milliseconds for a full cohort). Checks:
+    - subject_count: number of subjects differs from 'sample_size'
+    - trial_count: a subject's number of trials differs from 'trials_per_subject'
+    - block_count: a block (or fMRI run) does not have 'trials_per_block' trials (e.g., after escape was pressed)
+    - duplicate_trial: the same trial number appears more than once for a subject and run (e.g., after a restart)
+    - trial_gap: trial numbers are missing between a subject's (or run's) first and last trial
+    - rt_out_of_range: a reaction time outside 'rt_range'
+    - invalid_<column>: a value that the task code cannot produce (see 'valid_categories'), including non-numeric reaction times
+
+    Parameters:
+    file_index -- one row per file, in the same order as 'all_trials' (see 'index_mant_files()') (type: pd.DataFrame)
+    all_trials -- the concatenated files, before nans are dropped (type: pd.DataFrame)
+    sample_size -- the expected number of subjects (not checked if None) (type: int or None)
+    trials_per_subject -- the expected number of trials per subject (type: int)
+    trials_per_block -- the expected number of trials per block (not checked if None) (type: int or None)
+    rt_range -- the lowest and highest valid reaction time in seconds (type: tuple[float])
+
+    Returns:
+    report -- one row per problem, with columns 'subject', 'block' (NaN if not block-specific), 'check', 'count' (number of
+              affected trials or files) and 'detail' (type: pd.DataFrame)
+    """
+
+    problems = []
+    def add_problems(subjects, checks, counts, details, blocks=np.nan):
+        problems.append(pd.DataFrame({"subject": np.asarray(subjects),
+                                      "block": blocks,
+                                      "check": checks,
+                                      "count": np.asarray(counts),
+                                      "detail": np.asarray(details)}))
+
+    subjects = file_index["subject"].to_numpy()
+    trials_per_found_subject = file_index.groupby("subject").size()
+    if sample_size is not None and len(trials_per_found_subject) != sample_size:
+        add_problems(subjects=[None],
+                     checks="subject_count",
+                     counts=[len(trials_per_found_subject)],
+                     details=[f"{len(trials_per_found_subject)} subjects found, {sample_size} expected"])
+    wrong_counts = trials_per_found_subject[trials_per_found_subject != trials_per_subject]
+    add_problems(subjects=wrong_counts.index,
+                 checks="trial_count",
+                 counts=wrong_counts.to_numpy(),
+                 details=[f"{count} trials, {trials_per_subject} expected" for count in wrong_counts])
+
+    runs = file_index["run"].astype(float).fillna(-1).to_numpy()
+    trial_numbers = file_index["trial"].to_numpy()
+    if trials_per_block is not None:
+        blocks = np.where(runs >= 0, runs, trial_numbers//trials_per_block + 1).astype(int)
+        all_blocks = pd.MultiIndex.from_product([trials_per_found_subject.index, range(1, trials_per_subject//trials_per_block + 1)])
+        block_sizes = pd.Series(blocks).groupby([subjects, blocks]).size()
+        block_sizes = block_sizes.reindex(all_blocks.union(block_sizes.index), fill_value=0)   # aborted sessions leave whole blocks empty
+        wrong_sizes = block_sizes[block_sizes != trials_per_block]
+        add_problems(subjects=wrong_sizes.index.get_level_values(0),
+                     blocks=wrong_sizes.index.get_level_values(1),
+                     checks="block_count",
+                     counts=wrong_sizes.to_numpy(),
+                     details=[f"{count} trials, {trials_per_block} expected" for count in wrong_sizes])
+
+    trial_keys = pd.DataFrame({"subject": subjects, "run": runs, "trial": trial_numbers})
+    duplicates = trial_keys.loc[trial_keys.duplicated(keep=False)].groupby("subject")["trial"]
+    add_problems(subjects=duplicates.size().index,
+                 checks="duplicate_trial",
+                 counts=duplicates.size().to_numpy(),
+                 details=[f"trials {sorted(set(trials.tolist()))}" for trials in duplicates.unique()])
+    trial_ranges = trial_keys.groupby(["subject","run"])["trial"].agg(["min","max","nunique"])
+    gaps = trial_ranges["max"] - trial_ranges["min"] + 1 - trial_ranges["nunique"]
+    gaps = gaps[gaps > 0]
+    add_problems(subjects=gaps.index.get_level_values("subject"),
+                 blocks=np.where(gaps.index.get_level_values("run") >= 0, gaps.index.get_level_values("run"), np.nan),
+                 checks="trial_gap",
+                 counts=gaps.to_numpy(),
+                 details=[f"trials {first}-{last} with {count} missing" for first, last, count in zip(trial_ranges.loc[gaps.index, "min"],
+                                                                                                       trial_ranges.loc[gaps.index, "max"],
+                                                                                                       gaps)])
+
+    if "rt" in all_trials:
+        raw_reaction_times = all_trials["rt"].to_numpy()
+        reaction_times = pd.to_numeric(all_trials["rt"], errors="coerce").to_numpy(dtype=float)
+        for check, is_problem in [("rt_out_of_range", (reaction_times <= rt_range[0]) | (reaction_times > rt_range[1])),
+                                  ("invalid_rt", np.isnan(reaction_times) & (raw_reaction_times.astype(str) != "none"))]:
+            problem_counts = pd.Series(is_problem).groupby(subjects).sum()
+            problem_counts = problem_counts[problem_counts > 0]
+            add_problems(subjects=problem_counts.index,
+                         checks=check,
+                         counts=problem_counts.to_numpy(),
+                         details=f"valid range: {rt_range[0]}-{rt_range[1]} s" if check == "rt_out_of_range" else "neither a number nor 'none'")
+    for column, valid_values in valid_categories.items():
+        if column not in all_trials:
+            continue
+        values = all_trials[column].astype(str)
+        is_invalid = ~values.isin(valid_values).to_numpy()                   # a hash lookup: much faster than 'np.isin()' on strings
+        if not is_invalid.any():
+            continue
+        invalid_values = pd.Series(values.to_numpy()[is_invalid]).groupby(subjects[is_invalid])
+        add_problems(subjects=invalid_values.size().index,
+                     checks=f"invalid_{column}",
+                     counts=invalid_values.size().to_numpy(),
+                     details=[f"values {sorted(unique_values)}" for unique_values in invalid_values.unique()])
+
+    report = pd.concat(objs=problems, axis=0, ignore_index=True)
+    return report.astype({"count": int})
+
+def read_mant_data_from_warehouse(database_path: str, drop_nans: bool, **filters) -> pd.DataFrame:
+    """Reads mANT data from an SQLite database built by analysis_warehouse.py, letting SQLite do the filtering
+    (e.g., experiment="eeg-tms", block=(7,9), tms_timing="random"; see 'TrialWarehouse.select()').
+
+    Parameters:
+    database_path -- the path to the database (type: str)
+    drop_nans -- whether to drop missed trials (i.e., trials without a reaction time) (type: bool)
+    filters -- column=value, column=[values] or column=(low, high)
+
+    Returns:
+    all_trials -- the matching trials, one per row (type: pd.DataFrame)
+    """
+
+    from analysis_warehouse import TrialWarehouse
+
+    warehouse = TrialWarehouse(database_path=database_path)
+    all_trials = warehouse.select(**filters)
+    warehouse.close()
+    if drop_nans:
+        all_trials = all_trials.dropna(axis=0,
+                                       subset=["rt"])
     return all_trials
 
+def count_subjects(data_dir: str) -> int:
+    """Counts the subject folders (i.e., 'sub-xx') found in a data folder.
+
+    Parameters:
+    data_dir -- the path to the folder that stores mANT data (type: str)
+
+    Returns:
+    sample_size -- the number of subject folders (type: int)
+    """
+
+    return len([folder for folder in Path(data_dir).glob("sub-*") if folder.is_dir()])
+
+def find_mant_files(data_dir: str, data_type: str) -> list[Path]:
+    """Lists mANT output files of one type: one file per trial (e.g., 'sub-01_task-mANT_beh_12.tsv') or per block
+    (e.g., 'sub-01_task-mANT_beh_block-01.tsv', written by the task's 'TrialWriter'). Training blocks are left out,
+    as they are when training files are overwritten by experimental ones.
+
+    Parameters:
+    data_dir -- the path to the folder that stores mANT data (type: str)
+    data_type -- the type of data to list (e.g., "beh" vs. "onsets") (type: str)
+
+    Returns:
+    files -- the files, in no particular order (type: list[Path])
+    """
+
+    return [file for file in Path(data_dir).rglob(f"*_{data_type}_*.tsv") if not file.stem.endswith("_block-training")]
+
+def parse_mant_file_path(file: Path) -> dict:
+    """Reads subject, session, run and trial number off an mANT output file's path (see 'index_mant_files()').
+    Block files hold several trials, so their trial number is None."""
+
+    name_parts = file.stem.split("_")
+    run_parts = [part for part in name_parts if part.startswith("run-")]
+    session_parts = [part for part in file.parent.parts if part.startswith("ses-")]
+    return {"path": file,
+            "subject": name_parts[0],
+            "session": session_parts[-1].removeprefix("ses-") if session_parts else None,
+            "run": int(run_parts[0].removeprefix("run-")) if run_parts else None,
+            "trial": None if name_parts[-1].startswith("block-") else int(name_parts[-1])}
+
+def index_mant_files(data_dir: str, data_type: str) -> pd.DataFrame:
+    """Lists mANT output files together with what their paths say about them, e.g.
+    'sub-01/ses-eeg/beh/sub-01_task-mANT_beh_12.tsv' or 'sub-01/ses-mri/run-01/beh/sub-01_task-mANT_run-01_beh_12.tsv'.
+
+    Parameters:
+    data_dir -- the path to the folder that stores mANT data (type: str)
+    data_type -- the type of data to list (e.g., "beh" vs. "onsets") (type: str)
+
+    Returns:
+    file_index -- one row per trial, with columns 'path', 'subject' (e.g., "sub-01"), 'session' (e.g., "eeg"),
+                  'run' (None outside fMRI sessions) and 'trial' (the trial number); block files take one row
+                  per trial, with trial numbers read from their 'trial' column (type: pd.DataFrame)
+    """
+
+    records = []
+    for file in find_mant_files(data_dir=data_dir,
+                                data_type=data_type):
+        record = parse_mant_file_path(file)
+        if record["trial"] is None:
+            trial_numbers = pd.read_csv(filepath_or_buffer=file, sep="\t", usecols=["trial"])["trial"]
+            records.extend(record | {"trial": trial} for trial in trial_numbers)
+        else:
+            records.append(record)
+    file_index = pd.DataFrame(records, columns=["path","subject","session","run","trial"])
+    return file_index.sort_values(by=["subject","session","run","trial"], na_position="first").reset_index(drop=True)
+
+def read_single_row_files(files: list[Path]) -> pd.DataFrame:
+    """Reads many one-row .tsv files (e.g., one trial each, with identical headers) into a single dataframe.
+    Values are kept as strings; this is much faster than one 'pd.read_csv()' call per file.
+    Block files are read once even if listed once per trial (as in 'index_mant_files()'), and their 'trial' column is
+    dropped, so that both layouts give the same columns.
+
+    Parameters:
+    files -- the files to read, in the desired row order (type: list[Path])
+
+    Returns:
+    rows -- one row per file (type: pd.DataFrame)
+    """
+
+    rows = []
+    for file in dict.fromkeys(files):
+        with open(file, newline="") as tsv_file:
+            rows.extend(csv.DictReader(tsv_file, delimiter="\t"))
+    return pd.DataFrame(rows).drop(columns="trial", errors="ignore")
+
+def stream_mant_data(data_dir: str, data_type: str, sort_key, drop_nans: bool):
+    """Reads mANT data one subject at a time, so that only one subject's trials are in memory at once.
+
+    Parameters:
+    data_dir -- the path to the folder that stores mANT data, with one 'sub-xx' folder per subject (type: str)
+    data_type -- the type of data to read (e.g., "beh" vs. "onsets") (type: str)
+    sort_key -- the criterion to sort one subject's files before reading them (function)
+    drop_nans -- whether to drop nans from mANT data (type: bool)
+
+    Yields:
+    subject_trials -- one subject's mANT data, with their 'sub-xx' label in the 'subject' column (type: pd.DataFrame)
+    """
+
+    for subject_dir in sorted(folder for folder in Path(data_dir).glob("sub-*") if folder.is_dir()):
+        subject_files = sorted(find_mant_files(data_dir=subject_dir,
+                                               data_type=data_type),
+                               key=sort_key)
+        if not subject_files:
+            continue
+        subject_trials = pd.concat(objs=[pd.read_csv(filepath_or_buffer=file, sep="\t") for file in subject_files],
+                                   axis=0).drop(columns="trial", errors="ignore")
+        subject_trials.insert(loc=0,
+                              column="subject",
+                              value=subject_dir.name)
+        if drop_nans:
+            with pd.option_context("future.no_silent_downcasting", True):
+                subject_trials.replace(to_replace="none",
+                                       value=np.nan,
+                                       inplace=True)
+            subject_trials = subject_trials.dropna(axis=0,
+                                                   how="any")
+        yield subject_trials
+
+@profiled
+def read_mant_data_streamed(data_dir: str, data_type: str, sort_key, drop_nans: bool) -> StreamingDescriptives:
+    """Accumulates group-level descriptives subject by subject, without ever holding the whole trial table.
+    The result can replace the list of condition dataframes in 'get_condition_descriptives()', in boxplots made by
+    'plot_reaction_times()', and in 'plot_compact_boxplots()' (see analysis_streaming.py for error bounds).
+
+    Parameters:
+    see 'stream_mant_data()'
+
+    Returns:
+    accumulator -- the accumulated statistics (type: StreamingDescriptives)
+    """
+
+    accumulator = StreamingDescriptives()
+    for subject_trials in stream_mant_data(data_dir=data_dir,
+                                           data_type=data_type,
+                                           sort_key=sort_key,
+                                           drop_nans=drop_nans):
+        accumulator.update(trials=subject_trials)
+    return accumulator
+
+def get_cache_file(cache_dir: str, data_dir: str, data_type: str, reading_parameters: tuple) -> Path:
+    """Names the cache file of one ingest after a fingerprint of its input files (paths, sizes, modification times)
+    and reading parameters, so that any change to either leads to a new cache file.
+
+    Parameters:
+    cache_dir -- the path to the cache folder (type: str)
+    data_dir -- the path to the folder that stores mANT data (type: str)
+    data_type -- the type of data to read (e.g., "beh" vs. "onsets") (type: str)
+    reading_parameters -- everything else that affects the ingest's output (type: tuple)
+
+    Returns:
+    cache_file -- the path to the (possibly not yet existing) cache file (type: Path)
+    """
+
+    all_output_files = sorted(find_mant_files(data_dir=data_dir,
+                                              data_type=data_type))
+    fingerprint = hashlib.sha256()
+    fingerprint.update(repr((str(Path(data_dir).resolve()), data_type) + reading_parameters).encode())
+    for file in all_output_files:
+        file_status = file.stat()
+        fingerprint.update(f"{file}|{file_status.st_size}|{file_status.st_mtime_ns}".encode())
+    return Path(cache_dir) / f"{data_type}-{fingerprint.hexdigest()[:16]}.pkl"
+
+def write_cache_file(cache_file: Path, table: pd.DataFrame):
+    """Pickles a table to the cache (write-then-rename, so that concurrent readers never see half a file)."""
+
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    temporary_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    table.to_pickle(temporary_file)
+    os.replace(temporary_file, cache_file)
+
+@profiled
+def read_mant_data_cached(cache_dir: str,
+                          data_dir: str,
+                          sample_size: int,
+                          trials_per_subject: int,
+                          data_type: str,
+                          sort_key,
+                          drop_nans: bool,
+                          trials_per_block: int | None = None) -> pd.DataFrame:
+    """Same as 'read_mant_data()', but stores its output in a cache folder and reuses it
+    for as long as the input files (and reading parameters) stay the same.
+    The cache can be shared by any number of experiments and invocations.
+
+    Parameters:
+    cache_dir -- the path to the cache folder (type: str)
+    other parameters -- see 'read_mant_data()'
+
+    Returns:
+    all_trials -- all mANT data found in the 'data_dir' folder (type: pd.DataFrame)
+    """
+
+    cache_file = get_cache_file(cache_dir=cache_dir,
+                                data_dir=data_dir,
+                                data_type=data_type,
+                                reading_parameters=(sample_size, trials_per_subject, sort_key.__qualname__, drop_nans, trials_per_block))
+    if cache_file.is_file():
+        return pd.read_pickle(cache_file)
+
+    all_trials = read_mant_data(data_dir=data_dir,
+                                sample_size=sample_size,
+                                trials_per_subject=trials_per_subject,
+                                data_type=data_type,
+                                sort_key=sort_key,
+                                drop_nans=drop_nans,
+                                trials_per_block=trials_per_block)
+    write_cache_file(cache_file=cache_file,
+                     table=all_trials)
+    return all_trials
+
+@profiled
+def read_trial_table(data_dir: str, data_type: str, trials_per_block: int) -> pd.DataFrame:
+    """Reads mANT data together with what file paths say about each trial (see 'index_mant_files()').
+    Unlike 'read_mant_data()', it needs no sample size or number of trials: subjects are labelled by their folders,
+    and sessions of any length are read as they are.
+
+    Parameters:
+    data_dir -- the path to the folder that stores mANT data (type: str)
+    data_type -- the type of data to read (e.g., "beh" vs. "onsets") (type: str)
+    trials_per_block -- the number of trials per block (ignored for fMRI data, where blocks are runs) (type: int)
+
+    Returns:
+    trial_table -- one row per trial, with 'subject', 'session', 'run', 'block' (from 1) and 'trial' columns
+                   before the file's own columns; 'rt' is numeric (NaN for misses) (type: pd.DataFrame)
+    """
+
+    file_index = index_mant_files(data_dir=data_dir,
+                                  data_type=data_type)
+    trial_table = read_single_row_files(files=list(file_index["path"]))
+    runs = pd.to_numeric(file_index["run"])
+    file_index["block"] = np.where(runs.isna(),
+                                   file_index["trial"]//trials_per_block + 1,
+                                   runs.fillna(0)).astype(int)
+    trial_table = pd.concat(objs=[file_index[["subject","session","run","block","trial"]], trial_table],
+                            axis=1)
+    for column in ["rt","correct"]:
+        if column in trial_table:
+            trial_table[column] = pd.to_numeric(trial_table[column], errors="coerce")
+    return trial_table
+
+def read_trial_table_cached(cache_dir: str, data_dir: str, data_type: str, trials_per_block: int) -> pd.DataFrame:
+    """Same as 'read_trial_table()', but cached like 'read_mant_data_cached()'."""
+
+    cache_file = get_cache_file(cache_dir=cache_dir,
+                                data_dir=data_dir,
+                                data_type=data_type,
+                                reading_parameters=("trial-table", trials_per_block))
+    if cache_file.is_file():
+        return pd.read_pickle(cache_file)
+    trial_table = read_trial_table(data_dir=data_dir,
+                                   data_type=data_type,
+                                   trials_per_block=trials_per_block)
+    write_cache_file(cache_file=cache_file,
+                     table=trial_table)
+    return trial_table
+
+def find_record_files(data_dir: str) -> list[Path]:
+    """Lists the binary trial records saved by the task code next to its .tsv files, one '.npy' file per block
+    (e.g., 'sub-01_task-mANT_records_block-01.npy'). Training blocks are left out.
+
+    Parameters:
+    data_dir -- the path to the folder that stores mANT data (type: str)
+
+    Returns:
+    files -- the files, sorted by path (type: list[Path])
+    """
+
+    return sorted(file for file in Path(data_dir).rglob("*_records_block-*.npy") if not file.stem.endswith("_block-training"))
+
+@profiled
+def read_trial_records(data_dir: str) -> pd.DataFrame:
+    """Reads the binary trial records saved by the task code (see 'find_record_files()'). Each file is memory-mapped
+    (i.e., only the fields used are read from disk) and its category codes are turned into labels with the session's
+    schema file (e.g., 'sub-01_task-mANT_records.json', which lists field types and labels in code order).
+
+    Parameters:
+    data_dir -- the path to the folder that stores mANT data (type: str)
+
+    Returns:
+    trial_table -- one row per trial, with 'subject', 'session', 'run', 'block' and 'trial' columns before the records'
+                   own fields, as in 'read_trial_table()'; 'correct' is an integer and times are floats (NaN for misses) (type: pd.DataFrame)
+    """
+
+    files = find_record_files(data_dir=data_dir)
+    if len(files) == 0:
+        raise FileNotFoundError(f"No trial records ('*_records_block-*.npy') found in {data_dir}")
+    records = [np.load(file, mmap_mode="r") for file in files]
+    if len({block_records.dtype for block_records in records}) > 1:
+        raise ValueError(f"Trial records in {data_dir} do not share one schema (e.g., they come from different task variants)")
+    schema_file = files[0].with_name(files[0].name.split("_block-")[0] + ".json")
+    with open(schema_file) as json_file:
+        codes = json.load(json_file)["codes"]
+
+    file_rows = np.repeat(np.arange(len(files)), [len(block_records) for block_records in records])
+    trial_table = pd.DataFrame([parse_mant_file_path(file) for file in files]).loc[file_rows, ["subject","session","run"]].reset_index(drop=True)
+    for field in records[0].dtype.names:
+        values = np.concatenate([block_records[field] for block_records in records])
+        trial_table[field] = np.asarray(codes[field], dtype=object)[values] if field in codes else values
+    return trial_table
+
+def compute_network_effects(mant_data: pd.DataFrame) -> pd.DataFrame:
+    """Computes each subject's network effects (i.e., differences between mean reaction times):
+    - orienting: double cue minus spatially valid cue
+    - conflict: incongruent minus congruent target
+    - interaction: conflict effect after double cues minus conflict effect after valid cues
+
+    Parameters:
+    mant_data -- a dataframe containing mANT data (type: pd.DataFrame)
+
+    Returns:
+    network_effects -- one row per subject, one column per effect (type: pd.DataFrame)
+    """
+
+    condition_means = mant_data.astype({"rt": "float"}).pivot_table(index="subject",
+                                                                   columns=["cue_type","target_congruent"],
+                                                                   values="rt",
+                                                                   aggfunc="mean")
+    double_cue = condition_means["double"]
+    valid_cue = condition_means["spatial valid"]
+    network_effects = pd.DataFrame({"orienting": double_cue.mean(axis=1) - valid_cue.mean(axis=1),
+                                    "conflict": (condition_means.xs("no", axis=1, level="target_congruent").mean(axis=1)
+                                                 - condition_means.xs("yes", axis=1, level="target_congruent").mean(axis=1)),
+                                    "interaction": (double_cue["no"] - double_cue["yes"]) - (valid_cue["no"] - valid_cue["yes"])})
+    network_effects.columns.name = None
+    return network_effects.reset_index()
+
+@profiled
 def fetch_mant_conditions(all_trials: pd.DataFrame, pure: bool) -> list[pd.DataFrame]:
     """Extracts condition-specific data from a dataframe that contains data from the whole experiment.
     
@@ -136,17 +790,21 @@ def fetch_mant_conditions(all_trials: pd.DataFrame, pure: bool) -> list[pd.DataF
                               inplace=True)
     return conditions
 
-def get_condition_descriptives(conditions: list[pd.DataFrame], condition_names: list[str]) -> pd.DataFrame: 
+@profiled
+def get_condition_descriptives(conditions: list[pd.DataFrame] | StreamingDescriptives, condition_names: list[str]) -> pd.DataFrame: 
     """Computes mean and standard deviation (for reaction times) and accuracy percentage on mANT data.
     
     Parameters:
-    conditions -- a list of dataframes, each one containing data for one condition (type: list[pd.DataFrame])
+    conditions -- a list of dataframes, each one containing data for one condition, or the output of 'read_mant_data_streamed()'
+                  (type: list[pd.DataFrame] or StreamingDescriptives)
     condition_names -- a list containing the names of each condition (type: list[str])
 
     Returns:
     descriptives_dataframe -- a dataframe that collects all computed statistics (type: pd.DataFrame) 
     """
     
+    if isinstance(conditions, StreamingDescriptives):
+        return conditions.descriptives(condition_names=condition_names)
     descriptives_dataframe = pd.DataFrame(index=range(len(conditions)),
                                           columns=["condition","accuracy", "mean_rt", "rt_std"])
     for condition_number, condition in enumerate(conditions):
@@ -160,8 +818,9 @@ def get_condition_descriptives(conditions: list[pd.DataFrame], condition_names:
         descriptives_dataframe.iloc[condition_number] = pd.Series({key:value for key, value in zip(descriptives_dataframe.columns, descriptives)})
     return descriptives_dataframe
 
+@profiled
 def plot_reaction_times(title: str, 
-                        conditions: list[pd.DataFrame],
+                        conditions: list[pd.DataFrame] | StreamingDescriptives,
                         condition_names: list[str],
                         figures_savedir: Path,
                         plot_type: str):
@@ -169,12 +828,19 @@ def plot_reaction_times(title: str,
     
     Parameters:
     title -- the graph's desired title (type: str)
-    conditions -- a list of dataframes, each one containing data for one condition (type: list[pd.DataFrame])
+    conditions -- a list of dataframes, each one containing data for one condition, or (boxplots only)
+                  the output of 'read_mant_data_streamed()' (type: list[pd.DataFrame] or StreamingDescriptives)
     condition_names -- a list containing the names of each condition (type: list[str])
     figures_savedir -- where to save the output (type: Path object)
     plot_type -- whether the plot should be 'line', 'histogram', or 'boxplot' (type: str) 
     """
 
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    streamed = isinstance(conditions, StreamingDescriptives)
+    if streamed and plot_type != "boxplot":
+        raise ValueError("Streamed statistics can only be plotted as boxplots")
     plt.rcParams["font.family"] = "monospace"
     fig, axs = plt.subplots(nrows=2,
                             ncols=2,
@@ -222,10 +888,18 @@ def plot_reaction_times(title: str,
                               alpha=.6)   
         elif plot_type == "boxplot":
             plot_filename = "rt-boxplots.pdf"
-            sns.boxplot(data=conditions[i],
-                        y=conditions[i]["rt"],
-                        ax=current_axis,
-                        width=0.15)
+            if streamed:
+                current_axis.bxp(bxpstats=conditions.boxplot_stats(condition_names=condition_names)[i:i+1],
+                                 widths=0.15,
+                                 patch_artist=True,
+                                 boxprops={"facecolor": "tab:blue"},
+                                 medianprops={"color": "black"})
+                current_axis.set(xticks=[])
+            else:
+                sns.boxplot(data=conditions[i],
+                            y=conditions[i]["rt"],
+                            ax=current_axis,
+                            width=0.15)
             current_axis.set(ylabel="")
         else:
             raise ValueError("'plot_type' can only be 'line', 'histogram', or 'boxplot'")    
@@ -238,7 +912,8 @@ def plot_reaction_times(title: str,
                 bbox_inches="tight")
     plt.close()
 
-def plot_compact_boxplots(separate_conditions_data: pd.DataFrame,
+@profiled
+def plot_compact_boxplots(separate_conditions_data: pd.DataFrame | StreamingDescriptives,
                           group: bool,
                           sample_size: int,
                           subject_id: str,
@@ -246,12 +921,22 @@ def plot_compact_boxplots(separate_conditions_data: pd.DataFrame,
     """Creates compact boxplots to compare RTs across cue and target conditions
     
     Parameters:
-    all_ordered_data -- a dataframe containing mANT data in long format (pd.DataFrame)
+    all_ordered_data -- a dataframe containing mANT data in long format (pd.DataFrame),
+                        or the output of 'read_mant_data_streamed()' (type: StreamingDescriptives)
     """
 
-    all_ordered_data = pd.concat(objs=separate_conditions_data,
-                                 axis=0)
-    all_ordered_data["target_congruent"] = all_ordered_data["target_congruent"].map({"yes": "congruent", "no": "incongruent"})
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    streamed = isinstance(separate_conditions_data, StreamingDescriptives)
+    if streamed:
+        condition_stats = {(cue_type, {"yes": "congruent", "no": "incongruent"}[target_congruent]): box_stats
+                           for (cue_type, target_congruent), box_stats in zip(StreamingDescriptives.condition_keys,
+                                                                              separate_conditions_data.boxplot_stats(condition_names=["VC","VI","DC","DI"]))}
+    else:
+        all_ordered_data = pd.concat(objs=separate_conditions_data,
+                                     axis=0)
+        all_ordered_data["target_congruent"] = all_ordered_data["target_congruent"].map({"yes": "congruent", "no": "incongruent"})
     for x, hue in zip(["cue_type","target_congruent"],["target_congruent","cue_type"]):
         if hue == "target_congruent":
             order = ["spatial valid", "double"]
@@ -262,17 +947,30 @@ def plot_compact_boxplots(separate_conditions_data: pd.DataFrame,
             my_palette = {"spatial valid": "palegreen", "double": "tomato"}
             hue_order = ["spatial valid", "double"]
         _, ax = plt.subplots(figsize=(12,8))
-        sns.boxplot(data=all_ordered_data,
-                    x=x,
-                    y="rt",
-                    hue=hue,
-                    order=order,
-                    hue_order=hue_order,
-                    palette=my_palette,
-                    saturation=0.8,
-                    width=0.5,
-                    linewidth=2,
-                    legend=True)
+        if streamed:
+            for hue_number, hue_level in enumerate(hue_order):
+                box_stats = [condition_stats[(level, hue_level) if x == "cue_type" else (hue_level, level)] for level in order]
+                boxes = ax.bxp(bxpstats=box_stats,
+                               positions=np.arange(len(order)) + (hue_number - 0.5)*0.25,
+                               widths=0.2,
+                               patch_artist=True,
+                               boxprops={"facecolor": my_palette[hue_level], "linewidth": 2},
+                               medianprops={"color": "black", "linewidth": 2})
+                boxes["boxes"][0].set_label(hue_level)
+            ax.set_xticks(ticks=np.arange(len(order)),
+                          labels=order)
+        else:
+            sns.boxplot(data=all_ordered_data,
+                        x=x,
+                        y="rt",
+                        hue=hue,
+                        order=order,
+                        hue_order=hue_order,
+                        palette=my_palette,
+                        saturation=0.8,
+                        width=0.5,
+                        linewidth=2,
+                        legend=True)
         ax.set_xlabel(xlabel="Cue type" if x == "cue_type" else "Target type",
                     fontsize=12,
                     fontweight="bold");
@@ -292,6 +990,7 @@ def plot_compact_boxplots(separate_conditions_data: pd.DataFrame,
                         bbox_inches="tight")  
             plt.close()  
 
+@profiled
 def plot_rt_over_conditions(conditions: list[pd.DataFrame], 
                             condition_names: list[str],
                             data_id: str,
@@ -307,6 +1006,8 @@ def plot_rt_over_conditions(conditions: list[pd.DataFrame],
     figures_savedir -- where to save the output (type: Path object)
     """
 
+    import matplotlib.pyplot as plt
+
     mean_rt_per_condition = np.empty(shape=(len(conditions)))
     std_deviation_per_condition = np.empty(shape=(len(conditions)))
     for condition_number, condition in enumerate(conditions):
@@ -350,6 +1051,7 @@ def plot_rt_over_conditions(conditions: list[pd.DataFrame],
                 bbox_inches="tight")  
     plt.close()  
 
+@profiled
 def order_conditions_blockwise(mant_data: pd.DataFrame,
                                condition_names: list[str],
                                number_of_blocks: int,
@@ -388,6 +1090,7 @@ def order_conditions_blockwise(mant_data: pd.DataFrame,
     return blockwise_ordered_rts
    
 
+@profiled
 def plot_blockwise_boxplots(nrows: int,
                             ncols: int,
                             data_id: str,
@@ -404,6 +1107,9 @@ def plot_blockwise_boxplots(nrows: int,
     figures_savedir -- where to save the output (type: Path object)
     """
 
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     plt.rcParams["font.family"] = "monospace"
     fig, axs = plt.subplots(nrows=nrows,
                             ncols=ncols,
@@ -440,6 +1146,7 @@ def plot_blockwise_boxplots(nrows: int,
                 bbox_inches="tight")  
     plt.close()  
     
+@profiled
 def get_only_cues_and_targets(mant_data: pd.DataFrame) -> pd.DataFrame:
     """Extracts reaction times, cue, and target information from mANT data.
     
@@ -461,6 +1168,7 @@ def get_only_cues_and_targets(mant_data: pd.DataFrame) -> pd.DataFrame:
                              inplace=True)
     return ordered_data
 
+@profiled
 def plot_target_cue_interactions(mant_data: pd.DataFrame, 
                                  data_id: str,
                                  specific_jitter: float | None,
@@ -478,6 +1186,9 @@ def plot_target_cue_interactions(mant_data: pd.DataFrame,
     figures_savedir -- where to save the output (type: Path object)
     """
 
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     plt.rcParams["font.family"] = "monospace"
     _, ax = plt.subplots(figsize=(12,8))
     if on_x_axis == "targets":
@@ -538,6 +1249,138 @@ def plot_target_cue_interactions(mant_data: pd.DataFrame,
                 bbox_inches="tight") 
     plt.close()
     
+jitter_column_aliases = {"pre_cue": "pre_cue_jitter",                               # task-and-fmri's names for task-only's jitter columns
+                         "post_cue": "post_cue_jitter"}
+
+def get_jitter_data(mant_data: pd.DataFrame) -> pd.DataFrame:
+    """Returns mANT data with numeric 'rt', 'pre_cue_jitter' and 'post_cue_jitter' columns (whatever the task variant called them).
+
+    Parameters:
+    mant_data -- a dataframe containing task-only or task-and-fmri data (type: pd.DataFrame)
+
+    Returns:
+    jitter_data -- the same trials, with standardised jitter columns (type: pd.DataFrame)
+    """
+
+    jitter_data = mant_data.rename(columns=jitter_column_aliases)
+    if not {"pre_cue_jitter","post_cue_jitter"} <= set(jitter_data.columns):
+        raise ValueError("These data have no jitter columns (only task-only and task-and-fmri outputs do)")
+    return jitter_data.astype({"rt": "float", "pre_cue_jitter": "float", "post_cue_jitter": "float"})
+
+@profiled
+def compute_jitter_statistics(mant_data: pd.DataFrame, jitter_column: str) -> pd.DataFrame:
+    """Computes cue x target x jitter statistics for all jitter levels at once: subject means first,
+    then their group mean and standard error.
+
+    Parameters:
+    mant_data -- a dataframe containing task-only or task-and-fmri data (type: pd.DataFrame)
+    jitter_column -- either "pre_cue_jitter" or "post_cue_jitter" (type: str)
+
+    Returns:
+    jitter_statistics -- one row per jitter level x cue type x target congruency, with columns 'mean_rt', 'sem_rt',
+                         'accuracy', 'trials' and 'subjects' (type: pd.DataFrame)
+    """
+
+    jitter_data = get_jitter_data(mant_data=mant_data)
+    subject_means = jitter_data.groupby(["subject", jitter_column, "cue_type", "target_congruent"]).agg(rt=("rt","mean"),
+                                                                                                       correct=("correct","mean"),
+                                                                                                       trials=("rt","size"))
+    jitter_statistics = subject_means.groupby(level=[jitter_column, "cue_type", "target_congruent"]).agg(mean_rt=("rt","mean"),
+                                                                                                        sem_rt=("rt","sem"),
+                                                                                                        accuracy=("correct","mean"),
+                                                                                                        trials=("trials","sum"),
+                                                                                                        subjects=("rt","size"))
+    jitter_statistics["accuracy"] *= 100
+    return jitter_statistics.reset_index()
+
+@profiled
+def compute_foreperiod_slopes(mant_data: pd.DataFrame, jitter_column: str = "post_cue_jitter") -> pd.DataFrame:
+    """Fits one least-squares line (RT vs. jitter) per subject, all subjects at once (from grouped sums).
+    With 'post_cue_jitter', the slope is the foreperiod effect (change in RT per second of cue-target interval).
+
+    Parameters:
+    mant_data -- a dataframe containing task-only or task-and-fmri data (type: pd.DataFrame)
+    jitter_column -- either "pre_cue_jitter" or "post_cue_jitter" (type: str)
+
+    Returns:
+    slopes -- one row per subject, with columns 'slope' (s/s), 'intercept' (s) and 'trials' (type: pd.DataFrame)
+    """
+
+    jitter_data = get_jitter_data(mant_data=mant_data)
+    x = jitter_data[jitter_column]
+    y = jitter_data["rt"]
+    sums = pd.DataFrame({"subject": jitter_data["subject"], "x": x, "y": y, "xx": x*x, "xy": x*y}).groupby("subject").sum()
+    trials = jitter_data.groupby("subject").size()
+    slope = (trials*sums["xy"] - sums["x"]*sums["y"])/(trials*sums["xx"] - sums["x"]**2)
+    return pd.DataFrame({"slope": slope,
+                         "intercept": (sums["y"] - slope*sums["x"])/trials,
+                         "trials": trials}).reset_index()
+
+@profiled
+def plot_jitter_statistics(jitter_statistics: pd.DataFrame,
+                           jitter_column: str,
+                           data_id: str,
+                           sample_size: int,
+                           figures_savedir: Path):
+    """Plots every jitter-conditioned figure from the output of 'compute_jitter_statistics()': one RT vs. jitter overview,
+    plus, for every jitter level, the cue x target interaction plots that 'plot_target_cue_interactions()' makes
+    (same titles and file names, followed by the jitter column and level).
+
+    Parameters:
+    jitter_statistics -- the output of 'compute_jitter_statistics()' (type: pd.DataFrame)
+    jitter_column -- the jitter column used to compute it (type: str)
+    data_id -- an arbitrary label for the data (e.g., "sub-01" or "group") (type: str)
+    sample_size -- the sample size (type: int)
+    figures_savedir -- where to save the output (type: Path object)
+    """
+
+    import matplotlib.pyplot as plt
+
+    plt.rcParams["font.family"] = "monospace"
+    labels = {"spatial valid": "Valid cue", "double": "Double cue", "yes": "Congruent target", "no": "Incongruent target"}
+    _, ax = plt.subplots(figsize=(12,8))
+    for (cue_type, target_congruent), condition in jitter_statistics.groupby(["cue_type","target_congruent"]):
+        ax.errorbar(x=condition[jitter_column],
+                    y=condition["mean_rt"],
+                    yerr=condition["sem_rt"],
+                    marker="o",
+                    capsize=3,
+                    label=f"{labels[cue_type]}, {labels[target_congruent].lower()}")
+    ax.set(xlabel=f"{jitter_column} (s)",
+           ylabel="Mean RT (s)",
+           title=f"Reaction time across {jitter_column} levels ({data_id}" + (f", N={int(sample_size)})" if data_id == "group" else ")"))
+    ax.legend()
+    plt.savefig(figures_savedir / f"rt-across-{jitter_column}-{data_id}.pdf",
+                bbox_inches="tight")
+    plt.close()
+
+    for jitter, level_statistics in jitter_statistics.groupby(jitter_column):
+        jitter_level = f"{jitter_column}={round(jitter, 3):g}"                    # e.g., 2.3, not 2.3000000000000003
+        for on_x_axis, x_variable, line_variable in [("cues","cue_type","target_congruent"), ("targets","target_congruent","cue_type")]:
+            _, ax = plt.subplots(figsize=(12,8))
+            x_order = ["double","spatial valid"] if x_variable == "cue_type" else ["yes","no"]
+            for line_level, line in level_statistics.groupby(line_variable):
+                line = line.set_index(x_variable).reindex(x_order)
+                ax.errorbar(x=[labels[level] for level in x_order],
+                            y=line["mean_rt"],
+                            yerr=line["sem_rt"],
+                            marker="o",
+                            capsize=3,
+                            linewidth=1.5,
+                            label=labels[line_level])
+            if data_id == "group":
+                title = f"Reaction time across {on_x_axis} ({data_id}, N={int(sample_size)}), {jitter_level}"
+            else:
+                title = f"Reaction time across {on_x_axis} ({data_id}), {jitter_level}"
+            ax.set_title(label=title,
+                         fontweight="bold")
+            ax.set_ylabel(ylabel="Mean RT (s)",
+                          fontweight="bold")
+            ax.legend()
+            plt.savefig(figures_savedir / f"rt-across-{on_x_axis}-{data_id}-{jitter_column}-{round(jitter, 3):g}.pdf",
+                        bbox_inches="tight")
+            plt.close()
+
 def separate_preceding_from_following(mant_data: pd.DataFrame) -> tuple[list]:
     """Separates preceding trials from following trials. 
     Useful to check for systematic relationships between preceding and following trial types.
@@ -657,6 +1500,7 @@ def compute_mean_preceding_conditions_counts(condition_names: list[str],
         means.append(mean_over_subjects)
     return means
 
+@profiled
 def plot_preceding_conditions_counts(condition_names: list[str], 
                                      preceding_conditions_counts, 
                                      figures_savedir: Path,
@@ -671,6 +1515,8 @@ def plot_preceding_conditions_counts(condition_names: list[str],
     figures_savedir -- where to save the output (type: Path object)
     data_id -- an arbitrary label for the data (e.g., "sub-01" or "group") (type: str)
     """
+
+    import matplotlib.pyplot as plt
     
     plt.rcParams["font.family"] = "monospace"
     fig, axs = plt.subplots(nrows=2,
@@ -0,0 +1,239 @@
+""" Optional SQLite backend: every ingested trial, from any number of experiments, in one indexed table.
+
+Once ingested, questions like "incongruent RTs in blocks 7-9 for TMS random trials across all studies" are answered by SQLite
+(with its indexes) instead of re-reading thousands of .tsv files:
+
+    warehouse = TrialWarehouse("mant-trials.sqlite")
+    warehouse.select(columns=["experiment","subject","block","rt"], target_congruent="no", block=(7,9), tms_timing="random")
+
+Filters are passed as keyword arguments: a single value means '=', a list means 'IN', a tuple means 'BETWEEN' (inclusive).
+
+Usage (ingestion of the experiments defined in analysis_config.py):
+python analysis_warehouse.py <database_path> [experiment names, default: analysis_config.batch_experiments] """
+
+import argparse
+import csv
+import sqlite3
+from pathlib import Path
+
+import pandas as pd
+
+import analysis_utils as utils
+import analysis_config as config
+from analysis_streaming import StreamingDescriptives
+
+
+trial_columns = {"experiment": "TEXT",
+                 "subject": "TEXT",
+                 "session": "TEXT",
+                 "run": "INTEGER",
+                 "block": "INTEGER",
+                 "trial": "INTEGER",
+                 "cue_location": "TEXT",
+                 "sequence_location": "TEXT",
+                 "cue_type": "TEXT",
+                 "target_congruent": "TEXT",
+                 "target_direction": "TEXT",
+                 "response": "TEXT",
+                 "correct": "INTEGER",
+                 "rt": "REAL",                                                     # NULL for missed trials
+                 "tms_timing": "TEXT",                                             # task-and-eeg-tms only
+                 "pre_cue_jitter": "REAL",                                         # task-only and task-and-fmri only
+                 "post_cue_jitter": "REAL",
+                 "source_file": "TEXT"}
+column_aliases = {"pre_cue": "pre_cue_jitter",                                     # the fMRI variant's names for the same variables
+                  "post_cue": "post_cue_jitter"}
+aggregate_functions = {"count": "COUNT({column})",
+                       "mean": "AVG({column})",
+                       "min": "MIN({column})",
+                       "max": "MAX({column})",
+                       "sum": "SUM({column})"}
+
+class TrialWarehouse:
+    """An SQLite database of mANT trials.
+
+    Parameters:
+    database_path -- the path to the database file (created if missing) (type: str or Path)
+    """
+
+    def __init__(self, database_path: str | Path):
+        self.connection = sqlite3.connect(database_path)
+        column_definitions = ", ".join(f"{column} {column_type}" for column, column_type in trial_columns.items())
+        self.connection.executescript(f"""
+            CREATE TABLE IF NOT EXISTS trials ({column_definitions});
+            CREATE TABLE IF NOT EXISTS ingested_files (source_file TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER);
+            CREATE INDEX IF NOT EXISTS trials_by_design ON trials (experiment, subject, session, run, block, cue_type, target_congruent);
+            CREATE INDEX IF NOT EXISTS trials_by_condition ON trials (cue_type, target_congruent, block);
+            CREATE INDEX IF NOT EXISTS trials_by_source_file ON trials (source_file);
+            """)
+
+    def close(self):
+        self.connection.close()
+
+    def ingest(self, experiment_config: config.ExperimentConfig) -> int:
+        """Adds an experiment's behavioural files to the database. Files that were already ingested (and have not changed since)
+        are skipped, so repeated calls only pay for new data.
+
+        Parameters:
+        experiment_config -- the experiment's settings (type: config.ExperimentConfig)
+
+        Returns:
+        ingested_files -- the number of files read (type: int)
+        """
+
+        file_index = utils.index_mant_files(data_dir=experiment_config.data_dir,
+                                            data_type="beh")
+        known_files = dict(((source_file, (size, mtime_ns)) for source_file, size, mtime_ns
+                            in self.connection.execute("SELECT source_file, size, mtime_ns FROM ingested_files")))
+        insert_trial = f"INSERT INTO trials ({', '.join(trial_columns)}) VALUES ({', '.join('?'*len(trial_columns))})"
+        ingested_files = 0
+        with self.connection:                                                         # one transaction for the whole experiment
+            for file in file_index.drop_duplicates(subset="path").itertuples(index=False):      # block files are listed once per trial
+                source_file = str(file.path)
+                file_status = file.path.stat()
+                if known_files.get(source_file) == (file_status.st_size, file_status.st_mtime_ns):
+                    continue
+                with open(file.path, newline="") as trial_file:
+                    rows = list(csv.DictReader(trial_file, delimiter="\t"))
+                run = None if pd.isna(file.run) else int(file.run)
+                self.connection.execute("DELETE FROM trials WHERE source_file = ?", (source_file,))
+                for row in rows:
+                    row = {column_aliases.get(column, column): value for column, value in row.items()}
+                    trial = int(row.pop("trial", file.trial))
+                    block = run if run is not None else trial//experiment_config.trials_per_block + 1
+                    row |= {"experiment": experiment_config.name,
+                            "subject": file.subject,
+                            "session": file.session,
+                            "run": run,
+                            "block": block,
+                            "trial": trial,
+                            "rt": None if row.get("rt") in (None, "none") else float(row["rt"]),
+                            "source_file": source_file}
+                    self.connection.execute(insert_trial, [row.get(column) for column in trial_columns])
+                self.connection.execute("INSERT OR REPLACE INTO ingested_files VALUES (?, ?, ?)",
+                                        (source_file, file_status.st_size, file_status.st_mtime_ns))
+                ingested_files += 1
+        return ingested_files
+
+    def build_where_clause(self, filters: dict) -> tuple[str, list]:
+        """Translates keyword filters into an SQL WHERE clause and its parameters."""
+
+        conditions = []
+        parameters = []
+        for column, value in filters.items():
+            if column not in trial_columns:
+                raise ValueError(f"Unknown column: '{column}'")
+            if isinstance(value, tuple):
+                conditions.append(f"{column} BETWEEN ? AND ?")
+                parameters += list(value)
+            elif isinstance(value, list):
+                conditions.append(f"{column} IN ({', '.join('?'*len(value))})")
+                parameters += value
+            elif value is None:
+                conditions.append(f"{column} IS NULL")
+            else:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        return (" WHERE " + " AND ".join(conditions)) if conditions else "", parameters
+
+    def select(self, columns: list[str] | None = None, **filters) -> pd.DataFrame:
+        """Returns the trials that match all filters.
+
+        Parameters:
+        columns -- the columns to return (all of them by default) (type: list[str] or None)
+        filters -- column=value (=), column=[values] (IN), column=(low, high) (BETWEEN)
+
+        Returns:
+        trials -- the matching trials (type: pd.DataFrame)
+        """
+
+        columns = columns or list(trial_columns)
+        for column in columns:
+            if column not in trial_columns:
+                raise ValueError(f"Unknown column: '{column}'")
+        where_clause, parameters = self.build_where_clause(filters)
+        return pd.read_sql_query(sql=f"SELECT {', '.join(columns)} FROM trials{where_clause} ORDER BY experiment, subject, session, run, trial",
+                                 con=self.connection,
+                                 params=parameters)
+
+    def aggregate(self, by: list[str], value: str = "rt", statistics: list[str] = ["count","mean"], **filters) -> pd.DataFrame:
+        """Groups matching trials and aggregates one column within SQLite. 'std' (sample standard deviation) can be requested
+        alongside the statistics in 'aggregate_functions'. It is computed in two passes (deviations from each group's
+        mean, through a window function), so that it is as accurate as pandas' (relative error ~1e-12 for reaction times).
+
+        Parameters:
+        by -- the columns to group by (type: list[str])
+        value -- the column to aggregate (type: str)
+        statistics -- the statistics to compute (type: list[str])
+        filters -- see 'select()'
+
+        Returns:
+        aggregates -- one row per group (type: pd.DataFrame)
+        """
+
+        for column in by + [value]:
+            if column not in trial_columns:
+                raise ValueError(f"Unknown column: '{column}'")
+        selected = []
+        for statistic in statistics:
+            if statistic == "std":
+                selected.append(f"SUM({value}_deviation*{value}_deviation)/(COUNT({value}) - 1) AS {value}_variance")
+            elif statistic in aggregate_functions:
+                selected.append(aggregate_functions[statistic].format(column=value) + f" AS {value}_{statistic}")
+            else:
+                raise ValueError(f"'statistics' can only contain {list(aggregate_functions) + ['std']}")
+        where_clause, parameters = self.build_where_clause(filters)
+        group_by = ", ".join(by)
+        source = f"trials{where_clause}"
+        if "std" in statistics:
+            source = f"(SELECT *, {value} - AVG({value}) OVER (PARTITION BY {group_by}) AS {value}_deviation FROM {source})"
+        aggregates = pd.read_sql_query(sql=f"SELECT {', '.join(by + selected)} FROM {source} GROUP BY {group_by} ORDER BY {group_by}",
+                                       con=self.connection,
+                                       params=parameters)
+        if "std" in statistics:
+            aggregates[f"{value}_std"] = aggregates.pop(f"{value}_variance").clip(lower=0)**0.5
+        return aggregates
+
+    def condition_descriptives(self, condition_names: list[str], **filters) -> pd.DataFrame:
+        """Returns the same table as 'analysis_utils.get_condition_descriptives()' (on data read with drop_nans=True),
+        computed within SQLite. Conditions without any trials (e.g., after filtering) get NaN. The standard deviation is
+        computed in two passes, as in 'aggregate()'.
+
+        Parameters:
+        condition_names -- the names of the four conditions, in the usual order (VC, VI, DC, DI) (type: list[str])
+        filters -- see 'select()'
+        """
+
+        where_clause, parameters = self.build_where_clause(filters)
+        descriptives_dataframe = pd.read_sql_query(
+            sql=f"""SELECT cue_type,
+                           target_congruent,
+                           100.0*SUM(correct)/COUNT(*) AS accuracy,
+                           AVG(rt) AS mean_rt,
+                           SUM(rt_deviation*rt_deviation)/(COUNT(*) - 1) AS rt_variance
+                    FROM (SELECT *, rt - AVG(rt) OVER (PARTITION BY cue_type, target_congruent) AS rt_deviation
+                          FROM trials{where_clause}{' AND' if where_clause else ' WHERE'} rt IS NOT NULL)
+                    GROUP BY cue_type, target_congruent""",
+            con=self.connection,
+            params=parameters)
+        descriptives_dataframe = (descriptives_dataframe.set_index(["cue_type","target_congruent"])
+                                                        .reindex(pd.MultiIndex.from_tuples(StreamingDescriptives.condition_keys))    # VC, VI, DC, DI, with NaN for empty cells
+                                                        .reset_index(drop=True))
+        descriptives_dataframe.insert(loc=0,
+                                      column="condition",
+                                      value=condition_names)
+        descriptives_dataframe["rt_std"] = descriptives_dataframe.pop("rt_variance").astype(float)**0.5
+        return descriptives_dataframe
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest mANT experiments into an SQLite database")
+    parser.add_argument("database_path", type=Path)
+    parser.add_argument("experiments", nargs="*", default=config.batch_experiments, help="names of experiments in analysis_config.experiments")
+    arguments = parser.parse_args()
+
+    warehouse = TrialWarehouse(database_path=arguments.database_path)
+    for experiment_name in arguments.experiments:
+        ingested_files = warehouse.ingest(experiment_config=config.experiments[experiment_name])
+        print(f"{experiment_name}: {ingested_files} new or changed files ingested")
+    warehouse.close()
@@ -0,0 +1,238 @@
+""" Scaling benchmarks for analysis_utils.py on synthetic cohorts (see synthetic_data.py).
+
+Every benchmark is timed on cohorts of increasing size. Results are saved (asv-style) as one .json file per run
+in 'benchmark-results' (ignored by git: timings are machine-specific), together with log-log scaling curves. If a baseline file exists, the script exits with status 1
+when any benchmark is slower than 'threshold' times its baseline.
+
+Usage:
+python benchmark_analysis_utils.py [--sizes 1 10 100] [--repeats 3] [--threshold 1.5] [--save-baseline]
+Larger cohorts are opt-in (e.g., '--sizes 1 10 100 1000'): reading 1000 subjects file by file means ~430,000 files per
+repeat. """
+
+import argparse
+import contextlib
+import io
+import json
+import os
+os.environ.setdefault("MPLBACKEND", "Agg")
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+import analysis_utils as utils
+import analysis_config as config
+import synthetic_data
+
+
+BENCHMARK_VARIANT = "task-and-eeg"
+NUMBER_OF_BLOCKS = synthetic_data.variants[BENCHMARK_VARIANT].number_of_blocks
+TRIALS_PER_BLOCK = synthetic_data.variants[BENCHMARK_VARIANT].trials_per_block
+results_dir = Path(__file__).resolve().parent / "benchmark-results"
+baseline_file = results_dir / "baseline.json"
+
+def get_cohort(cohorts_dir: Path, sample_size: int) -> Path:
+    """Returns the folder of a synthetic cohort of the given size, writing it on first use."""
+
+    cohort_dir = cohorts_dir / f"cohort-{sample_size}"
+    completion_marker = cohort_dir / ".complete"
+    if not completion_marker.is_file():
+        synthetic_data.write_synthetic_cohort(output_dir=cohort_dir,
+                                              variant=BENCHMARK_VARIANT,
+                                              sample_size=sample_size)
+        completion_marker.touch()
+    return cohort_dir
+
+def time_call(function, repeats: int) -> float:
+    """Returns the fastest of 'repeats' wall-clock timings of function() (in seconds)."""
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():      # some functions print summaries (or warn on tiny cohorts)
+            warnings.simplefilter("ignore")
+            function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def benchmark_cohort(cohort_dir: Path, sample_size: int, figures_dir: Path, repeats: int) -> dict[str, float]:
+    """Times every benchmarked step on one cohort.
+
+    Parameters:
+    cohort_dir -- the cohort's root folder (type: Path object)
+    sample_size -- the number of subjects in the cohort (type: int)
+    figures_dir -- where to save figures (type: Path object)
+    repeats -- how many times to repeat each timing (type: int)
+
+    Returns:
+    timings -- one timing (in seconds) per benchmark (type: dict[str, float])
+    """
+
+    from statsmodels.stats.anova import AnovaRM
+
+    read_arguments = dict(data_dir=cohort_dir,
+                          sample_size=sample_size,
+                          trials_per_subject=NUMBER_OF_BLOCKS*TRIALS_PER_BLOCK,
+                          data_type="beh",
+                          sort_key=config.sort_by_subject,
+                          drop_nans=True)
+    mant_data = utils.read_mant_data(**read_arguments)
+    conditions = utils.fetch_mant_conditions(all_trials=mant_data, pure=False)
+    blockwise_ordered_rts = utils.order_conditions_blockwise(mant_data=mant_data,
+                                                             condition_names=config.abbreviated_condition_names,
+                                                             number_of_blocks=NUMBER_OF_BLOCKS,
+                                                             trials_per_block=TRIALS_PER_BLOCK)
+    relevant_data = utils.get_only_cues_and_targets(mant_data=mant_data)
+    sequential_data = mant_data.reset_index(drop=True)
+
+    def run_repetition_functions():
+        preceding_trials, following_trials = utils.separate_preceding_from_following(sequential_data)
+        utils.count_repetitions(total_trials=len(sequential_data),
+                                preceding_trials=preceding_trials,
+                                following_trials=following_trials,
+                                number_of_transitions=len(sequential_data)-1)
+        for trials in [preceding_trials, following_trials]:
+            utils.recode_trials(trials=trials)
+        utils.get_preceding_conditions_counts(condition_names=config.abbreviated_condition_names,
+                                              preceding_trials=preceding_trials,
+                                              following_trials=following_trials)
+
+    benchmarks = {"read_mant_data": lambda: utils.read_mant_data(**read_arguments),
+                  "fetch_mant_conditions": lambda: utils.fetch_mant_conditions(all_trials=mant_data, pure=False),
+                  "get_condition_descriptives": lambda: utils.get_condition_descriptives(conditions=conditions,
+                                                                                         condition_names=config.abbreviated_condition_names),
+                  "order_conditions_blockwise": lambda: utils.order_conditions_blockwise(mant_data=mant_data,
+                                                                                         condition_names=config.abbreviated_condition_names,
+                                                                                         number_of_blocks=NUMBER_OF_BLOCKS,
+                                                                                         trials_per_block=TRIALS_PER_BLOCK),
+                  "repetition_functions": run_repetition_functions,
+                  "anova_rm": lambda: AnovaRM(data=mant_data,
+                                              depvar="rt",
+                                              subject="subject",
+                                              within=["cue_type","target_congruent"],
+                                              aggregate_func="mean").fit()}
+    for plot_type in config.plot_types:
+        benchmarks[f"plot_reaction_times_{plot_type}"] = (lambda plot_type=plot_type:
+                                                          utils.plot_reaction_times(title="benchmark",
+                                                                                    conditions=conditions,
+                                                                                    condition_names=config.condition_names,
+                                                                                    figures_savedir=figures_dir,
+                                                                                    plot_type=plot_type))
+    benchmarks |= {"plot_compact_boxplots": lambda: utils.plot_compact_boxplots(separate_conditions_data=conditions,
+                                                                                group=True,
+                                                                                sample_size=sample_size,
+                                                                                subject_id=None,
+                                                                                figures_savedir=figures_dir),
+                   "plot_rt_over_conditions": lambda: utils.plot_rt_over_conditions(conditions=conditions,
+                                                                                     condition_names=config.abbreviated_condition_names,
+                                                                                     data_id="group",
+                                                                                     sample_size=sample_size,
+                                                                                     figures_savedir=figures_dir),
+                   "plot_blockwise_boxplots": lambda: utils.plot_blockwise_boxplots(nrows=3,
+                                                                                    ncols=3,
+                                                                                    data_id="group",
+                                                                                    sample_size=sample_size,
+                                                                                    blockwise_ordered_rts=blockwise_ordered_rts,
+                                                                                    figures_savedir=figures_dir),
+                   "plot_target_cue_interactions": lambda: utils.plot_target_cue_interactions(mant_data=relevant_data,
+                                                                                              data_id="group",
+                                                                                              specific_jitter=None,
+                                                                                              on_x_axis="cues",
+                                                                                              sample_size=sample_size,
+                                                                                              figures_savedir=figures_dir)}
+
+    timings = {}
+    for benchmark_name, benchmark in benchmarks.items():
+        timings[benchmark_name] = time_call(function=benchmark, repeats=repeats)
+        print(f"N={sample_size:<5} {benchmark_name:<35} {timings[benchmark_name]:.4f} s")
+    return timings
+
+def plot_scaling_curves(results: dict[str, dict[str, float]], figure_path: Path):
+    """Plots (log-log) time against cohort size, one line per benchmark, and labels each line with its scaling exponent."""
+
+    import matplotlib.pyplot as plt
+
+    plt.rcParams["font.family"] = "monospace"
+    _, ax = plt.subplots(figsize=(12,8))
+    for benchmark_name, timings in results.items():
+        sizes = np.array([int(size) for size in timings])
+        seconds = np.array(list(timings.values()))
+        label = benchmark_name
+        if sizes.size > 1:
+            exponent = np.polyfit(np.log10(sizes), np.log10(seconds), deg=1)[0]
+            label += f" (~N^{exponent:.2f})"
+        ax.plot(sizes, seconds, marker="o", label=label)
+    ax.set(xscale="log",
+           yscale="log",
+           xlabel="Number of subjects",
+           ylabel="Time (s)",
+           title="analysis_utils scaling")
+    ax.legend(fontsize=7)
+    plt.savefig(figure_path, bbox_inches="tight")
+    plt.close()
+
+def find_regressions(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Lists the benchmarks (and cohort sizes) that are more than 'threshold' times slower than the baseline."""
+
+    regressions = []
+    for benchmark_name, timings in results.items():
+        for size, seconds in timings.items():
+            baseline_seconds = baseline.get(benchmark_name, {}).get(size)
+            if baseline_seconds and seconds > threshold*baseline_seconds:
+                regressions.append(f"{benchmark_name} (N={size}): {seconds:.4f} s vs. {baseline_seconds:.4f} s baseline")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scaling benchmarks for analysis_utils.py")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100], help="cohort sizes (number of subjects; 1000 takes a long time)")
+    parser.add_argument("--repeats", type=int, default=3, help="timings per benchmark (the fastest is kept)")
+    parser.add_argument("--threshold", type=float, default=1.5, help="slowdown factor (w.r.t. the baseline) that counts as a regression")
+    parser.add_argument("--cohorts-dir", type=Path, default=Path(tempfile.gettempdir()) / "mant-benchmark-cohorts", help="where synthetic cohorts are written (and reused)")
+    parser.add_argument("--save-baseline", action="store_true", help="save this run as the new baseline")
+    arguments = parser.parse_args()
+
+    results_dir.mkdir(exist_ok=True)
+    results = {}
+    with tempfile.TemporaryDirectory() as figures_dir:
+        for sample_size in arguments.sizes:
+            cohort_dir = get_cohort(cohorts_dir=arguments.cohorts_dir, sample_size=sample_size)
+            cohort_timings = benchmark_cohort(cohort_dir=cohort_dir,
+                                              sample_size=sample_size,
+                                              figures_dir=Path(figures_dir),
+                                              repeats=arguments.repeats)
+            for benchmark_name, seconds in cohort_timings.items():
+                results.setdefault(benchmark_name, {})[str(sample_size)] = seconds
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    run_info = {"commit": commit,
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "machine": platform.node(),
+                "python": platform.python_version(),
+                "repeats": arguments.repeats,
+                "results": results}
+    run_file = results_dir / f"{datetime.now():%Y%m%d-%H%M%S}-{commit}.json"
+    run_file.write_text(json.dumps(run_info, indent=1))
+    plot_scaling_curves(results=results, figure_path=results_dir / "scaling-curves.pdf")
+    print(f"Results saved to {run_file}")
+
+    if arguments.save_baseline:
+        baseline_file.write_text(json.dumps(run_info, indent=1))
+        print(f"Baseline saved to {baseline_file}")
+    elif baseline_file.is_file():
+        regressions = find_regressions(results=results,
+                                       baseline=json.loads(baseline_file.read_text())["results"],
+                                       threshold=arguments.threshold)
+        if regressions:
+            print("Performance regressions:\n" + "\n".join(regressions))
+            sys.exit(1)
+        print(f"No regressions beyond {arguments.threshold}x the baseline")
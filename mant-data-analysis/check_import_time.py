@@ -0,0 +1,33 @@
+""" Checks that importing analysis_utils stays fast: it must not load plotting or statistics
+dependencies, and its cumulative import time must stay within 'import_time_budget_seconds'
+(see analysis_config.py). Exits with status 1 if either check fails. """
+
+import subprocess
+import sys
+from pathlib import Path
+
+import analysis_config as config
+
+
+analysis_dir = Path(__file__).resolve().parent
+lazy_dependencies = ["matplotlib", "seaborn", "tkinter", "scipy", "statsmodels"]
+
+import_statement = ("import sys, analysis_utils; "
+                    f"print(','.join(module for module in {lazy_dependencies} if module in sys.modules))")
+completed_process = subprocess.run([sys.executable, "-X", "importtime", "-c", import_statement],
+                                   cwd=analysis_dir,
+                                   capture_output=True,
+                                   text=True,
+                                   check=True)
+
+cumulative_microseconds = None
+for line in completed_process.stderr.splitlines():                      # lines look like 'import time: self [us] | cumulative | imported package'
+    if line.startswith("import time:") and line.rsplit("|", 1)[-1].strip() == "analysis_utils":
+        cumulative_microseconds = int(line.split("|")[1])
+import_time = cumulative_microseconds / 1e6
+loaded_dependencies = [module for module in completed_process.stdout.strip().split(",") if module]
+
+print(f"Importing analysis_utils took {round(import_time,3)} s (budget: {config.import_time_budget_seconds} s)")
+print(f"Plotting/statistics dependencies loaded at import: {loaded_dependencies if loaded_dependencies else 'none'}")
+if import_time > config.import_time_budget_seconds or loaded_dependencies:
+    sys.exit(1)
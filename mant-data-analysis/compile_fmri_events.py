@@ -0,0 +1,171 @@
+""" Compiles the single-trial 'beh' and 'onsets' files written by task-and-fmri into one BIDS events file per run
+and one HRF-convolved design matrix per run (one regressor per event type, sampled at the scanner's TR).
+
+Event types:
+- 'cue_valid' / 'cue_double': cue onsets (duration: cue display time)
+- 'valid_congruent', 'valid_incongruent', 'double_congruent', 'double_incongruent': target onsets
+  (duration: reaction time, or target display time for misses)
+- 'response': response onsets (duration: 0; misses have none)
+
+Outputs:
+<output_dir>/sub-xx/ses-mri/func/sub-xx_ses-mri_task-mANT_run-yy_events.tsv
+<output_dir>/derivatives/design-matrices/sub-xx/ses-mri/func/sub-xx_ses-mri_task-mANT_run-yy_desc-hrf_design.tsv
+
+Usage:
+python compile_fmri_events.py <data_dir> <output_dir> [--tr 2.0] [--volumes N] [--workers N] """
+
+import argparse
+import math
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import analysis_utils as utils
+import analysis_config as config
+
+
+CUE_DURATION = 0.2                                                      # as in task-and-fmri/config.py's display_times
+TARGET_DURATION = 2
+HRF_LENGTH_SECONDS = 32
+OVERSAMPLING = 16                                                       # HRF convolution runs on a grid 16 times finer than the TR
+
+cue_labels = {"spatial valid": "valid", "double": "double"}
+congruency_labels = {"yes": "congruent", "no": "incongruent"}
+
+def spm_hrf(repetition_time: float) -> np.ndarray:
+    """Returns SPM's canonical double-gamma HRF (peak at ~5 s, undershoot at ~15 s), sampled every repetition_time/OVERSAMPLING seconds."""
+
+    dt = repetition_time/OVERSAMPLING
+    time_points = np.arange(0, HRF_LENGTH_SECONDS, dt)
+    def gamma_pdf(shape):
+        return time_points**(shape-1)*np.exp(-time_points)/math.gamma(shape)
+    hrf = gamma_pdf(6) - gamma_pdf(16)/6
+    return hrf/hrf.sum()
+
+def build_events(run_trials: pd.DataFrame) -> pd.DataFrame:
+    """Turns one run's trials (behaviour joined with onsets) into a BIDS events table.
+
+    Parameters:
+    run_trials -- one row per trial, with both 'beh' and 'onsets' columns (type: pd.DataFrame)
+
+    Returns:
+    events -- one row per event, sorted by onset (type: pd.DataFrame)
+    """
+
+    reaction_times = pd.to_numeric(run_trials["rt"], errors="coerce")
+    condition = run_trials["cue_type"].map(cue_labels) + "_" + run_trials["target_congruent"].map(congruency_labels)
+    shared_columns = {"trial": run_trials["trial"],
+                      "cue_type": run_trials["cue_type"],
+                      "target_congruent": run_trials["target_congruent"],
+                      "response": run_trials["response"],
+                      "correct": run_trials["correct"],
+                      "response_time": reaction_times}
+    cue_events = pd.DataFrame({"onset": pd.to_numeric(run_trials["cue_onset"]),
+                               "duration": CUE_DURATION,
+                               "trial_type": "cue_" + run_trials["cue_type"].map(cue_labels)} | shared_columns)
+    target_events = pd.DataFrame({"onset": pd.to_numeric(run_trials["target_onset"]),
+                                  "duration": reaction_times.fillna(TARGET_DURATION),
+                                  "trial_type": condition} | shared_columns)
+    response_events = pd.DataFrame({"onset": pd.to_numeric(run_trials["response_onset"], errors="coerce"),
+                                    "duration": 0.0,
+                                    "trial_type": "response"} | shared_columns).dropna(subset=["onset"])
+    events = pd.concat(objs=[cue_events, target_events, response_events],
+                       axis=0)
+    return events.sort_values(by=["onset","trial_type"], kind="stable").reset_index(drop=True)
+
+def build_design_matrix(events: pd.DataFrame, repetition_time: float, number_of_volumes: int | None) -> pd.DataFrame:
+    """Convolves one boxcar per event type with the canonical HRF and samples the result at every volume's acquisition time.
+
+    Parameters:
+    events -- a BIDS events table (type: pd.DataFrame)
+    repetition_time -- the scanner's TR, in seconds (type: float)
+    number_of_volumes -- the number of volumes in the run (if None, the run is assumed to end HRF_LENGTH_SECONDS after the last event) (type: int or None)
+
+    Returns:
+    design_matrix -- one row per volume, one column per event type, plus a constant (type: pd.DataFrame)
+    """
+
+    if number_of_volumes is None:
+        number_of_volumes = math.ceil(((events["onset"] + events["duration"]).max() + HRF_LENGTH_SECONDS)/repetition_time)
+    dt = repetition_time/OVERSAMPLING
+    fine_grid_size = number_of_volumes*OVERSAMPLING
+    hrf = spm_hrf(repetition_time=repetition_time)
+
+    trial_types = sorted(events["trial_type"].unique())
+    onset_bins = np.clip(np.round(events["onset"].to_numpy()/dt).astype(int), 0, fine_grid_size)
+    offset_bins = np.clip(np.round((events["onset"] + events["duration"]).to_numpy()/dt).astype(int), 0, fine_grid_size)
+    offset_bins = np.maximum(offset_bins, onset_bins + 1)                             # zero-duration events last one fine bin
+    type_indices = pd.Categorical(events["trial_type"], categories=trial_types).codes
+
+    boxcars = np.zeros(shape=(len(trial_types), fine_grid_size + 1))                  # all boxcars at once: +1 at every onset, -1 at every offset, then cumsum
+    np.add.at(boxcars, (type_indices, onset_bins), 1)
+    np.add.at(boxcars, (type_indices, offset_bins), -1)
+    boxcars = np.cumsum(boxcars, axis=1)[:, :fine_grid_size]
+    convolved = np.array([np.convolve(boxcar, hrf)[:fine_grid_size] for boxcar in boxcars])
+
+    design_matrix = pd.DataFrame(data=convolved[:, ::OVERSAMPLING].T,
+                                 columns=trial_types)
+    design_matrix.insert(loc=0,
+                         column="frame_time",
+                         value=np.arange(number_of_volumes)*repetition_time)
+    design_matrix["constant"] = 1.0
+    return design_matrix
+
+def compile_run(trial_numbers: list[int], beh_files: list[Path], onset_files: list[Path], events_file: Path, design_file: Path,
+                repetition_time: float, number_of_volumes: int | None) -> int:
+    """Reads one run's files (one 'beh' and one 'onsets' file per trial), then writes its events file and design matrix.
+
+    Returns:
+    number_of_events -- the number of events written (type: int)
+    """
+
+    run_trials = utils.read_single_row_files(beh_files).join(utils.read_single_row_files(onset_files))
+    run_trials.insert(loc=0,
+                      column="trial",
+                      value=trial_numbers)
+    events = build_events(run_trials=run_trials)
+    design_matrix = build_design_matrix(events=events,
+                                        repetition_time=repetition_time,
+                                        number_of_volumes=number_of_volumes)
+    for output_file, table in [(events_file, events), (design_file, design_matrix)]:
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        table.to_csv(path_or_buf=output_file,
+                     sep="\t",
+                     index=False,
+                     na_rep="n/a")
+    return len(events)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile BIDS events files and HRF-convolved design matrices from task-and-fmri outputs")
+    parser.add_argument("data_dir", type=Path, help="the folder that contains the 'sub-xx' folders")
+    parser.add_argument("output_dir", type=Path)
+    parser.add_argument("--tr", type=float, default=config.fmri_repetition_time_seconds, help="repetition time (s)")
+    parser.add_argument("--volumes", type=int, default=None, help="volumes per run (default: until the HRF of the last event has decayed)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    arguments = parser.parse_args()
+
+    file_index = pd.merge(left=utils.index_mant_files(data_dir=arguments.data_dir, data_type="beh"),
+                          right=utils.index_mant_files(data_dir=arguments.data_dir, data_type="onsets"),
+                          on=["subject","session","run","trial"],
+                          suffixes=("_beh","_onsets"),
+                          validate="one_to_one")
+    with ProcessPoolExecutor(max_workers=arguments.workers) as pool:
+        futures = {}
+        for (subject, session, run), run_files in file_index.groupby(["subject","session","run"]):
+            run_files = run_files.sort_values(by="trial")
+            run_name = f"{subject}_ses-{session}_task-mANT_run-{int(run):02d}"
+            futures[run_name] = pool.submit(compile_run,
+                                            trial_numbers=list(run_files["trial"]),
+                                            beh_files=list(run_files["path_beh"]),
+                                            onset_files=list(run_files["path_onsets"]),
+                                            events_file=arguments.output_dir / subject / f"ses-{session}" / "func" / f"{run_name}_events.tsv",
+                                            design_file=(arguments.output_dir / "derivatives" / "design-matrices" / subject / f"ses-{session}" / "func"
+                                                         / f"{run_name}_desc-hrf_design.tsv"),
+                                            repetition_time=arguments.tr,
+                                            number_of_volumes=arguments.volumes)
+        for run_name, future in futures.items():
+            future.result()
+    print(f"Compiled {len(futures)} runs into {arguments.output_dir}")
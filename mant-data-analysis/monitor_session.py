@@ -0,0 +1,251 @@
+""" Live monitor of an ongoing mANT session. Run it in a separate process (or on a separate PC with access to the outputs folder):
+it never touches the task's render loop, it only reads the single-trial .tsv files that the task writes.
+
+The task names its files 'sub-xx_task-mANT_beh_<trial number>.tsv' with consecutive trial numbers, so the monitor just waits
+for the next expected file: every new trial costs one file check and one file read, and no file is ever read twice.
+Statistics (accuracy, miss rate, reaction time mean and standard deviation) are updated online with Welford's algorithm,
+per condition and per block.
+
+Training trials are written first and then overwritten by the first experimental block. When the first file is rewritten,
+the monitor discards what it has seen so far and starts over.
+
+Sessions saved with one file per block ('sub-xx_task-mANT_beh_block-01.tsv', the task's default) are followed the same way:
+the monitor keeps its position in the current block file and only reads the rows appended since the last poll. Training
+blocks have their own file, which is ignored.
+
+Usage:
+python monitor_session.py <beh_folder> [--trials-per-block 48] [--interval 0.5] [--html monitor.html] """
+
+import argparse
+import math
+import os
+import sys
+import time
+from pathlib import Path
+
+import analysis_config as config
+
+
+condition_labels = {("spatial valid", "yes"): "VC",
+                    ("spatial valid", "no"): "VI",
+                    ("double", "yes"): "DC",
+                    ("double", "no"): "DI"}
+
+class RunningStatistics:
+    """Online count, accuracy, miss rate, mean and variance (Welford, 1962). O(1) time and memory per update."""
+
+    __slots__ = ("trials", "correct", "misses", "rt_count", "rt_mean", "rt_m2")
+
+    def __init__(self):
+        self.trials = 0
+        self.correct = 0
+        self.misses = 0
+        self.rt_count = 0
+        self.rt_mean = 0.0
+        self.rt_m2 = 0.0
+
+    def update(self, correct: int, reaction_time: float | None):
+        """Adds one trial. 'correct' is coded as in the task (1: correct, 0: incorrect, -1: miss)."""
+
+        self.trials += 1
+        self.correct += correct == 1
+        self.misses += correct == -1
+        if reaction_time is not None:
+            self.rt_count += 1
+            delta = reaction_time - self.rt_mean
+            self.rt_mean += delta/self.rt_count
+            self.rt_m2 += delta*(reaction_time - self.rt_mean)
+
+    @property
+    def rt_std(self) -> float:
+        return math.sqrt(self.rt_m2/(self.rt_count-1)) if self.rt_count > 1 else math.nan
+
+    def summary(self) -> list[str]:
+        if self.trials == 0:
+            return ["-"]*5
+        return [str(self.trials),
+                f"{100*self.correct/self.trials:.1f}",
+                f"{100*self.misses/self.trials:.1f}",
+                f"{self.rt_mean:.3f}" if self.rt_count else "-",
+                f"{self.rt_std:.3f}" if self.rt_count > 1 else "-"]
+
+
+class SessionMonitor:
+    """Follows the single-trial (or block) files of one session, in trial order.
+
+    Parameters:
+    beh_data_folder -- the session's 'beh' folder (e.g., 'outputs/sub-01/ses-eeg/beh') (type: Path)
+    trials_per_block -- the number of trials per block (type: int)
+    """
+
+    def __init__(self, beh_data_folder: Path, trials_per_block: int):
+        self.beh_data_folder = Path(beh_data_folder)
+        self.trials_per_block = trials_per_block
+        self.filename_prefix = None
+        self.block_files = False
+        self.first_file_mtime = None
+        self.passes = 0
+        self.reset()
+
+    def reset(self):
+        """Forgets all trials read so far (e.g., training trials about to be overwritten)."""
+
+        self.next_trial = 0
+        self.current_block = 1
+        self.read_offset = 0
+        self.header = None
+        self.by_condition = {label: RunningStatistics() for label in condition_labels.values()}
+        self.by_block = {}
+        self.overall = RunningStatistics()
+
+    def find_filename_prefix(self) -> bool:
+        """Looks for the session's first file (once) and stores the file name prefix shared by all trials."""
+
+        first_files = sorted(self.beh_data_folder.glob("*_beh_0.tsv"))
+        first_block_files = sorted(self.beh_data_folder.glob("*_beh_block-01.tsv"))
+        if first_files:
+            self.filename_prefix = first_files[0].name.removesuffix("0.tsv")
+        elif first_block_files:
+            self.filename_prefix = first_block_files[0].name.removesuffix("block-01.tsv")
+            self.block_files = True
+        return self.filename_prefix is not None
+
+    def trial_path(self, trial_number: int) -> Path:
+        return self.beh_data_folder / f"{self.filename_prefix}{trial_number}.tsv"
+
+    def read_trial(self, path: Path) -> dict[str, str] | None:
+        """Reads one single-trial file (None if it is not complete yet)."""
+
+        try:
+            with open(path) as trial_file:
+                lines = trial_file.read().splitlines()
+        except FileNotFoundError:
+            return None
+        if len(lines) < 2:
+            return None
+        return dict(zip(lines[0].split("\t"), lines[1].split("\t")))
+
+    def block_path(self, block: int) -> Path:
+        return self.beh_data_folder / f"{self.filename_prefix}block-{block:02d}.tsv"
+
+    def read_block_rows(self) -> list[dict[str, str]]:
+        """Reads the complete rows appended to the current block file since the last call, and moves on to the next
+        block file once it exists (the task finishes a block's file before it starts the next one)."""
+
+        rows = []
+        while True:
+            next_block_started = self.block_path(self.current_block + 1).is_file()
+            try:
+                with open(self.block_path(self.current_block), "rb") as block_file:
+                    block_file.seek(self.read_offset)
+                    new_bytes = block_file.read()
+            except FileNotFoundError:
+                return rows
+            complete_bytes = new_bytes[:new_bytes.rfind(b"\n") + 1]                  # a row may be half-written
+            self.read_offset += len(complete_bytes)
+            for line in complete_bytes.decode().splitlines():
+                if self.header is None:
+                    self.header = line.split("\t")
+                else:
+                    rows.append(dict(zip(self.header, line.split("\t"))) | {"block": self.current_block})
+            if not next_block_started:
+                return rows
+            self.current_block += 1
+            self.read_offset = 0
+            self.header = None
+
+    def add_trial(self, trial: dict[str, str], block: int):
+        """Adds one trial to the overall, per-condition and per-block statistics."""
+
+        correct = int(trial["correct"])
+        reaction_time = None if trial["rt"] in ("none", "") else float(trial["rt"])
+        label = condition_labels[(trial["cue_type"], trial["target_congruent"])]
+        for statistics in [self.overall,
+                           self.by_condition[label],
+                           self.by_block.setdefault(block, {name: RunningStatistics() for name in condition_labels.values()})[label]]:
+            statistics.update(correct=correct, reaction_time=reaction_time)
+        self.next_trial += 1
+
+    def poll(self) -> int:
+        """Reads all trials written since the last poll.
+
+        Returns:
+        new_trials -- the number of trials read (type: int)
+        """
+
+        if self.filename_prefix is None and not self.find_filename_prefix():
+            return 0
+        if self.block_files:
+            new_rows = self.read_block_rows()
+            for row in new_rows:
+                self.add_trial(trial=row, block=row["block"])
+            return len(new_rows)
+        try:
+            first_file_mtime = os.stat(self.trial_path(0)).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+        if self.first_file_mtime is not None and first_file_mtime != self.first_file_mtime:
+            self.passes += 1                                                         # trial 0 was rewritten: what we read so far was training
+            self.reset()
+        self.first_file_mtime = first_file_mtime
+
+        new_trials = 0
+        while True:
+            trial = self.read_trial(self.trial_path(self.next_trial))
+            if trial is None:
+                return new_trials
+            self.add_trial(trial=trial,
+                           block=self.next_trial // self.trials_per_block + 1)
+            new_trials += 1
+
+    def table(self) -> list[list[str]]:
+        """Summarises the session as rows of strings (header first)."""
+
+        rows = [["block", "condition", "trials", "accuracy %", "misses %", "mean RT (s)", "RT std (s)"],
+                ["all", "all", *self.overall.summary()]]
+        for label in config.abbreviated_condition_names:
+            rows.append(["all", label, *self.by_condition[label].summary()])
+        for block, block_statistics in sorted(self.by_block.items()):
+            for label in config.abbreviated_condition_names:
+                rows.append([str(block), label, *block_statistics[label].summary()])
+        return rows
+
+    def render_text(self) -> str:
+        rows = self.table()
+        widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+        lines = [f"{self.beh_data_folder} | {self.next_trial} trials read" + (f" | {self.passes} earlier pass(es) discarded" if self.passes else "")]
+        lines += ["  ".join(value.rjust(width) for value, width in zip(row, widths)) for row in rows]
+        return "\n".join(lines)
+
+    def render_html(self, refresh_seconds: float) -> str:
+        rows = self.table()
+        header = "".join(f"<th>{value}</th>" for value in rows[0])
+        body = "".join("<tr>" + "".join(f"<td>{value}</td>" for value in row) + "</tr>" for row in rows[1:])
+        return (f"<html><head><meta http-equiv='refresh' content='{max(1, round(refresh_seconds))}'>"
+                f"<title>mANT monitor</title></head><body style='font-family:monospace'>"
+                f"<p>{self.beh_data_folder} | {self.next_trial} trials read</p>"
+                f"<table border='1' cellpadding='4'><tr>{header}</tr>{body}</table></body></html>")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Live monitor of an ongoing mANT session")
+    parser.add_argument("beh_data_folder", type=Path, help="e.g., outputs/sub-01/ses-eeg/beh")
+    parser.add_argument("--trials-per-block", type=int, default=config.TRIALS_PER_BLOCK)
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between polls")
+    parser.add_argument("--html", type=Path, default=None, help="also write a self-refreshing HTML page here")
+    arguments = parser.parse_args()
+
+    monitor = SessionMonitor(beh_data_folder=arguments.beh_data_folder,
+                             trials_per_block=arguments.trials_per_block)
+    try:
+        while True:
+            if monitor.poll() or monitor.next_trial == 0:
+                sys.stdout.write("\033[2J\033[H" + monitor.render_text() + "\n")     # clear the terminal, then redraw
+                sys.stdout.flush()
+                if arguments.html:
+                    temporary_file = arguments.html.with_suffix(".tmp")
+                    temporary_file.write_text(monitor.render_html(refresh_seconds=arguments.interval))
+                    os.replace(temporary_file, arguments.html)
+            time.sleep(arguments.interval)
+    except KeyboardInterrupt:
+        pass
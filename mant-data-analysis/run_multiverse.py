@@ -0,0 +1,214 @@
+""" Multiverse analysis: the group-level analysis of network effects (orienting, conflict, interaction), repeated over every
+combination of analysis choices in 'analysis_grid'.
+
+Data are read once (through the ingest cache), condition codes are computed once, and both are handed to every worker
+process when it starts; specifications then run side by side in a process pool. Results are collected into one table
+(one row per specification) and summarised by one specification curve per effect.
+
+Usage:
+python run_multiverse.py [experiment name, default: analysis_config.experiment] [--permutations 5000] [--workers N] """
+
+import argparse
+import itertools
+import os
+os.environ.setdefault("MPLBACKEND", "Agg")
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import analysis_utils as utils
+import analysis_config as config
+
+
+analysis_grid = {"trimming": ["none", "absolute", "sd", "mad"],                     # see 'trim_trials()'
+                 "rt_scale": ["raw", "log"],
+                 "first_block": ["include", "exclude"],
+                 "aggregation": ["mean", "median"],
+                 "test": ["anova", "permutation"]}
+ABSOLUTE_RT_LIMITS = (0.2, 1.5)                                                     # seconds
+SD_LIMIT = 2.5                                                                      # within subject and condition
+MAD_LIMIT = 3                                                                       # within subject and condition (scaled MAD)
+effect_names = ["orienting", "conflict", "interaction"]
+
+@dataclass(frozen=True)
+class Specification:
+    """One combination of analysis choices (see 'analysis_grid')."""
+
+    trimming: str
+    rt_scale: str
+    first_block: str
+    aggregation: str
+    test: str
+
+shared_data = {}                                                                    # filled once per worker process by 'share_data()'
+
+def share_data(trials: pd.DataFrame, number_of_permutations: int, seed: int):
+    """Pool initializer: hands the prepared trials to a worker process once, rather than once per specification."""
+
+    shared_data["trials"] = trials
+    shared_data["number_of_permutations"] = number_of_permutations
+    shared_data["seed"] = seed
+
+def prepare_trials(trial_table: pd.DataFrame) -> pd.DataFrame:
+    """Keeps correct trials with a reaction time and codes their condition once (0: VC, 1: VI, 2: DC, 3: DI).
+
+    Parameters:
+    trial_table -- the output of 'analysis_utils.read_trial_table()' (type: pd.DataFrame)
+
+    Returns:
+    trials -- 'subject', 'block', 'condition', 'cue_type', 'target_congruent' and 'rt' columns (type: pd.DataFrame)
+    """
+
+    trials = trial_table.loc[(trial_table["correct"] == 1) & trial_table["rt"].notna(),
+                             ["subject","block","cue_type","target_congruent","rt"]].reset_index(drop=True)
+    trials["condition"] = 2*(trials["cue_type"] == "double") + (trials["target_congruent"] == "no")
+    return trials
+
+def trim_trials(trials: pd.DataFrame, trimming: str) -> pd.DataFrame:
+    """Removes outlying reaction times:
+    - "none": nothing is removed
+    - "absolute": RTs outside ABSOLUTE_RT_LIMITS
+    - "sd": RTs more than SD_LIMIT standard deviations from their subject x condition mean
+    - "mad": RTs more than MAD_LIMIT scaled median absolute deviations from their subject x condition median
+    """
+
+    reaction_times = trials["rt"]
+    if trimming == "none":
+        return trials
+    if trimming == "absolute":
+        return trials.loc[reaction_times.between(*ABSOLUTE_RT_LIMITS)]
+    cells = trials.groupby(["subject","condition"])["rt"]
+    if trimming == "sd":
+        return trials.loc[(reaction_times - cells.transform("mean")).abs() <= SD_LIMIT*cells.transform("std")]
+    if trimming == "mad":
+        medians = cells.transform("median")
+        scaled_mad = 1.4826*(reaction_times - medians).abs().groupby([trials["subject"], trials["condition"]]).transform("median")
+        return trials.loc[(reaction_times - medians).abs() <= MAD_LIMIT*scaled_mad]
+    raise ValueError(f"'trimming' can only be one of {analysis_grid['trimming']}")
+
+def compute_subject_effects(cell_values: pd.DataFrame) -> pd.DataFrame:
+    """Computes each subject's network effects from their four condition values (as 'analysis_utils.compute_network_effects()')."""
+
+    values = cell_values.unstack("condition")[[0,1,2,3]].to_numpy()
+    return pd.DataFrame({"orienting": values[:, 2:].mean(axis=1) - values[:, :2].mean(axis=1),
+                         "conflict": values[:, [1,3]].mean(axis=1) - values[:, [0,2]].mean(axis=1),
+                         "interaction": (values[:, 3] - values[:, 2]) - (values[:, 1] - values[:, 0])},
+                        index=cell_values.unstack("condition").index).dropna()
+
+def sign_flip_p_values(subject_effects: pd.DataFrame, number_of_permutations: int, seed: int) -> dict[str, float]:
+    """Two-sided permutation p-values for every effect: in a within-subject 2x2 design, permuting condition labels within
+    a subject flips the sign of their effect, so all permutations are one matrix of random signs."""
+
+    rng = np.random.default_rng(seed)
+    effects = subject_effects.to_numpy()
+    signs = rng.choice([-1.0, 1.0], size=(number_of_permutations, effects.shape[0]))
+    permuted_means = np.abs(signs @ effects)/effects.shape[0]
+    observed_means = np.abs(effects.mean(axis=0))
+    exceedances = (permuted_means >= observed_means - 1e-12).sum(axis=0)
+    return {effect: (count + 1)/(number_of_permutations + 1) for effect, count in zip(subject_effects.columns, exceedances)}
+
+def anova_p_values(cell_values: pd.DataFrame) -> dict[str, float]:
+    """p-values of the repeated-measures ANOVA on the aggregated condition values."""
+
+    from statsmodels.stats.anova import AnovaRM
+
+    anova_data = cell_values.rename("value").reset_index()
+    anova_data["cue_type"] = np.where(anova_data["condition"] >= 2, "double", "spatial valid")
+    anova_data["target_congruent"] = np.where(anova_data["condition"] % 2 == 1, "no", "yes")
+    complete_subjects = anova_data.groupby("subject")["value"].transform("count") == 4
+    anova_table = AnovaRM(data=anova_data.loc[complete_subjects],
+                          depvar="value",
+                          subject="subject",
+                          within=["cue_type","target_congruent"]).fit().anova_table
+    return {"orienting": anova_table.loc["cue_type", "Pr > F"],
+            "conflict": anova_table.loc["target_congruent", "Pr > F"],
+            "interaction": anova_table.loc["cue_type:target_congruent", "Pr > F"]}
+
+def run_specification(specification: Specification) -> dict:
+    """Runs one specification on the worker's shared trials.
+
+    Returns:
+    result -- the specification's choices, the number of trials kept, and each effect's group mean and p-value (type: dict)
+    """
+
+    trials = shared_data["trials"]
+    if specification.first_block == "exclude":
+        trials = trials.loc[trials["block"] != 1]
+    trials = trim_trials(trials=trials, trimming=specification.trimming)
+    values = np.log(trials["rt"]) if specification.rt_scale == "log" else trials["rt"]
+    cell_values = values.groupby([trials["subject"], trials["condition"]]).agg(specification.aggregation)
+    subject_effects = compute_subject_effects(cell_values=cell_values)
+    if specification.test == "anova":
+        p_values = anova_p_values(cell_values=cell_values)
+    else:
+        p_values = sign_flip_p_values(subject_effects=subject_effects,
+                                      number_of_permutations=shared_data["number_of_permutations"],
+                                      seed=shared_data["seed"])
+    result = asdict(specification) | {"trials": len(trials), "subjects": len(subject_effects)}
+    for effect in effect_names:
+        result[f"{effect}_estimate"] = subject_effects[effect].mean()
+        result[f"{effect}_p"] = p_values[effect]
+    return result
+
+def plot_specification_curve(results: pd.DataFrame, effect: str, title: str, figure_path: Path, alpha: float = 0.05):
+    """Plots one effect's estimates across all specifications (sorted), above a panel that marks each specification's choices."""
+
+    import matplotlib.pyplot as plt
+
+    plt.rcParams["font.family"] = "monospace"
+    results = results.sort_values(by=f"{effect}_estimate").reset_index(drop=True)
+    choice_rows = [(choice, option) for choice, options in analysis_grid.items() for option in options]
+    fig, (estimates_ax, choices_ax) = plt.subplots(nrows=2,
+                                                   sharex=True,
+                                                   figsize=(12,10),
+                                                   gridspec_kw={"height_ratios": [2, 3]})
+    significant = results[f"{effect}_p"] < alpha
+    estimates_ax.scatter(results.index, results[f"{effect}_estimate"], c=np.where(significant, "tab:red", "tab:grey"), s=12)
+    estimates_ax.axhline(y=0, color="black", linewidth=0.8)
+    estimates_ax.set(ylabel=f"{effect.capitalize()} effect", title=title)
+    for row, (choice, option) in enumerate(choice_rows):
+        chosen = results.index[results[choice] == option]
+        choices_ax.scatter(chosen, np.full(len(chosen), row), marker="|", color=np.where(significant[chosen], "tab:red", "tab:grey"))
+    choices_ax.set(yticks=range(len(choice_rows)),
+                   yticklabels=[f"{choice}: {option}" for choice, option in choice_rows],
+                   xlabel=f"Specification (sorted by estimate; red: p < {alpha})")
+    choices_ax.invert_yaxis()
+    plt.savefig(figure_path, bbox_inches="tight")
+    plt.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multiverse analysis of mANT network effects")
+    parser.add_argument("experiment", nargs="?", default=config.experiment, help="name of an experiment in analysis_config.experiments")
+    parser.add_argument("--permutations", type=int, default=5000, help="sign-flip permutations per specification")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+
+    experiment_config = config.experiments[arguments.experiment]
+    trial_table = utils.read_trial_table_cached(cache_dir=str(Path.cwd() / config.ingest_cache_dir),
+                                                data_dir=experiment_config.data_dir,
+                                                data_type="beh",
+                                                trials_per_block=experiment_config.trials_per_block)
+    trials = prepare_trials(trial_table=trial_table)
+    specifications = [Specification(*choices) for choices in itertools.product(*analysis_grid.values())]
+    with ProcessPoolExecutor(max_workers=arguments.workers,
+                             initializer=share_data,
+                             initargs=(trials, arguments.permutations, arguments.seed)) as pool:
+        results = pd.DataFrame(pool.map(run_specification, specifications, chunksize=4))
+
+    multiverse_dir = Path(Path.cwd() / "results" / "multiverse")
+    multiverse_dir.mkdir(parents=True, exist_ok=True)
+    results.to_csv(path_or_buf=multiverse_dir / f"{arguments.experiment}-multiverse.csv",
+                   sep=",",
+                   index=False)
+    sample_size = trials["subject"].nunique()
+    for effect in effect_names:
+        plot_specification_curve(results=results,
+                                 effect=effect,
+                                 title=f"{effect.capitalize()} effect across {len(specifications)} specifications ({arguments.experiment} experiment, N={sample_size})",
+                                 figure_path=multiverse_dir / f"{arguments.experiment}-specification-curve-{effect}.pdf")
+    print(results[[f"{effect}_estimate" for effect in effect_names]].describe())
@@ -0,0 +1,457 @@
+""" Synthetic mANT data, written with the same folder structure, file names and columns as the task code.
+Useful to test and benchmark the analysis code without running participants.
+
+Usage:
+python synthetic_data.py <output_dir> <variant> <sample_size> [--workers N] [--seed S] [--block-files]
+where <variant> is one of 'task-only', 'task-and-eeg', 'task-and-fmri', 'task-and-eeg-tms'. """
+
+import argparse
+import functools
+import importlib.util
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from types import ModuleType
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class VariantLayout:
+    """How one task variant lays out its output files (cf. each variant's config.py and utils.py). The record fields,
+    category codes and columns of each data type come from the variant's config.py (see 'load_task_config()').
+
+    Attributes:
+    task -- the variant's folder in this repository (e.g., 'task-and-eeg') (type: str)
+    session -- the session label (i.e., 'ses-<session>') (type: str)
+    number_of_blocks -- the number of experimental blocks (fMRI: runs) (type: int)
+    trials_per_block -- the number of trials per block (fMRI: per run) (type: int)
+    runs -- whether each block is saved as a separate fMRI run, with 'beh' and 'onsets' folders (type: bool)
+    """
+
+    task: str
+    session: str
+    number_of_blocks: int
+    trials_per_block: int
+    runs: bool = False
+
+
+@dataclass(frozen=True)
+class EffectSizes:
+    """Parameters of the simulated subjects (times in seconds).
+
+    Attributes:
+    base_rt -- the mean reaction time to valid cues followed by congruent targets (type: float)
+    orienting -- the slowing after double cues w.r.t. valid cues (type: float)
+    conflict -- the slowing for incongruent w.r.t. congruent targets (type: float)
+    interaction -- the extra conflict effect after double cues (type: float)
+    between_subject_sd -- the standard deviation of subjects' mean reaction times (type: float)
+    within_subject_scale -- the scale of the (gamma-distributed) trial-by-trial reaction time noise (type: float)
+    error_rate -- the probability of pressing the wrong key (type: float)
+    miss_rate -- the probability of not responding (type: float)
+    abort_rate -- the probability that a subject's session is aborted (escape key) in a random block (type: float)
+    """
+
+    base_rt: float = 0.45
+    orienting: float = 0.04
+    conflict: float = 0.08
+    interaction: float = 0.0
+    between_subject_sd: float = 0.05
+    within_subject_scale: float = 0.04
+    error_rate: float = 0.05
+    miss_rate: float = 0.02
+    abort_rate: float = 0.0
+
+
+variants = {"task-only": VariantLayout(task="task-only",
+                                       session="beh",
+                                       number_of_blocks=10,
+                                       trials_per_block=24),
+            "task-and-eeg": VariantLayout(task="task-and-eeg",
+                                          session="eeg",
+                                          number_of_blocks=9,
+                                          trials_per_block=48),
+            "task-and-fmri": VariantLayout(task="task-and-fmri",
+                                           session="mri",
+                                           number_of_blocks=10,
+                                           trials_per_block=24,
+                                           runs=True),
+            "task-and-eeg-tms": VariantLayout(task="task-and-eeg-tms",
+                                              session="tms",
+                                              number_of_blocks=9,
+                                              trials_per_block=48)}
+
+tasks_dir = Path(__file__).resolve().parent.parent                                         # the folder of the task variants
+
+@functools.cache
+def load_task_config(task: str) -> ModuleType:
+    """Imports a task variant's config.py (which opens no window and needs no PsychoPy), the source of
+    'record_schema', 'record_codes', 'output_columns' and display times.
+
+    Parameters:
+    task -- the variant's folder (e.g., 'task-and-eeg') (type: str)
+
+    Returns:
+    task_config -- the variant's config module (type: ModuleType)
+    """
+
+    spec = importlib.util.spec_from_file_location(f"{task.replace('-', '_')}_config", tasks_dir / task / "config.py")
+    task_config = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(task_config)
+    return task_config
+
+""" Jitter values (ms) as in the task-only and task-and-fmri config.py files (Fan et al., 2005) """
+possible_initial_fixations = np.array([3000, 3250, 3500, 3750, 4000, 4500, 5000, 5500, 6500, 8000, 10000, 15000])
+possible_later_fixations = np.array([300, 300, 300, 550, 800, 1050, 1550, 2300, 3300, 4800, 6550, 11800])
+CUE_DURATION_FMRI = 0.2
+TARGET_DURATION_FMRI = 2
+""" Initial fixations (ms) of the EEG variants: drawn once per session in config.py, uniformly from 500 to 999 ms """
+INITIAL_FIXATION_RANGE_EEG = (500, 1000)
+SESSION_START = 60                                                                          # s of instructions and training before the first block
+BLOCK_BREAK = 30                                                                            # s between blocks
+DROPPED_FRAME_RATE = 1e-3                                                                   # per flip
+
+def draw_trial_types(rng: np.random.Generator, number_of_blocks: int, trials_per_block: int) -> dict[str, np.ndarray]:
+    """Draws balanced, shuffled trial types for all blocks of one subject
+    (cue type x sequence location x target direction x target congruency, as in mant-conditions.csv).
+
+    Parameters:
+    rng -- a random number generator (type: np.random.Generator)
+    number_of_blocks -- the number of experimental blocks (type: int)
+    trials_per_block -- the number of trials per block (type: int)
+
+    Returns:
+    trial_types -- one array of labels per trial attribute (type: dict[str, np.ndarray])
+    """
+
+    factorial_design = np.array(np.meshgrid([0,1], [0,1], [0,1], [0,1], indexing="ij")).reshape(4,-1).T     # 16 combinations x 4 factors
+    repetitions = int(np.ceil(trials_per_block/len(factorial_design)))
+    block_design = np.tile(factorial_design, (repetitions,1))[:trials_per_block]
+    order = rng.permuted(np.tile(np.arange(trials_per_block), (number_of_blocks,1)), axis=1).ravel()           # independent shuffle per block
+    is_double, is_down, is_right, is_incongruent = block_design[order].T.astype(bool)
+
+    sequence_location = np.where(is_down, "down", "up")
+    return {"cue_location": np.where(is_double, "both", sequence_location),
+            "sequence_location": sequence_location,
+            "cue_type": np.where(is_double, "double", "spatial valid"),
+            "target_congruent": np.where(is_incongruent, "no", "yes"),
+            "target_direction": np.where(is_right, "right", "left")}
+
+def simulate_responses(rng: np.random.Generator, trial_types: dict[str, np.ndarray], effect_sizes: EffectSizes,
+                       response_keys: tuple[str]) -> dict[str, np.ndarray]:
+    """Simulates responses, accuracy and reaction times for the given trials.
+
+    Parameters:
+    rng -- a random number generator (type: np.random.Generator)
+    trial_types -- the output of 'draw_trial_types()' (type: dict[str, np.ndarray])
+    effect_sizes -- the parameters of the simulated subject (type: EffectSizes)
+    response_keys -- the keys for 'left' and 'right' responses (type: tuple[str])
+
+    Returns:
+    dependent_variables -- responses, accuracy codes and reaction times (type: dict[str, np.ndarray])
+    """
+
+    number_of_trials = trial_types["cue_type"].size
+    is_double = trial_types["cue_type"] == "double"
+    is_incongruent = trial_types["target_congruent"] == "no"
+    reaction_times = (effect_sizes.base_rt
+                      + rng.normal(loc=0, scale=effect_sizes.between_subject_sd)
+                      + effect_sizes.orienting*is_double
+                      + effect_sizes.conflict*is_incongruent
+                      + effect_sizes.interaction*(is_double & is_incongruent)
+                      + rng.gamma(shape=2, scale=effect_sizes.within_subject_scale, size=number_of_trials)
+                      - 2*effect_sizes.within_subject_scale)                                              # zero-mean noise
+    is_error = rng.random(number_of_trials) < effect_sizes.error_rate
+    is_miss = rng.random(number_of_trials) < effect_sizes.miss_rate
+
+    is_right = trial_types["target_direction"] == "right"
+    response = np.where(is_right ^ is_error, response_keys[1], response_keys[0])
+    return {"response": np.where(is_miss, "miss", response),
+            "correct": np.where(is_miss, -1, np.where(is_error, 0, 1)),
+            "rt": np.where(is_miss, np.nan, np.clip(reaction_times, 0.1, None))}
+
+def simulate_subject(subject_number: int, layout: VariantLayout, effect_sizes: EffectSizes, seed: int) -> dict[str, np.ndarray]:
+    """Simulates all of one subject's trials, including the variant-specific columns.
+
+    Parameters:
+    subject_number -- the subject's number (type: int)
+    layout -- the variant's output layout (type: VariantLayout)
+    effect_sizes -- the parameters of the simulated subject (type: EffectSizes)
+    seed -- the seed shared by the cohort (type: int)
+
+    Returns:
+    trial_variables -- one array per output variable of every data type (plus 'block' and 'trial_in_block') (type: dict[str, np.ndarray])
+    """
+
+    task_config = load_task_config(layout.task)
+    beh_columns = task_config.output_columns["beh"]
+    rng = np.random.default_rng([seed, subject_number])
+    number_of_trials = layout.number_of_blocks*layout.trials_per_block
+    trial_variables = draw_trial_types(rng=rng,
+                                       number_of_blocks=layout.number_of_blocks,
+                                       trials_per_block=layout.trials_per_block)
+    trial_variables |= simulate_responses(rng=rng,
+                                          trial_types=trial_variables,
+                                          effect_sizes=effect_sizes,
+                                          response_keys=tuple(task_config.record_codes["response"][1:3]))
+    trial_variables["block"] = np.repeat(np.arange(layout.number_of_blocks), layout.trials_per_block)
+    trial_variables["trial_in_block"] = np.tile(np.arange(layout.trials_per_block), layout.number_of_blocks)
+
+    if "tms_timing" in beh_columns:                                                             # 4 'random' rows out of 24 in mant-conditions.csv
+        trial_variables["tms_timing"] = np.where(rng.random(number_of_trials) < 1/6, "random", "fixed")
+    if "pre_cue_jitter" in beh_columns:                                                         # drawn once per session and reused in every block
+        pre_cue_jitter = 0.001*rng.choice(possible_initial_fixations, size=layout.trials_per_block)
+        post_cue_jitter = 0.001*rng.choice(possible_later_fixations, size=layout.trials_per_block)
+        trial_variables["pre_cue_jitter"] = np.tile(pre_cue_jitter, layout.number_of_blocks)
+        trial_variables["post_cue_jitter"] = np.tile(post_cue_jitter, layout.number_of_blocks)
+    if layout.runs:                                                                                         # each run redraws its jitters
+        trial_variables["pre_cue"] = 0.001*rng.choice(possible_initial_fixations, size=number_of_trials)
+        trial_variables["post_cue"] = 0.001*rng.choice(possible_later_fixations, size=number_of_trials)
+        rt = trial_variables["rt"]
+        trial_durations = (trial_variables["pre_cue"] + CUE_DURATION_FMRI + trial_variables["post_cue"]
+                           + np.where(np.isnan(rt), TARGET_DURATION_FMRI, rt)).reshape(layout.number_of_blocks, -1)
+        trial_starts = (np.cumsum(trial_durations, axis=1) - trial_durations).ravel()                      # on the run clock (reset at every run)
+        trial_variables["cue_onset"] = trial_starts + trial_variables["pre_cue"]
+        trial_variables["target_onset"] = trial_variables["cue_onset"] + CUE_DURATION_FMRI + trial_variables["post_cue"]
+        trial_variables["response_onset"] = trial_variables["target_onset"] + rt
+
+    if rng.random() < effect_sizes.abort_rate:                                                              # escape pressed: the trial is saved, later ones are not
+        last_trial = rng.integers(number_of_trials)
+        kept_trials = np.arange(number_of_trials) <= last_trial
+        if layout.runs:                                                                                     # fMRI runs are launched separately, so only one run is cut short
+            kept_trials |= trial_variables["block"] != trial_variables["block"][last_trial]
+        trial_variables = {variable: values[kept_trials] for variable, values in trial_variables.items()}
+        last_trial = np.count_nonzero(kept_trials[:last_trial+1]) - 1
+        trial_variables["response"] = trial_variables["response"].astype(object)
+        trial_variables["response"][last_trial] = "escape"
+        trial_variables["correct"][last_trial] = 0
+        if np.isnan(trial_variables["rt"][last_trial]):
+            trial_variables["rt"][last_trial] = effect_sizes.base_rt
+    trial_variables |= simulate_timing(rng=rng,
+                                       trial_variables=trial_variables,
+                                       layout=layout)
+    return trial_variables
+
+def simulate_timing(rng: np.random.Generator, trial_variables: dict[str, np.ndarray], layout: VariantLayout) -> dict[str, np.ndarray]:
+    """Simulates what the task's 'FlipRecorder' measures: every phase's onset and duration (in whole frames, on a clock
+    that runs through the session, with breaks between blocks) and the number of dropped frames, each of which lengthens
+    one of the trial's phases by a frame. TMS pulses are always delivered.
+
+    Parameters:
+    rng -- a random number generator (type: np.random.Generator)
+    trial_variables -- the subject's trials, as simulated so far (type: dict[str, np.ndarray])
+    layout -- the variant's output layout (type: VariantLayout)
+
+    Returns:
+    timing_variables -- one array per column of the variant's 'timing' files (type: dict[str, np.ndarray])
+    """
+
+    task_config = load_task_config(layout.task)
+    display_times = task_config.display_times
+    frame_period = 1/task_config.monitor_info["refresh_rate_hz"]
+    reaction_times = trial_variables["rt"]
+    number_of_trials = reaction_times.size
+    phase_durations = {"cue": np.full(number_of_trials, display_times["cue"]),
+                       "target": np.where(np.isnan(reaction_times), display_times["target"], reaction_times)}
+    if "pre_cue_jitter" in trial_variables or "pre_cue" in trial_variables:
+        phase_durations["initial_fixation"] = trial_variables.get("pre_cue_jitter", trial_variables.get("pre_cue"))
+        phase_durations["later_fixation"] = trial_variables.get("post_cue_jitter", trial_variables.get("post_cue"))
+    else:                                                                                                   # EEG variants: drawn once per session
+        initial_fixations = 0.001*rng.integers(*INITIAL_FIXATION_RANGE_EEG, size=layout.trials_per_block)
+        phase_durations["initial_fixation"] = initial_fixations[trial_variables["trial_in_block"]]
+        phase_durations["later_fixation"] = np.full(number_of_trials, display_times["later_fixation"])
+    if "last_fixation" in task_config.trial_phases:                                                         # pads the trial to MAX_TRIAL_DURATION (a miss counts as no time)
+        phase_durations["last_fixation"] = (task_config.MAX_TRIAL_DURATION - np.nan_to_num(reaction_times)
+                                            - phase_durations["initial_fixation"])
+
+    phase_frames = {phase: np.maximum(np.round(durations/frame_period), 1) for phase, durations in phase_durations.items()}
+    phase_frames["target"] = np.where(np.isnan(reaction_times), phase_frames["target"],
+                                      np.ceil(reaction_times/frame_period))                                 # a response is seen on the next frame
+    phase_frames = np.stack([phase_frames[phase] for phase in task_config.trial_phases], axis=1).astype(int)  # trials x phases
+    dropped_frames = rng.poisson(DROPPED_FRAME_RATE*phase_frames.sum(axis=1))
+    for trial in np.flatnonzero(dropped_frames):
+        np.add.at(phase_frames[trial], rng.integers(len(task_config.trial_phases), size=dropped_frames[trial]), 1)
+
+    measured_durations = phase_frames*frame_period
+    trial_durations = measured_durations.sum(axis=1)
+    trial_starts = (SESSION_START + BLOCK_BREAK*trial_variables["block"]
+                    + np.cumsum(trial_durations) - trial_durations)
+    measured_onsets = trial_starts[:, None] + np.cumsum(measured_durations, axis=1) - measured_durations
+    timing_variables = {"dropped_frames": dropped_frames}
+    for position, phase in enumerate(task_config.trial_phases):
+        timing_variables[f"measured_{phase}_onset"] = measured_onsets[:, position]
+        timing_variables[f"measured_{phase}_duration"] = measured_durations[:, position]
+    if "tms_delivered" in task_config.output_columns["timing"]:
+        timing_variables["tms_delivered"] = np.ones(number_of_trials, dtype=int)
+    return timing_variables
+
+def format_rows(trial_variables: dict[str, np.ndarray], columns: list[str]) -> np.ndarray:
+    """Formats the given columns as tab-separated rows (as pandas' to_csv would write them)."""
+
+    formatted_columns = []
+    for column in columns:
+        values = trial_variables[column]
+        if values.dtype.kind == "f":
+            values = np.where(np.isnan(values), "none", values.astype(str))
+        formatted_columns.append(values.astype(str))
+    rows = formatted_columns[0]
+    for formatted_column in formatted_columns[1:]:
+        rows = np.char.add(np.char.add(rows, "\t"), formatted_column)
+    return rows
+
+def write_block_records(records_file: Path, trial_variables: dict[str, np.ndarray], in_block: np.ndarray,
+                        trial_numbers: np.ndarray, block_number: int, layout: VariantLayout):
+    """Writes one block's binary records and the session's schema file, as the task's 'SessionBuffer' does
+    (fields and codes as 'record_schema' and 'record_codes' in the variant's config.py).
+
+    Parameters:
+    records_file -- the path to the block's '.npy' file (e.g., '..._records_block-01.npy') (type: Path)
+    trial_variables -- the output of 'simulate_subject()' (type: dict[str, np.ndarray])
+    in_block -- the indices of the block's trials in 'trial_variables' (type: np.ndarray)
+    trial_numbers -- the block's trial numbers (type: np.ndarray)
+    block_number -- the block's (fMRI: run's) number, from 1 (type: int)
+    layout -- the variant's output layout (type: VariantLayout)
+    """
+
+    task_config = load_task_config(layout.task)
+    schema, codes = task_config.record_schema, task_config.record_codes
+    records = np.empty(shape=in_block.size,
+                       dtype=[(field, dtype) for field, dtype in schema.items()])
+    records["block"] = block_number
+    records["trial"] = trial_numbers
+    for field in schema:
+        if field in ["block","trial"]:
+            continue
+        values = trial_variables[field][in_block]
+        records[field] = (values[:, None] == np.array(codes[field])).argmax(axis=1) if field in codes else values          # a code is the position of its label
+    np.save(records_file, records)
+    schema_file = records_file.with_name(records_file.name.split("_block-")[0] + ".json")
+    if not schema_file.is_file():
+        with open(schema_file, "w") as json_file:
+            json.dump({"fields": schema,
+                       "codes": codes,
+                       "missing_values": "NaN in float fields (e.g., 'rt' of a miss); -1 in 'block' for rows that were never filled"},
+                      json_file,
+                      indent=4)
+
+def write_synthetic_subject(output_dir: Path, variant: str, subject_number: int, effect_sizes: EffectSizes, seed: int,
+                            block_files: bool = False):
+    """Simulates one subject and writes one .tsv file per trial (or per block) and data type (the keys of
+    'output_columns' in the variant's config.py), as the given task variant would.
+
+    Parameters:
+    output_dir -- the cohort's root folder (i.e., the equivalent of 'outputs') (type: Path object)
+    variant -- the task variant (e.g., 'task-and-eeg') (type: str)
+    subject_number -- the subject's number (type: int)
+    effect_sizes -- the parameters of the simulated subject (type: EffectSizes)
+    seed -- the seed shared by the cohort (type: int)
+    block_files -- whether to write one file per block, with a 'trial' column, and the block's binary records, as the
+                   task's 'TrialWriter' does (type: bool)
+    """
+
+    layout = variants[variant]
+    subject_id = f"{subject_number:02d}"
+    session_folder = Path(output_dir) / f"sub-{subject_id}" / f"ses-{layout.session}"
+    trial_variables = simulate_subject(subject_number=subject_number,
+                                       layout=layout,
+                                       effect_sizes=effect_sizes,
+                                       seed=seed)
+
+    for data_type, columns in load_task_config(layout.task).output_columns.items():
+        header = "\t".join(columns)
+        rows = format_rows(trial_variables, columns)
+        folder = "onsets" if data_type == "onsets" else "beh"                                           # 'timing' files go next to the 'beh' files
+        for block in np.unique(trial_variables["block"]):
+            if layout.runs:                                                                             # sub-xx/ses-mri/run-yy/<folder>/..._run-yy_<data_type>_<trial in run>.tsv
+                run_id = f"{block+1:02d}"
+                destination = session_folder / f"run-{run_id}" / folder
+                filename_prefix = f"sub-{subject_id}_task-mANT_run-{run_id}_{data_type}"
+            else:                                                                                       # sub-xx/ses-yy/beh/..._<data_type>_<trial in session>.tsv
+                destination = session_folder / folder
+                filename_prefix = f"sub-{subject_id}_task-mANT_{data_type}"
+            destination.mkdir(parents=True, exist_ok=True)
+            in_block = np.flatnonzero(trial_variables["block"] == block)
+            if block_files:                                                                             # ..._<data_type>_block-yy.tsv
+                trial_numbers = trial_variables["trial_in_block"][in_block] if layout.runs else in_block
+                block_rows = np.char.add(np.char.add(trial_numbers.astype(str), "\t"), rows[in_block])
+                with open(destination / f"{filename_prefix}_block-{block+1:02d}.tsv", "w") as block_file:
+                    block_file.write("trial\t" + header + "\n" + "\n".join(block_rows) + "\n")
+                if data_type == "beh":                                                                  # ..._records_block-yy.npy
+                    write_block_records(records_file=destination / f"{filename_prefix.removesuffix('_beh')}_records_block-{block+1:02d}.npy",
+                                        trial_variables=trial_variables,
+                                        in_block=in_block,
+                                        trial_numbers=trial_numbers,
+                                        block_number=block+1,
+                                        layout=layout)
+                continue
+            for trial_index in in_block:
+                trial_number = trial_variables["trial_in_block"][trial_index] if layout.runs else trial_index
+                with open(destination / f"{filename_prefix}_{trial_number}.tsv", "w") as trial_file:
+                    trial_file.write(f"{header}\n{rows[trial_index]}\n")
+
+def write_subject_chunk(output_dir: Path, variant: str, subject_numbers: list[int], effect_sizes: EffectSizes, seed: int,
+                        block_files: bool = False):
+    """Writes several subjects in a row (one worker's share of the cohort)."""
+
+    for subject_number in subject_numbers:
+        write_synthetic_subject(output_dir=output_dir,
+                                variant=variant,
+                                subject_number=subject_number,
+                                effect_sizes=effect_sizes,
+                                seed=seed,
+                                block_files=block_files)
+
+def write_synthetic_cohort(output_dir: str, variant: str, sample_size: int, effect_sizes: EffectSizes = EffectSizes(),
+                           seed: int = 0, workers: int | None = None, block_files: bool = False) -> Path:
+    """Writes a synthetic cohort in the given variant's layout, spreading subjects across worker processes.
+    Each subject's data only depend on 'seed' and the subject's number (not on how work is split).
+
+    Parameters:
+    output_dir -- the cohort's root folder (i.e., the equivalent of 'outputs') (type: str)
+    variant -- the task variant: 'task-only', 'task-and-eeg', 'task-and-fmri', or 'task-and-eeg-tms' (type: str)
+    sample_size -- the number of subjects (type: int)
+    effect_sizes -- the parameters of the simulated subjects (type: EffectSizes)
+    seed -- the seed of the random number generator (type: int)
+    workers -- the number of worker processes (default: one per CPU) (type: int or None)
+    block_files -- whether to write one file per block instead of one per trial (type: bool)
+
+    Returns:
+    output_dir -- the cohort's root folder (type: Path object)
+    """
+
+    if variant not in variants:
+        raise ValueError(f"'variant' can only be one of {list(variants)}")
+    output_dir = Path(output_dir)
+    workers = min(workers or os.cpu_count(), sample_size)
+    subject_chunks = np.array_split(np.arange(1, sample_size+1), workers)
+    if workers == 1:
+        write_subject_chunk(output_dir, variant, subject_chunks[0].tolist(), effect_sizes, seed, block_files)
+        return output_dir
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(write_subject_chunk, output_dir, variant, chunk.tolist(), effect_sizes, seed, block_files) for chunk in subject_chunks]
+        for future in futures:
+            future.result()
+    return output_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic mANT data")
+    parser.add_argument("output_dir", type=Path)
+    parser.add_argument("variant", choices=list(variants))
+    parser.add_argument("sample_size", type=int)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--miss-rate", type=float, default=EffectSizes.miss_rate)
+    parser.add_argument("--abort-rate", type=float, default=EffectSizes.abort_rate)
+    parser.add_argument("--block-files", action="store_true", help="one file per block, as the task's default output")
+    arguments = parser.parse_args()
+    write_synthetic_cohort(output_dir=arguments.output_dir,
+                           variant=arguments.variant,
+                           sample_size=arguments.sample_size,
+                           effect_sizes=EffectSizes(miss_rate=arguments.miss_rate,
+                                                    abort_rate=arguments.abort_rate),
+                           seed=arguments.seed,
+                           workers=arguments.workers,
+                           block_files=arguments.block_files)
@@ -1,6 +1,5 @@
 import random
 
-from psychopy import monitors, visual
    
    
 conditions_file = "mant-conditions.csv"
@@ -18,29 +17,46 @@ output_variables = ["cue_location",
                     "correct",
                     "rt",
                     "tms_timing"]
+trial_phases = ["initial_fixation",                  # in the order in which they are shown (see 'utils.FlipRecorder')
+                "cue",
+                "later_fixation",
+                "target",
+                "last_fixation"]
+timing_variables = [f"measured_{phase}_{measure}" for phase in trial_phases for measure in ["onset","duration"]] + ["dropped_frames"]
+record_schema = {"block": "int8",                    # 0: training; -1: a row that was never filled
+                 "trial": "int16",
+                 "cue_location": "int8",             # int8 categories are stored as codes, i.e. positions in 'record_codes'
+                 "sequence_location": "int8",
+                 "cue_type": "int8",
+                 "target_congruent": "int8",
+                 "target_direction": "int8",
+                 "response": "int8",
+                 "correct": "int8",                  # 1: correct, 0: incorrect, -1: miss
+                 "rt": "float64",                    # seconds (NaN: miss)
+                 "tms_timing": "int8"}
+record_schema |= {variable: "float64" for variable in timing_variables[:-1]}            # measured, in seconds on the clock of 'window.flip()'
+record_schema["dropped_frames"] = "int16"
+record_schema["tms_delivered"] = "int8"                                                # 1: the trial's TMS pulse was sent; 0: it was not (e.g., escape)
+record_codes = {"cue_location": ["up","down","both"],
+                "sequence_location": ["up","down"],
+                "cue_type": ["spatial valid","double"],
+                "target_congruent": ["yes","no"],
+                "target_direction": ["left","right"],
+                "response": ["miss","left","right","escape"],
+                "tms_timing": ["fixed","random"]}
+output_columns = {"beh": output_variables,                                 # .tsv columns (record fields) per data type
+                  "timing": timing_variables + ["tms_delivered"]}
                     
+trial_writer_settings = {"flush_policy": "trial",     # "trial": flush and fsync every trial; "flush": flush every trial, fsync at block end (the master script's journal needs either)
+                         "per_trial_files": False}    # True: one .tsv file per trial (as in earlier versions) instead of one per block
+flip_buffer_size = 65536                             # flips kept by 'utils.FlipRecorder' (18 minutes at 60 Hz); older flips are overwritten
+timing_policy = "deadline"                           # "deadline": phases end at a time set by 'display_times', so that late frames do not delay the
+                                                     # rest of the block; "frames": phases last a number of flips (see 'utils.FlipRecorder')
 monitor_info = {"name": "monitor-eeglab", 
                 "size_pixels": [2560,1440],      
                 "width_cm": (61),             
                 "subject_distance_cm": 65,
                 "refresh_rate_hz": 60}
-monitor = monitors.Monitor(name=monitor_info["name"])
-monitor.setSizePix(monitor_info["size_pixels"]) 
-monitor.setWidth(monitor_info["width_cm"]) 
-monitor.setDistance(monitor_info["subject_distance_cm"]) 
-monitor.saveMon()
-
-window = visual.Window(size=monitor.getSizePix(),
-                       fullscr=True, 
-                       screen=0,
-                       winType="pyglet", 
-                       allowStencil=False,
-                       monitor=monitor.name,
-                       color=[0.0039, 0.0039, 0.0039],
-                       colorSpace="rgb",
-                       blendMode="avg", 
-                       useFBO=True,
-                       units="deg")
 
 PORT_ADDRESS = "0x3FD8"
 TMS_TARGET_MILLISECONDS = 700                               # post cue offset
@@ -93,230 +109,110 @@ fixation_vertices = [[0.275,1.035-1.06],
                      [0.025,0.785-1.06],
                      [0.025,1.035-1.06]]
 
-fixation = visual.ShapeStim(win=window,
-                            name="fixation_cross",
-                            vertices=fixation_vertices,
-                            units="deg",
-                            size=(1,1),
-                            ori=0.0,
-                            pos=(0,0),
-                            anchor="center",
-                            lineWidth=1.0,
-                            colorSpace="rgb",
-                            lineColor="black",
-                            fillColor="black",
-                            opacity=None,
-                            depth=0.0,
-                            interpolate=True)
-
-# the asterisk cue is actually an overlap of four lines. 
-# each line has a start and an end that will be defined iteratively on every trial because the cue's position varies across trials  
-
-# vertical line
-cue1_vertical = visual.line.Line(window,
-                                name="cue1_vertical",
+# stimulus geometry, used by 'make_conditions.py' to compute the vertices in the conditions files (in degrees)
+locations = {"up": 1.06,                                    # vertical position of the arrows' centre; below fixation, stimuli are mirror images
+             "down": -1.06}
+double_cue_locations = ["up","down"]                        # one asterisk per location (cue1, cue2, ...) for double cues
+stimulus_geometry = {"arrow_size": 1.0,                     # scales 'arrow_vertices'
+                     "arrow_spacing": 0.61,                 # between the centres of neighbouring arrows
+                     "flankers_per_side": 2,
+                     "cue_size": 0.275,                     # half the width (and height) of the asterisk
+                     "cue_offset": 0.0}                     # vertical distance from the arrows' centre to the asterisk's
+arrow_vertices = [[0.275,0],                                # a left-pointing arrow centred on (0,0), above fixation
+                  [0.275,0.0125],
+                  [-0.22,0.0125],
+                  [-0.15,0.125],
+                  [-0.275,0.00625],
+                  [-0.15,-0.1],
+                  [-0.22,0]]
+asterisk_lines = {"vertical": [[0,-1],[0,1]],               # start and end of each line of the asterisk, in units of 'cue_size'
+                  "horizontal": [[-1,0],[1,0]],
+                  "rightleft": [[1,1],[-1,-1]],
+                  "leftright": [[-1,1],[1,-1]]}
+condition_factors = {"sequence_location": list(locations),  # crossed by 'make_conditions.py' (cue_location follows from cue_type and sequence_location)
+                     "cue_type": ["spatial valid","double"],
+                     "target_direction": ["left","right"],
+                     "target_congruent": ["yes","no"],
+                     "tms_timing": ["fixed","random"]}
+
+stimulus_styles = {"cue": {"closeShape": False,             # one open line per asterisk (see 'utils.batch_vertices()')
+                           "lineWidth": 2.0,
+                           "colorSpace": "rgb",
+                           "lineColor": "black",
+                           "fillColor": None,
+                           "interpolate": True},
+                   "arrows": {"colorSpace": "rgb",          # one shape for the flankers + target sequence, one contour per arrow
+                              "lineColor": None,            # (a multi-contour shape is filled, without a border)
+                              "fillColor": "black",
+                              "interpolate": True}}         # one stimulus per condition, built by 'utils.build_stimulus_sets()'
+
+display_names = ["monitor",
+                 "window",
+                 "fixation"]                               # built on first use (see '__getattr__()'), not at import
+
+def set_up_monitor():
+    """Loads the monitor's saved calibration, and saves it again only if it differs from 'monitor_info'."""
+
+    from psychopy import monitors
+
+    monitor = monitors.Monitor(name=monitor_info["name"])
+    saved_size_pixels = monitor.getSizePix()
+    if (saved_size_pixels is None or list(saved_size_pixels) != monitor_info["size_pixels"]
+            or monitor.getWidth() != monitor_info["width_cm"]
+            or monitor.getDistance() != monitor_info["subject_distance_cm"]):
+        monitor.setSizePix(monitor_info["size_pixels"]) 
+        monitor.setWidth(monitor_info["width_cm"]) 
+        monitor.setDistance(monitor_info["subject_distance_cm"]) 
+        monitor.saveMon()
+    return monitor
+
+def build_display():
+    """Opens the window and builds the fixation cross (cues and arrows are built per condition, see
+    'utils.build_stimulus_sets()').
+
+    Returns:
+    display -- the monitor, the window and the fixation cross, by name (see 'display_names') (type: dict)
+    """
+
+    from psychopy import visual
+
+    monitor = set_up_monitor()
+    window = visual.Window(size=monitor.getSizePix(),
+                           fullscr=True, 
+                           screen=0,
+                           winType="pyglet", 
+                           allowStencil=False,
+                           monitor=monitor.name,
+                           color=[0.0039, 0.0039, 0.0039],
+                           colorSpace="rgb",
+                           blendMode="avg", 
+                           useFBO=True,
+                           units="deg")
+
+    fixation = visual.ShapeStim(win=window,
+                                name="fixation_cross",
+                                vertices=fixation_vertices,
                                 units="deg",
                                 size=(1,1),
-                                start=(None,None),
-                                end=(None,None),
                                 ori=0.0,
                                 pos=(0,0),
                                 anchor="center",
-                                lineWidth=2.0,
+                                lineWidth=1.0,
                                 colorSpace="rgb",
                                 lineColor="black",
+                                fillColor="black",
+                                opacity=None,
+                                depth=0.0,
                                 interpolate=True)
 
-# horizontal line
-cue1_horizontal = visual.line.Line(window,
-                                  name="cue1_horizontal",
-                                  units="deg",
-                                  size=(1,1),
-                                  start=(None,None),
-                                  end=(None,None),
-                                  ori=0.0,
-                                  pos=(0,0),
-                                  anchor="center",
-                                  lineWidth=2.0,
-                                  colorSpace="rgb",
-                                  lineColor="black",
-                                  interpolate=True)
-
-# first oblique line (top right to bottom left)
-cue1_rightleft = visual.line.Line(window,
-                                 name="cue1_rightleft",
-                                 units="deg",
-                                 size=(1,1),
-                                 start=(None,None),
-                                 end=(None,None),
-                                 ori=0.0,
-                                 pos=(0,0),
-                                 anchor="center",
-                                 lineWidth=2,
-                                 colorSpace="rgb",
-                                 lineColor="black",
-                                 interpolate=True)
-
-# second oblique line (top left to bottom right)
-cue1_leftright = visual.line.Line(window,
-                                 name="cue1_leftright",
-                                 units="deg",
-                                 size=(1,1),
-                                 start=(None,None),
-                                 end=(None,None),
-                                 ori=0.0,
-                                 pos=(0,0),
-                                 anchor="center",
-                                 lineWidth=2,
-                                 colorSpace="rgb",
-                                 lineColor="black",
-                                 interpolate=True)
-
-# vertical line
-cue2_vertical = visual.line.Line(window,
-                                 name="cue2_vertical",
-                                 units="deg",
-                                 size=(1,1),
-                                 start=(None,None),
-                                 end=(None,None),
-                                 ori=0.0,
-                                 pos=(0,0),
-                                 anchor="center",
-                                 lineWidth=2.0,
-                                 colorSpace="rgb",
-                                 lineColor="black",
-                                 interpolate=True)
-
-# horizontal line
-cue2_horizontal = visual.line.Line(window,
-                                   name="cue2_horizontal",
-                                   units="deg",
-                                   size=(1,1),
-                                   start=(None,None),
-                                   end=(None,None),
-                                   ori=0.0,
-                                   pos=(0,0),
-                                   anchor="center",
-                                   lineWidth=2.0,
-                                   colorSpace="rgb",
-                                   lineColor="black",
-                                   interpolate=True)
-
-# first oblique line (top right to bottom left)
-cue2_rightleft = visual.line.Line(window,
-                                  name="cue2_rightleft",
-                                  units="deg",
-                                  size=(1,1),
-                                  start=(None,None),
-                                  end=(None,None),
-                                  ori=0.0,
-                                  pos=(0,0),
-                                  anchor="center",
-                                  lineWidth=2,
-                                  colorSpace="rgb",
-                                  lineColor="black",
-                                  interpolate=True)
-
-# second oblique line (top left to bottom right)
-cue2_leftright = visual.line.Line(window,
-                                  name="cue2_leftright",
-                                  units="deg",
-                                  size=(1,1),
-                                  start=(None,None),
-                                  end=(None,None),
-                                  ori=0.0,
-                                  pos=(0,0),
-                                  anchor="center",
-                                  lineWidth=2,
-                                  colorSpace="rgb",
-                                  lineColor="black",
-                                  interpolate=True)
-
-# leftmost flanker
-flanker1 = visual.ShapeStim(window, 
-                            name="flanker1", 
-                            units="deg",
-                            size=(1,1),
-                            vertices=None,
-                            ori=0.0,
-                            pos=(0,0),
-                            anchor="center",
-                            lineWidth=1.0,
-                            colorSpace="rgb",
-                            lineColor="black",
-                            fillColor="black",
-                            interpolate=True)
-
-# second-from-left flanker
-flanker2 = visual.ShapeStim(window, 
-                            name="flanker2", 
-                            units="deg",
-                            size=(1,1),
-                            vertices=None,
-                            ori=0.0,
-                            pos=(0,0),
-                            anchor="center",
-                            lineWidth=1.0,
-                            colorSpace="rgb",
-                            lineColor="black",
-                            fillColor="black",
-                            interpolate=True)
-   
-target = visual.ShapeStim(window, 
-                          name="target", 
-                          units="deg",
-                          size=(1,1),
-                          vertices=None,
-                          ori=0.0,
-                          pos=(0,0),
-                          anchor="center",
-                          lineWidth=1.0,
-                          colorSpace="rgb",
-                          lineColor="black",
-                          fillColor="black",
-                          interpolate=True)
-
-# second-from-right flanker
-flanker3 = visual.ShapeStim(window, 
-                            name="flanker3", 
-                            units="deg",
-                            size=(1,1),
-                            vertices=None,
-                            ori=0.0,
-                            pos=(0,0),
-                            anchor="center",
-                            lineWidth=1.0,
-                            colorSpace="rgb",
-                            lineColor="black",
-                            fillColor="black",
-                            interpolate=True)
+    display = dict(locals())
+    return {name: display[name] for name in display_names}
 
-# rightmost flanker
-flanker4 = visual.ShapeStim(window, 
-                            name="flanker4", 
-                            units="deg",
-                            size=(1,1),
-                            vertices=None,
-                            ori=0.0,
-                            pos=(0,0),
-                            anchor="center",
-                            lineWidth=1.0,
-                            colorSpace="rgb",
-                            lineColor="black",
-                            fillColor="black",
-                            interpolate=True)
+def __getattr__(name):
+    """Builds the window and the stimuli the first time one of them is asked for (e.g., 'config.window'), so that importing
+    this module does not open a window."""
 
-asterisk_components = [cue1_vertical, 
-                       cue1_horizontal,
-                       cue1_rightleft,
-                       cue1_leftright,
-                       cue2_vertical, 
-                       cue2_horizontal,
-                       cue2_rightleft,
-                       cue2_leftright]
-                 
-arrows = [flanker1,
-          flanker2,
-          target, 
-          flanker3,
-          flanker4]
\ No newline at end of file
+    if name in display_names:
+        globals().update(build_display())
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
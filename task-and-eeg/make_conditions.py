@@ -0,0 +1,162 @@
+""" Computes the stimulus vertices of a conditions file (e.g., 'mant-conditions.csv') from the geometry in 'config.py'
+('locations', 'stimulus_geometry', 'arrow_vertices', 'asterisk_lines'), rather than writing them by hand.
+
+Trials are either a full factorial design ('config.condition_factors', repeated '--repetitions' times), or the trials of an
+existing conditions file ('--design-from'), whose non-stimulus columns are kept as they are. All vertices are computed at
+once with NumPy, so designs with many locations, flankers or trials take no time to make. The conditions file is saved
+along with its binary cache (see 'utils.load_conditions()').
+
+Usage:
+python make_conditions.py <conditions_file> [--repetitions 1] [--design-from <conditions_file>] """
+
+import argparse
+import csv
+import hashlib
+import io
+import itertools
+import os
+from pathlib import Path
+
+import numpy as np
+
+import config
+
+
+def make_factorial_design(factors, repetitions=1):
+    """Crosses all levels of all factors.
+
+    Parameters:
+    factors -- the levels of each factor, by factor name (e.g., 'config.condition_factors') (type: dict)
+    repetitions -- how many times each combination of levels appears (type: int)
+
+    Returns:
+    design -- one column of labels per factor, plus 'cue_location' (type: dict[str, np.ndarray])
+    """
+
+    combinations = np.array(list(itertools.product(*factors.values())) * repetitions)
+    design = {factor: combinations[:, column] for column, factor in enumerate(factors)}
+    design = {"cue_location": np.where(design["cue_type"] == "double", "both", design["sequence_location"])} | design
+    return design
+
+def read_design(conditions_file):
+    """Reads the non-stimulus columns (i.e., the trials' attributes) of an existing conditions file.
+
+    Parameters:
+    conditions_file -- the conditions file (type: str or Path)
+
+    Returns:
+    design -- one column of labels per attribute (type: dict[str, np.ndarray])
+    """
+
+    with open(conditions_file, newline="", encoding="utf-8-sig") as file:
+        rows = list(csv.DictReader(file))
+    return {column: np.array([row[column] for row in rows]) for column in rows[0] if not rows[0][column].lstrip().startswith("[")}
+
+def compute_vertices(design, geometry=config.stimulus_geometry, locations=config.locations, double_cue_locations=config.double_cue_locations):
+    """Computes the vertices of every cue line and every arrow, for all trials at once. Stimuli below fixation
+    (negative locations) are mirror images of those above it; right-pointing arrows are mirror images of left-pointing ones.
+
+    Parameters:
+    design -- one column of labels per trial attribute (output of 'make_factorial_design()' or 'read_design()') (type: dict)
+    geometry -- sizes and distances (see 'config.stimulus_geometry') (type: dict)
+    locations -- the vertical position of each location (see 'config.locations') (type: dict)
+    double_cue_locations -- where the asterisks of double cues are (see 'config.double_cue_locations') (type: list[str])
+
+    Returns:
+    vertices -- one array per stimulus (cue1_vertical, ..., flanker1, flanker2, target, ...), trials x vertices x 2, NaN for
+                cues that are not shown (type: dict[str, np.ndarray])
+    """
+
+    positions = np.array([locations[location] for location in design["sequence_location"]])
+    cue_positions = np.full(shape=(len(positions), len(double_cue_locations)), fill_value=np.nan)
+    is_double = design["cue_type"] == "double"
+    cue_positions[~is_double, 0] = positions[~is_double]
+    cue_positions[is_double] = [locations[location] for location in double_cue_locations]
+    cue_positions += np.sign(cue_positions)*geometry["cue_offset"]
+
+    lines = geometry["cue_size"]*np.array(list(config.asterisk_lines.values()), dtype=float)                   # lines x ends x 2
+    cue_x = np.broadcast_to(lines[..., 0], cue_positions.shape + lines.shape[:-1])                            # trials x cues x lines x ends
+    cue_y = cue_positions[:, :, None, None] + np.sign(cue_positions)[:, :, None, None]*lines[..., 1]
+    cue_x = np.where(np.isnan(cue_y), np.nan, cue_x)
+    cues = np.stack([cue_x, cue_y], axis=-1)
+
+    arrow = geometry["arrow_size"]*np.array(config.arrow_vertices, dtype=float)                                 # vertices x 2, pointing left
+    flankers_per_side = geometry["flankers_per_side"]
+    arrow_centres = geometry["arrow_spacing"]*(np.arange(2*flankers_per_side + 1) - flankers_per_side)
+    target_sign = np.where(design["target_direction"] == "left", 1.0, -1.0)
+    flanker_sign = np.where(design["target_congruent"] == "yes", target_sign, -target_sign)
+    arrow_signs = np.repeat(flanker_sign[:, None], arrow_centres.size, axis=1)
+    arrow_signs[:, flankers_per_side] = target_sign
+    arrow_x = arrow_centres[None, :, None] + arrow_signs[:, :, None]*arrow[None, None, :, 0]                   # trials x arrows x vertices
+    arrow_y = positions[:, None, None] + np.sign(positions)[:, None, None]*arrow[None, None, :, 1]
+    arrows = np.stack([arrow_x, np.broadcast_to(arrow_y, arrow_x.shape)], axis=-1)
+
+    arrow_names = [f"flanker{number}" for number in range(1, flankers_per_side + 1)] + ["target"] + \
+                  [f"flanker{number}" for number in range(flankers_per_side + 1, 2*flankers_per_side + 1)]
+    vertices = {f"cue{cue + 1}_{line}": cues[:, cue, line_index] for cue in range(cues.shape[1]) for line_index, line in enumerate(config.asterisk_lines)}
+    vertices |= {name: arrows[:, arrow_index] for arrow_index, name in enumerate(arrow_names)}
+    return {name: np.round(values, 6) for name, values in vertices.items()}
+
+def format_vertices(vertices):
+    """Writes one trial's vertices as in the conditions files (e.g., '[[0, 0.785],[0, 1.335]]', None for NaN)."""
+
+    def format_number(number):
+        return "None" if np.isnan(number) else np.format_float_positional(number, precision=6, trim="-")
+
+    return "[" + ",".join(f"[{format_number(x)}, {format_number(y)}]" for x, y in vertices) + "]"
+
+def write_conditions(conditions_file, design, vertices):
+    """Saves a conditions file (stimulus columns first, then the trials' attributes) and its binary cache, in the format of
+    'utils.compile_conditions()', so that the task does not need to parse the new file.
+
+    Parameters:
+    conditions_file -- where to save the conditions (type: str or Path)
+    design -- one column of labels per trial attribute (type: dict[str, np.ndarray])
+    vertices -- one array per stimulus (output of 'compute_vertices()') (type: dict[str, np.ndarray])
+    """
+
+    conditions_file = Path(conditions_file)
+    for attribute, labels in design.items():
+        unknown_labels = set(labels.tolist()) - set(config.record_codes.get(attribute, labels.tolist()))
+        if unknown_labels:
+            raise ValueError(f"{sorted(unknown_labels)} cannot be saved as '{attribute}': add them to config.record_codes['{attribute}']")
+
+    text = io.StringIO()
+    writer = csv.writer(text, lineterminator="\n")
+    writer.writerow(list(vertices) + list(design))
+    for trial in range(len(design["cue_type"])):
+        writer.writerow([format_vertices(values[trial]) for values in vertices.values()] + [labels[trial] for labels in design.values()])
+    conditions_text = text.getvalue().encode("utf-8")
+    conditions_file.write_bytes(conditions_text)
+
+    arrays = {"sha256": np.array(hashlib.sha256(conditions_text).hexdigest()),
+              "columns": np.array(list(vertices) + list(design))}
+    arrays |= {f"vertices_{name}": values.astype(np.float32) for name, values in vertices.items()}
+    for attribute, labels in design.items():
+        unique_labels, codes = np.unique(labels, return_inverse=True)
+        arrays[f"labels_{attribute}"] = unique_labels
+        arrays[f"codes_{attribute}"] = codes.astype(np.int8)
+    cache_file = conditions_file.with_suffix(".cache.npz")
+    temporary_file = cache_file.with_name(cache_file.name + ".tmp")
+    with open(temporary_file, "wb") as file:
+        np.savez(file, **arrays)
+    os.replace(temporary_file, cache_file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Computes the stimulus vertices of an mANT conditions file")
+    parser.add_argument("conditions_file", help="where to save the conditions (e.g., mant-conditions.csv)")
+    parser.add_argument("--repetitions", type=int, default=1, help="repetitions of the factorial design (config.condition_factors)")
+    parser.add_argument("--design-from", default=None, help="take trials from an existing conditions file instead of a factorial design")
+    arguments = parser.parse_args()
+
+    if arguments.design_from is None:
+        design = make_factorial_design(factors=config.condition_factors,
+                                       repetitions=arguments.repetitions)
+    else:
+        design = read_design(conditions_file=arguments.design_from)
+    vertices = compute_vertices(design=design)
+    write_conditions(conditions_file=arguments.conditions_file,
+                     design=design,
+                     vertices=vertices)
+    print(f"{len(design['cue_type'])} trials, {len(vertices)} stimuli saved to {arguments.conditions_file}")
@@ -1,33 +1,22 @@
+import ast
+import atexit
+import csv
+import hashlib
+import io
+import json
+import os
+import queue
 import random
+import threading
 from pathlib import Path
+import time
+import zipfile
 
-import pandas as pd
-from psychopy import visual, event
+import numpy as np
+from psychopy import data, visual, event
 
 import config
 
-def set_up_output(number_of_blocks, number_of_trials, output_variables):
-    """Creates a list of (n_trials, n_outputs) tables (one per block).
-    Table columns are labelled with the name of the respective output variable.
-    Output tables will be concatenated vertically (i.e., piled up) into a single 
-    (n_trials_across_blocks, n_outputs) table at the end of the experiment. 
-
-    Parameters: 
-    number_of_blocks -- the number of experimental blocks (type: int)
-    number_of_trials -- the number of trials per block (type: int)
-    output_variables -- a list of output variables (type: list)
-
-    Returns:
-    tables -- a list of output tables (one per block) (type: list)
-    """
-
-    tables = []
-    for block in range(number_of_blocks):
-        table = pd.DataFrame(index=range(number_of_trials),
-                             columns=output_variables)
-        tables.append(table)     
-    return tables
-
 def make_directories(experiment_info):
     """Creates a BIDS-style hierarchy of folders.
     
@@ -82,64 +71,47 @@ def display_text(file_to_read, window, display_duration):
     else:
         return None
 
-def display_demos(trials_pool, window, demos, demos_frames):
-    """Displays examples of experimental stimuli. 
+def display_demos(trials_pool, window, fixation, demos_frames):
+    """Displays examples of experimental stimuli: the fixation cross, then the cue and the arrows of a random condition.
 
     Parameters:
-    trials_pool -- the container from which examples are drawn. 
-                   ('trialList' attribute of a PsychoPy TrialHandler object)  
+    trials_pool -- the conditions from which examples are drawn (output of 'build_stimulus_sets()') (type: list[dict])
     window -- where the text must show up (PsychoPy Window object)
-    demos -- the demos to display (type: list)
+    fixation -- the fixation cross, shown throughout the demos (PsychoPy ShapeStim object)
     demos_frames -- how long to display the demos for (in units of frames) (type: list)
     """
 
     demo_trial_number = random.randint(0,len(trials_pool)-1)
-    try:
-        iter(demos[1])        
-        for line in demos[1]:                                       
-            line.setStart(trials_pool[demo_trial_number][line.name][0])                                           
-            line.setEnd(trials_pool[demo_trial_number][line.name][1])
-    except TypeError:
-        pass
-    for arrow in demos[2]:                                              
-        arrow.setVertices(trials_pool[demo_trial_number][arrow.name])  
-
-    demos[0].setAutoDraw(True)                                               
+    demo_trial = trials_pool[demo_trial_number]
+    cues = demo_trial["cue_stimuli"]
+    arrows = demo_trial["arrow_stimulus"]
+
+    fixation.setAutoDraw(True)                                               
     for frame in range(demos_frames[0]):    
         keys = event.getKeys(keyList=["space"])
         if len(keys)>0:
             break
         window.flip() 
-    try:
-        iter(demos[1])
-        for line in demos[1]:                                       
-            line.setAutoDraw(True)
-    except TypeError:
-        demos[1].setAutoDraw(True)
+    for cue in cues:
+        cue.setAutoDraw(True)
     for frame in range(demos_frames[1]):  
         keys = event.getKeys(keyList=["space"])
         if len(keys)>0:
             break                            
         window.flip() 
-    try:
-        iter(demos[1])
-        for line in demos[1]:                                       
-            line.setAutoDraw(False)
-    except TypeError:
-        demos[1].setAutoDraw(False)
-
-    for arrow in demos[2]:                                          
-        arrow.setAutoDraw(True)
+    for cue in cues:
+        cue.setAutoDraw(False)
+
+    arrows.setAutoDraw(True)
     for frame in range(demos_frames[2]):
         keys = event.getKeys(keyList=["space"])
         if len(keys)>0:
             break                              
         window.flip()
-    for arrow in demos[2]:                                          
-        arrow.setAutoDraw(False)
-    config.fixation.setAutoDraw(False)
+    arrows.setAutoDraw(False)
+    fixation.setAutoDraw(False)
 
-def run_trials_save_data(trials, elapsed_trials, response_clock, beh_data_folder, experiment_info, port):
+def run_trials_save_data(trials, elapsed_trials, response_clock, beh_data_folder, trial_writer, session_buffer, block, port, flip_recorder, first_trial=0):
     """Runs experimental trials and saves dependent variables (response, reaction time).
 
     Parameters:
@@ -147,47 +119,56 @@ def run_trials_save_data(trials, elapsed_trials, response_clock, beh_data_folder
     elapsed_trials -- the number of elapsed trials (type: int)
     response_clock -- the clock that times responses to stimuli (PsychoPy Clock object) 
     beh_data_folder -- the path to the destination folder for output data (type: str)
-    experiment_info -- experiment metadata (type: dict) 
+    trial_writer -- saves trials in the background (type: TrialWriter)
+    session_buffer -- stores the trials' records (type: SessionBuffer)
+    block -- the block being run (e.g., 1, or "training") (type: int or str)
     port -- a parallel port to interact with external hardware (type: PsychoPy ParallelPort object)
+    flip_recorder -- flips the window on schedule and measures the timing of every trial (type: FlipRecorder)
+    first_trial -- the position in the block of the first trial in 'trials' (e.g., when resuming a block) (type: int)
     """
     
-    for trial_number, trial_components in enumerate(trials):
+    record = TrialRecord()
+    record.block = 0 if block == "training" else block
+    flip_recorder.restart_schedule()                                                    # the first trial starts at its first flip
+    for trial_number, trial_components in enumerate(trials, start=first_trial):
+        first_flip = flip_recorder.count                                                # this trial's flips are measured once it is over
         response = None
         reaction_time = None        
-        for line in config.asterisk_components:                                         # draw all lines (i.e, the cue's components)
-            line.setStart(trial_components[line.name][0])                               # each line has a start 
-            line.setEnd(trial_components[line.name][1])                                 # and an end
-        for arrow in config.arrows:                                                     # also draw all arrows (i.e., the flankers + target sequence)
-            arrow.setVertices(trial_components[arrow.name])                             # arrows are a bit complex, so I defined them with custom vertices
+        cues = trial_components["cue_stimuli"]                                          # one asterisk (two for double cues), built before the task
+        arrows = trial_components["arrow_stimulus"]                                     # (see 'build_stimulus_sets()'): nothing to set up between trials
 
         config.fixation.setAutoDraw(True)                                               # automatically draw the fixation 
-        for frame in range(config.frames_per_item["initial_fixation"][trial_number]):   # on every frame that it must appear on
-            config.window.flip()
+        flip_recorder.show_phase(phase="initial_fixation",                              # on every frame that it must appear on
+                                 duration=config.display_times["initial_fixation"][trial_number],
+                                 frames=config.frames_per_item["initial_fixation"][trial_number])
 
-        for line in config.asterisk_components:                                         # automatically draw the asterisk cue
-            line.setAutoDraw(True)
+        for cue in cues:                                                                # automatically draw the asterisk cue
+            cue.setAutoDraw(True)
         
         if trial_components["cue_type"] == "spatial valid":
             port.setData(int("00000010",2))
         elif trial_components["cue_type"] == "double":
             port.setData(int("00000011",2))
         
-        for frame in range(config.frames_per_item["cue"]):                              # on every frame that it must appear on
-            config.window.flip()
+        flip_recorder.show_phase(phase="cue",                                           # on every frame that it must appear on
+                                 duration=config.display_times["cue"],
+                                 frames=config.frames_per_item["cue"])
             
-        for line in config.asterisk_components:                                         # relevant frames now ended, so stop drawing the asterisk cue
-            line.setAutoDraw(False)
+        for cue in cues:                                                                # relevant frames now ended, so stop drawing the asterisk cue
+            cue.setAutoDraw(False)
         
-        for frame in range(config.frames_per_item["later_fixation"]):                   # 1.1 s of cross only
-            config.window.flip()
+        flip_recorder.show_phase(phase="later_fixation",                                # 1.1 s of cross only
+                                 duration=config.display_times["later_fixation"],
+                                 frames=config.frames_per_item["later_fixation"])
 
-        for arrow in config.arrows:                                                     # draw the flankers + target sequence automatically
-            arrow.setAutoDraw(True)
+        arrows.setAutoDraw(True)                                                        # draw the flankers + target sequence automatically
             
         config.window.callOnFlip(response_clock.reset)
         event.clearEvents()
 
-        for frame in range(config.frames_per_item["target"]):                           # on every frame that it must appear on
+        for frame in flip_recorder.phase_frames(phase="target",                         # on every frame that it must appear on
+                                                duration=config.display_times["target"],
+                                                frames=config.frames_per_item["target"]):
             if frame == 0 and trial_components["target_congruent"] == "yes":
                 port.setData(int("00000100",2))
             elif frame == 0 and trial_components["target_congruent"] == "no":
@@ -200,10 +181,8 @@ def run_trials_save_data(trials, elapsed_trials, response_clock, beh_data_folder
                     trials.finished = True
                 reaction_time = response_clock.getTime()
                 break
-            config.window.flip()
                             
-        for arrow in config.arrows:                                                     # relevant frames now ended, so stop drawing the flankers + target sequence 
-            arrow.setAutoDraw(False)
+        arrows.setAutoDraw(False)                                                       # relevant frames now ended, so stop drawing the flankers + target sequence
 
         try:
             last_fixation_time = config.MAX_TRIAL_DURATION - float(reaction_time) - config.display_times["initial_fixation"][trial_number]
@@ -211,21 +190,24 @@ def run_trials_save_data(trials, elapsed_trials, response_clock, beh_data_folder
             last_fixation_time = config.MAX_TRIAL_DURATION - config.display_times["initial_fixation"][trial_number]
             
         last_fixation_frames = int(last_fixation_time*config.monitor_info["refresh_rate_hz"])
-        for frame in range(last_fixation_frames):
-            config.window.flip()                                                        # relevant frames now ended, so stop drawing the fixation
+        flip_recorder.show_phase(phase="last_fixation",                                 # relevant frames now ended, so stop drawing the fixation
+                                 duration=last_fixation_time,
+                                 frames=last_fixation_frames)
         config.fixation.setAutoDraw(False)
+        flip_recorder.measure_trial(first_flip=first_flip,                              # measured onsets and durations, dropped frames
+                                    record=record)
         dependent_variables = dict(response=response,
                                    reaction_time=reaction_time)
-        try:
-            score_and_save_trial(trial_number=trial_number+elapsed_trials,
-                                 trial_components=trial_components,
-                                 dependent_variables=dependent_variables,
-                                 beh_data_folder=beh_data_folder,
-                                 experiment_info=experiment_info)
-        except AttributeError:
-            pass
+        score_and_save_trial(trial_number=trial_number+elapsed_trials,
+                             trial_components=trial_components,
+                             dependent_variables=dependent_variables,
+                             beh_data_folder=beh_data_folder,
+                             trial_writer=trial_writer,
+                             session_buffer=session_buffer,
+                             record=record,
+                             block=block)
 
-def score_and_save_trial(trial_number, trial_components, dependent_variables, beh_data_folder, experiment_info):
+def score_and_save_trial(trial_number, trial_components, dependent_variables, beh_data_folder, trial_writer, session_buffer, record, block):
     """Scores a subject's response (correct, incorrect, miss) and saves it. 
        Kept in a separate function because in the future, these operations
        might be useful outside the trials loop. 
@@ -235,7 +217,10 @@ def score_and_save_trial(trial_number, trial_components, dependent_variables, be
     trial_components -- the things that exist in the trial (i.e., stimuli) (type: OrderedDict)
     dependent_variables -- a container of the trial's dependent variable values (type: dict) 
     beh_data_folder -- the path to the destination folder for output data (type: str)
-    experiment_info -- experiment metadata (type: dict)                         
+    trial_writer -- saves trials in the background (type: TrialWriter)
+    session_buffer -- stores the trial's record (type: SessionBuffer)
+    record -- the trial's record, filled in place (type: TrialRecord)
+    block -- the block being run (e.g., 1, or "training") (type: int or str)
     """
 
     response = dependent_variables["response"]
@@ -248,22 +233,765 @@ def score_and_save_trial(trial_number, trial_components, dependent_variables, be
     elif response == None:
         response = "miss"
         correct = -1
-        reaction_time = "none"        
+        reaction_time = np.nan        
     else:
         correct = 0
 
-    outputs = [trial_components["cue_location"],
-               trial_components["sequence_location"],
-               trial_components["cue_type"],
-               trial_components["target_congruent"],
-               trial_components["target_direction"],
-               response,
-               correct,
-               reaction_time]
+    record.trial = trial_number
+    record.cue_location = record_code_lookup["cue_location"][trial_components["cue_location"]]
+    record.sequence_location = record_code_lookup["sequence_location"][trial_components["sequence_location"]]
+    record.cue_type = record_code_lookup["cue_type"][trial_components["cue_type"]]
+    record.target_congruent = record_code_lookup["target_congruent"][trial_components["target_congruent"]]
+    record.target_direction = record_code_lookup["target_direction"][trial_components["target_direction"]]
+    record.response = record_code_lookup["response"][response]
+    record.correct = correct
+    record.rt = reaction_time
+    session_buffer.store(record=record)
     
-    output_data = pd.DataFrame(data={key:value for key,value in zip(config.output_variables, outputs)},
-                               index=[0])
-    output_filename = f"sub-{experiment_info['subject']}_task-{experiment_info['name']}_beh_{trial_number}.tsv"
-    output_data.to_csv(path_or_buf=beh_data_folder / output_filename,
-                     sep="\t",
-                     index=False)    
\ No newline at end of file
+    trial_writer.save(session_buffer=session_buffer,
+                      row=trial_number,
+                      block=block,
+                      data_types=["beh","timing"],
+                      destination_folders=[beh_data_folder, beh_data_folder])
+
+def compile_conditions(conditions_file, cache_file):
+    """Parses a conditions file and saves it in binary form: the vertices of every stimulus as float32 arrays (trials x
+    vertices x 2, NaN where the file says None), every other column as int8 codes plus labels, and the file's SHA-256 hash.
+
+    Parameters:
+    conditions_file -- the conditions file (e.g., 'config.conditions_file') (type: str or Path)
+    cache_file -- where to save the compiled conditions (type: Path)
+
+    Returns:
+    arrays -- the arrays saved in 'cache_file', by name (type: dict)
+    """
+
+    conditions_text = Path(conditions_file).read_bytes()
+    rows = list(csv.DictReader(io.StringIO(conditions_text.decode("utf-8-sig"))))
+    arrays = {"sha256": np.array(hashlib.sha256(conditions_text).hexdigest()),
+              "columns": np.array(list(rows[0]))}
+    for column in rows[0]:
+        values = [row[column] for row in rows]
+        if values[0].lstrip().startswith("["):                                          # nested lists of coordinates
+            arrays[f"vertices_{column}"] = np.array([ast.literal_eval(value) for value in values], dtype=float).astype(np.float32)
+        else:
+            labels, codes = np.unique(values, return_inverse=True)
+            arrays[f"labels_{column}"] = labels
+            arrays[f"codes_{column}"] = codes.astype(np.int8)
+    temporary_file = cache_file.with_name(cache_file.name + ".tmp")
+    with open(temporary_file, "wb") as file:
+        np.savez(file, **arrays)
+    os.replace(temporary_file, cache_file)
+    return arrays
+
+def batch_vertices(arrays):
+    """Joins each trial's stimulus vertices into the shapes that are drawn: one open line per asterisk, which goes along
+    each of its strokes and back to its centre before the next one, and one shape for the whole sequence of arrows, with
+    one contour per arrow.
+
+    Parameters:
+    arrays -- the compiled conditions (output of 'compile_conditions()') (type: dict)
+
+    Returns:
+    cue_vertices -- for each trial, the vertices of every asterisk shown on that trial (type: list[list[np.ndarray]])
+    arrow_vertices -- the vertices of every arrow, trials x arrows x vertices x 2 (type: np.ndarray)
+    """
+
+    cues = [f"cue{number}" for number in range(1, len(config.double_cue_locations) + 1)]
+    strokes = np.stack([np.stack([arrays[f"vertices_{cue}_{line}"] for line in config.asterisk_lines], axis=1)
+                        for cue in cues], axis=1)                                                       # trials x cues x strokes x ends x 2
+    centres = np.broadcast_to(strokes.mean(axis=(2,3))[:, :, None, None], strokes.shape[:3] + (1, 2))
+    paths = np.concatenate([strokes, centres], axis=3).reshape(*strokes.shape[:2], -1, 2)[:, :, :-1]   # start, end, centre, start, ...
+    shown = ~np.isnan(paths).any(axis=(2,3))
+    cue_vertices = [[paths[trial, cue] for cue in np.flatnonzero(shown[trial])] for trial in range(len(paths))]
+
+    arrows = [column for column in arrays["columns"].tolist() if column.startswith("flanker") or column == "target"]
+    arrow_vertices = np.stack([arrays[f"vertices_{arrow}"] for arrow in arrows], axis=1)
+    return cue_vertices, arrow_vertices
+
+def load_conditions(conditions_file):
+    """Loads a conditions file from its compiled cache ('mant-conditions.cache.npz' for 'mant-conditions.csv'), which is
+    (re)made by 'compile_conditions()' whenever it is missing or the file's hash has changed. Replaces PsychoPy's
+    'data.importConditions()': stimulus vertices are float32 arrays (views into the cached arrays) rather than strings to
+    evaluate. Each condition also holds the vertices of the shapes that are drawn ('cue_vertices', 'arrow_vertices'; see
+    'batch_vertices()'), from which 'build_stimulus_sets()' builds its stimuli.
+
+    Parameters:
+    conditions_file -- the conditions file (e.g., 'config.conditions_file') (type: str or Path)
+
+    Returns:
+    conditions -- one dictionary per row of the file, by column (type: list[dict])
+    """
+
+    conditions_file = Path(conditions_file)
+    cache_file = conditions_file.with_suffix(".cache.npz")
+    try:
+        with np.load(cache_file) as cache:
+            arrays = {name: cache[name] for name in cache.files}
+    except (OSError, ValueError, zipfile.BadZipFile):
+        arrays = {}
+    if str(arrays.get("sha256")) != hashlib.sha256(conditions_file.read_bytes()).hexdigest():
+        arrays = compile_conditions(conditions_file=conditions_file,
+                                    cache_file=cache_file)
+
+    columns = arrays["columns"].tolist()
+    values = [list(arrays[f"vertices_{column}"]) if f"vertices_{column}" in arrays                 # one (vertices x 2) view per row
+              else arrays[f"labels_{column}"][arrays[f"codes_{column}"]].tolist()
+              for column in columns]
+    conditions = [dict(zip(columns, row)) for row in zip(*values)]
+    cue_vertices, arrow_vertices = batch_vertices(arrays=arrays)
+    for condition, cues, arrows in zip(conditions, cue_vertices, arrow_vertices):
+        condition["cue_vertices"] = cues
+        condition["arrow_vertices"] = arrows
+    return conditions
+
+def build_stimulus_sets(conditions):
+    """Builds the cue and arrow stimuli of every condition before the task starts, with vertices converted from degrees
+    to pixels for the current monitor, so that a trial only has to switch its own stimuli on and off. Conditions with the
+    same shapes (e.g., repeated rows) share the same stimuli.
+
+    Parameters:
+    conditions -- the output of 'load_conditions()' (type: list[dict])
+
+    Returns:
+    conditions -- the same conditions, each with its 'cue_stimuli' (one per asterisk) and its 'arrow_stimulus' (PsychoPy
+                  ShapeStim objects) (type: list[dict])
+    """
+
+    from psychopy.tools.monitorunittools import deg2pix
+
+    stimuli = {}
+    for condition in conditions:
+        shapes = [("cue", vertices) for vertices in condition["cue_vertices"]] + [("arrows", condition["arrow_vertices"])]
+        keys = [(kind, vertices.shape, vertices.tobytes()) for kind, vertices in shapes]
+        for key, (kind, vertices) in zip(keys, shapes):
+            if key not in stimuli:
+                stimuli[key] = visual.ShapeStim(win=config.window,
+                                                name=f"{kind}_{len(stimuli)}",
+                                                vertices=deg2pix(degrees=vertices, monitor=config.monitor),
+                                                units="pix",
+                                                size=(1,1),
+                                                ori=0.0,
+                                                pos=(0,0),
+                                                anchor="center",
+                                                **config.stimulus_styles[kind])
+        condition["cue_stimuli"] = [stimuli[key] for key in keys[:-1]]
+        condition["arrow_stimulus"] = stimuli[keys[-1]]
+    return conditions
+
+def draw_trial_order(conditions, number_of_trials):
+    """Draws a block's trial order as PsychoPy's TrialHandler does (each condition once per repetition, shuffled).
+
+    Parameters:
+    conditions -- the conditions to draw from (output of 'load_conditions()') (type: list[dict])
+    number_of_trials -- the number of trials in the block (type: int)
+
+    Returns:
+    trial_order -- indices into 'conditions', in the order in which trials will be run (type: list[int])
+    """
+
+    trials = data.TrialHandler(trialList=conditions,
+                               nReps=int(number_of_trials / len(conditions)))
+    return trials.sequenceIndices.transpose().flatten().tolist()                        # TrialHandler goes through one repetition (column) at a time
+
+def make_trial_handler(conditions, trial_order):
+    """Makes a TrialHandler that runs conditions in a fixed order (e.g., the trials of a block that are still to be run).
+
+    Parameters:
+    conditions -- the conditions to run (output of 'load_conditions()') (type: list[dict])
+    trial_order -- indices into 'conditions' (output of 'draw_trial_order()', or part of it) (type: list[int])
+
+    Returns:
+    trials -- an object that represents the trials and the iteration over them (PsychoPy TrialHandler object)
+    """
+
+    return data.TrialHandler(trialList=[conditions[index] for index in trial_order],
+                             nReps=1,
+                             method="sequential")
+
+def get_rng_state():
+    """Returns the state of Python's and NumPy's random number generators, in a form that can be saved as JSON."""
+
+    version, internal_state, gauss_next = random.getstate()
+    generator, keys, position, has_gauss, cached_gaussian = np.random.get_state()
+    return {"python": [version, list(internal_state), gauss_next],
+            "numpy": [generator, keys.tolist(), position, has_gauss, cached_gaussian]}
+
+def set_rng_state(rng_state):
+    """Restores the state of Python's and NumPy's random number generators (output of 'get_rng_state()')."""
+
+    version, internal_state, gauss_next = rng_state["python"]
+    random.setstate((version, tuple(internal_state), gauss_next))
+    generator, keys, position, has_gauss, cached_gaussian = rng_state["numpy"]
+    np.random.set_state((generator, np.array(keys, dtype=np.uint32), position, has_gauss, cached_gaussian))
+
+def get_jitters():
+    """Returns the fixation durations drawn when 'config' was imported (in seconds, one per trial), by fixation name."""
+
+    return {name: config.display_times[name] for name in ["initial_fixation","later_fixation"] if isinstance(config.display_times[name], list)}
+
+def restore_jitters(jitters):
+    """Replaces the fixation durations drawn when 'config' was imported with those of an earlier session (output of 'get_jitters()')."""
+
+    for name, durations in jitters.items():
+        config.display_times[name] = durations
+        config.frames_per_item[name] = [int(round(time*config.monitor_info["refresh_rate_hz"])) for time in durations]
+
+def read_session_journal(journal_file):
+    """Reads a session journal (see 'SessionJournal') to find where the session stopped. Only the latest session
+    in the journal is considered; a last line cut short by a crash is ignored.
+
+    Parameters:
+    journal_file -- the path to the journal (type: Path)
+
+    Returns:
+    session -- None if the journal holds no session, else a dictionary with keys 'experiment_info', 'jitters',
+               'training_done', 'blocks', which maps every block that was started to its 'trial_order', 'rng_state' (at
+               the start of the block), number of 'completed_trials' and their 'records' (for 'SessionBuffer.restore()'),
+               and 'rng_state', the latest state saved at the start of a block or after one of its trials (None if no
+               block was started) (type: dict or None)
+    """
+
+    if not journal_file.is_file():
+        return None
+    records = []
+    with open(journal_file) as journal:
+        for line in journal:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                pass
+    session_starts = [index for index, record in enumerate(records) if record["event"] == "session_start"]
+    if len(session_starts) == 0:
+        return None
+    session = None
+    for record in records[session_starts[-1]:]:
+        if record["event"] == "session_start":
+            session = dict(experiment_info=record["experiment_info"],
+                           jitters=record["jitters"],
+                           training_done=False,
+                           blocks={},
+                           rng_state=None)
+        elif record["event"] == "training_end":
+            session["training_done"] = True
+        elif record["event"] == "block_start":                                          # a block started again from its first trial starts a new count
+            session["blocks"][record["block"]] = dict(trial_order=record["trial_order"],
+                                                      rng_state=record["rng_state"],
+                                                      completed_trials=0,
+                                                      records=[])
+            session["rng_state"] = record["rng_state"]
+        elif record["event"] == "trial" and record["block"] in session["blocks"]:
+            session["blocks"][record["block"]]["completed_trials"] += 1
+            session["blocks"][record["block"]]["records"].append(record["record"])
+            session["rng_state"] = record["rng_state"]
+    return session
+
+record_dtype = np.dtype([(field, dtype) for field, dtype in config.record_schema.items()])
+record_code_lookup = {field: {label: code for code, label in enumerate(labels)} for field, labels in config.record_codes.items()}
+phase_codes = {phase: code for code, phase in enumerate(config.trial_phases)}
+
+class TrialRecord:
+    """One trial's outcome, with the fields of 'config.record_schema' (categories as codes, see 'record_code_lookup').
+    A single record is filled in place on every trial and copied into a SessionBuffer, so that no new lists, dictionaries
+    or dataframes are made between trials."""
+
+    __slots__ = tuple(config.record_schema)
+
+class SessionBuffer:
+    """The records of a session's trials, allocated once as a NumPy structured array with one row per trial
+    (e.g., NUMBER_OF_BLOCKS*TRIALS_PER_BLOCK rows) and the fields of 'config.record_schema'.
+    Rows are indexed by trial number; rows that were never filled have block -1.
+
+    Parameters:
+    number_of_trials -- the number of rows (type: int)
+    """
+
+    def __init__(self, number_of_trials):
+        self.records = np.zeros(shape=number_of_trials,
+                                dtype=record_dtype)
+        self.records["block"] = -1
+        for field, dtype in config.record_schema.items():
+            if dtype.startswith("float"):
+                self.records[field] = np.nan
+
+    def store(self, record):
+        """Copies a trial's record into its row (i.e., row 'record.trial')."""
+
+        self.records[record.trial] = tuple(getattr(record, field) for field in record_dtype.names)
+
+    def restore(self, records):
+        """Refills rows from records saved as lists of field values (e.g., by 'SessionJournal', when a session is resumed)."""
+
+        for values in records:
+            self.records[values[record_dtype.names.index("trial")]] = tuple(values)
+
+    def to_text(self, row, data_type):
+        """Returns one trial's values as .tsv text, for the columns of 'config.output_columns[data_type]'
+        (categories as labels, NaN as "none")."""
+
+        values = self.records[row]
+        text = {}
+        for column in config.output_columns[data_type]:
+            value = values[column].item()
+            if column in config.record_codes:
+                text[column] = config.record_codes[column][value]
+            elif value != value:                                                        # NaN
+                text[column] = "none"
+            else:
+                text[column] = str(value)
+        return text
+
+    def save_block(self, block, records_file):
+        """Saves a block's rows to a '.npy' file (readable with 'np.load(records_file, mmap_mode="r")'), through a temporary
+        file, so that a crash never leaves half a file behind.
+
+        Parameters:
+        block -- the block to save (e.g., 1, or "training") (type: int or str)
+        records_file -- the path to the '.npy' file (type: Path)
+        """
+
+        block_records = self.records[self.records["block"] == (0 if block == "training" else block)]
+        temporary_file = records_file.with_name(records_file.name + ".tmp")
+        with open(temporary_file, "wb") as binary_file:
+            np.save(binary_file, block_records)
+            binary_file.flush()
+            os.fsync(binary_file.fileno())
+        os.replace(temporary_file, records_file)
+
+    def save_schema(self, schema_file):
+        """Saves what is needed to decode '.npy' records without this code: field types and category labels (a code is
+        the position of its label)."""
+
+        with open(schema_file, "w") as json_file:
+            json.dump({"fields": config.record_schema,
+                       "codes": config.record_codes,
+                       "missing_values": "NaN in float fields (e.g., 'rt' of a miss); -1 in 'block' for rows that were never filled"},
+                      json_file,
+                      indent=4)
+
+class FlipRecorder:
+    """Flips the window during trials, on a schedule, and keeps the time of every flip (i.e., when the new frame was shown,
+    as returned by 'window.flip()'), with the trial phase that the frame belongs to (a position in 'config.trial_phases'),
+    in a ring buffer allocated once: recording a flip only writes into existing arrays, so nothing is allocated in the
+    frame loops. Phases are run with 'phase_frames()' or 'show_phase()', which decide how many frames each phase lasts
+    according to a timing policy:
+    "frames" -- a phase lasts a number of flips ('config.frames_per_item'), so a dropped frame lengthens it and delays
+                everything that follows;
+    "deadline" -- a phase lasts until its deadline on the flip clock, i.e., its scheduled onset plus its duration
+                  ('config.display_times'), and the next phase is scheduled from that deadline rather than from the last
+                  flip, so that a late frame shortens the phase it falls in instead of delaying the rest of the block.
+    After each trial, 'measure_trial()' turns the trial's flips into the measured onset and duration of every phase and the
+    number of dropped frames; how far these were from the schedule is summed up over the session by 'drift_report()'.
+
+    Parameters:
+    window -- the window to flip (PsychoPy Window object)
+    size -- how many flips are kept; older flips are overwritten (e.g., 'config.flip_buffer_size') (type: int)
+    timing_policy -- "frames" or "deadline" (e.g., 'config.timing_policy') (type: str)
+    """
+
+    def __init__(self, window, size, timing_policy="frames"):
+        if timing_policy not in ["frames","deadline"]:
+            raise ValueError("'timing_policy' can only be 'frames' or 'deadline'")
+        self.window = window
+        self.size = size
+        self.timing_policy = timing_policy
+        self.timestamps = np.full(shape=size, fill_value=np.nan)
+        self.phases = np.full(shape=size, fill_value=-1, dtype=np.int8)
+        self.count = 0                                                                  # flips recorded so far (the next one goes to 'count % size')
+        self.frame_period = 1/config.monitor_info["refresh_rate_hz"]
+        self.last_flip = np.nan
+        self.phase_onset = np.nan                                                       # first flip of the current phase
+        self.deadline = np.nan                                                          # when the last phase was scheduled to end
+        self.scheduled_onsets = np.full(shape=len(config.trial_phases), fill_value=np.nan)  # of the current trial's phases
+        self.scheduled_durations = np.full(shape=len(config.trial_phases), fill_value=np.nan)
+        self.completed = np.zeros(shape=len(config.trial_phases), dtype=bool)          # False: not shown, or ended early (e.g., by a response)
+        self.drift_totals = {measure: np.zeros(shape=len(config.trial_phases)) for measure in ["onset_lag","duration_error"]}
+        self.drift_maxima = {measure: np.zeros(shape=len(config.trial_phases)) for measure in ["onset_lag","duration_error"]}
+        self.drift_counts = {measure: np.zeros(shape=len(config.trial_phases), dtype=int) for measure in ["onset_lag","duration_error"]}
+        self.measured_trials = 0
+        self.dropped_frames = 0
+
+    def flip(self, phase):
+        """Flips the window and records the flip's time, for a phase (a code in 'phase_codes')."""
+
+        position = self.count % self.size
+        self.last_flip = self.window.flip()
+        self.timestamps[position] = self.last_flip
+        self.phases[position] = phase
+        self.count += 1
+
+    def restart_schedule(self):
+        """Starts a new schedule, whose first phase starts at its first flip: call it before the first trial of every
+        block, since the time spent on instructions or breaks is not part of any schedule."""
+
+        self.deadline = np.nan
+
+    def phase_frames(self, phase, duration, frames, min_duration=0):
+        """Yields a phase's frame numbers (0, 1, ...) and flips the window after each, i.e., replaces
+        'for frame in range(frames): ... window.flip()'. Leaving the loop early (e.g., with 'break' on a response) ends the
+        phase without flipping. A phase is scheduled to start when the previous one was scheduled to end, unless the
+        previous phase ended early or the schedule has just been restarted, in which case it starts at its first flip.
+        With the "deadline" policy, a phase always lasts at least one frame, and at least 'min_duration' from its first flip
+        (e.g., so that a trigger timed from the phase's onset is always sent, even when a late onset shortens the phase).
+
+        Parameters:
+        phase -- the phase's name (one of 'config.trial_phases') (type: str)
+        duration -- the phase's scheduled duration, in seconds (e.g., from 'config.display_times') (type: float)
+        frames -- the phase's duration in frames (e.g., from 'config.frames_per_item') (type: int)
+        min_duration -- the shortest the phase can be with the "deadline" policy, in seconds (type: float)
+        """
+
+        code = phase_codes[phase]
+        on_schedule = self.last_flip + self.frame_period > self.deadline - self.frame_period/2    # False after an early end, or for NaN
+        onset = self.deadline if on_schedule else np.nan
+        self.scheduled_onsets[code] = onset
+        self.scheduled_durations[code] = duration
+        self.completed[code] = False
+        self.phase_onset = np.nan
+        frame = 0
+        try:
+            while self.phase_continues(frame=frame, frames=frames, deadline=max(onset + duration, self.phase_onset + min_duration)):
+                yield frame
+                self.flip(phase=code)
+                if frame == 0:
+                    self.phase_onset = self.last_flip
+                    onset = onset if on_schedule else self.last_flip
+                frame += 1
+            self.completed[code] = True
+        finally:                                                                        # also when the loop is left early
+            self.deadline = onset + duration
+
+    def phase_continues(self, frame, frames, deadline):
+        """Tells whether a phase needs another frame: if fewer than 'frames' were shown ("frames" policy), or if the next
+        frame would be shown before the phase's deadline ("deadline" policy, NaN before the phase's first flip)."""
+
+        if self.timing_policy == "frames":
+            return frame < frames
+        return frame == 0 or self.last_flip + self.frame_period < deadline - self.frame_period/2
+
+    def time_in_phase(self):
+        """Returns when the next frame will be shown, in seconds from the current phase's first flip (NaN before it), so
+        that events can be timed from the phase's actual onset rather than by counting frames."""
+
+        return self.last_flip + self.frame_period - self.phase_onset
+
+    def show_phase(self, phase, duration, frames):
+        """Shows a phase for its whole duration, with nothing to do between flips (see 'phase_frames()')."""
+
+        for frame in self.phase_frames(phase=phase, duration=duration, frames=frames):
+            pass
+
+    def measure_trial(self, first_flip, record):
+        """Fills a trial's record with the onset (time of its first flip) and duration (until the next phase's first flip,
+        or one frame after the trial's last flip) of every phase, in seconds on the clock of 'window.flip()', NaN for phases
+        that were not shown (e.g., the target of a trial ended with escape), and with the number of frames dropped between
+        the trial's flips (i.e., missed refreshes: an interval of two frame periods is one dropped frame). Also adds the
+        trial to the drift report: how late each phase started w.r.t. its schedule, and how far the duration of each phase
+        that was not ended early was from its scheduled duration.
+
+        Parameters:
+        first_flip -- the value of 'count' when the trial started (type: int)
+        record -- the trial's record, filled in place (type: TrialRecord)
+        """
+
+        positions = np.arange(first_flip, self.count) % self.size
+        timestamps = self.timestamps[positions]
+        phases = self.phases[positions]
+        offsets = np.append(timestamps[1:], timestamps[-1] + self.frame_period)        # a frame stays on screen until the next flip
+        onsets = np.full(shape=len(config.trial_phases), fill_value=np.nan)
+        durations = np.full(shape=len(config.trial_phases), fill_value=np.nan)
+        for code, phase in enumerate(config.trial_phases):
+            shown = np.flatnonzero(phases == code)
+            if len(shown) > 0:
+                onsets[code] = timestamps[shown[0]]
+                durations[code] = offsets[shown[-1]] - onsets[code]
+            setattr(record, f"measured_{phase}_onset", onsets[code])
+            setattr(record, f"measured_{phase}_duration", durations[code])
+        missed_refreshes = np.round(np.diff(timestamps)/self.frame_period) - 1
+        record.dropped_frames = int(missed_refreshes[missed_refreshes > 0].sum())
+
+        drift = {"onset_lag": onsets - self.scheduled_onsets,
+                 "duration_error": np.where(self.completed, durations - self.scheduled_durations, np.nan)}
+        for measure, values in drift.items():
+            measured = ~np.isnan(values)
+            self.drift_totals[measure][measured] += values[measured]
+            self.drift_maxima[measure][measured] = np.maximum(self.drift_maxima[measure][measured], np.abs(values[measured]))
+            self.drift_counts[measure][measured] += 1
+        self.measured_trials += 1
+        self.dropped_frames += record.dropped_frames
+        self.scheduled_onsets[:] = np.nan
+        self.scheduled_durations[:] = np.nan
+        self.completed[:] = False
+
+    def drift_report(self):
+        """Sums up the timing of the trials measured so far, per phase: the mean and the largest (absolute) lag of phase
+        onsets w.r.t. their schedule, and the mean and the largest (absolute) difference between measured and scheduled
+        durations, in milliseconds (None if never measured), along with the number of dropped frames.
+
+        Returns:
+        report -- the timing policy, the number of trials and dropped frames, and the drift of every phase (type: dict)
+        """
+
+        report = {"timing_policy": self.timing_policy,
+                  "refresh_rate_hz": config.monitor_info["refresh_rate_hz"],
+                  "trials": self.measured_trials,
+                  "dropped_frames": self.dropped_frames,
+                  "phases": {}}
+        for code, phase in enumerate(config.trial_phases):
+            report["phases"][phase] = {}
+            for measure in self.drift_totals:
+                count = self.drift_counts[measure][code]
+                report["phases"][phase][f"{measure}_mean_ms"] = round(1000*self.drift_totals[measure][code]/count, 3) if count > 0 else None
+                report["phases"][phase][f"{measure}_max_ms"] = round(1000*self.drift_maxima[measure][code], 3) if count > 0 else None
+        return report
+
+    def save_drift_report(self, report_file):
+        """Saves the output of 'drift_report()' to a '.json' file (e.g., at the end of a session)."""
+
+        with open(report_file, "w") as json_file:
+            json.dump(self.drift_report(),
+                      json_file,
+                      indent=4)
+
+class TrialWriter:
+    """Saves trial data from a background thread, so that writing to disk (which can stall for tens of milliseconds
+    on network folders or while antivirus software scans new files) never delays the next trial.
+
+    Trials queued with 'save()' (rows of a SessionBuffer) are turned into text by the writer thread and appended,
+    one row each, to a single file per block and data type (e.g., 'sub-01_task-mANT_beh_block-01.tsv'), whose first
+    column is the trial number. Training trials go to '..._block-training.tsv'. At the end of every block, the block's
+    records are also saved in binary form to 'sub-01_task-mANT_records_block-01.npy' (see 'SessionBuffer.save_block()'),
+    next to the first data type's files, along with the record schema ('sub-01_task-mANT_records.json').
+    'end_block()' waits until every queued trial is on disk: call it at the end of every block, including blocks
+    ended with escape.
+
+    Parameters:
+    experiment_info -- experiment metadata (type: dict)
+    flush_policy -- when rows are pushed to disk: "trial" (flush and fsync after every trial), "flush" (flush after every
+                    trial, fsync at the end of the block) or "block" (flush and fsync at the end of the block). "block"
+                    cannot be used with a journal, since a trial is only journaled once its rows are flushed (type: str)
+    per_trial_files -- compatibility mode: write one file per trial (e.g., 'sub-01_task-mANT_beh_12.tsv') instead of one per block (type: bool)
+    journal -- if given, every trial is recorded in it once its rows are written (and at least flushed), along with the
+               state of the random number generators when the trial was queued (type: SessionJournal)
+    """
+
+    def __init__(self, experiment_info, flush_policy="trial", per_trial_files=False, journal=None):
+        if flush_policy not in ["trial","flush","block"]:
+            raise ValueError("'flush_policy' can only be 'trial', 'flush' or 'block'")
+        if flush_policy == "block" and journal is not None:
+            raise ValueError("'flush_policy' cannot be 'block' with a journal: journaled trials are flushed after every trial")
+        self.filename_prefix = f"sub-{experiment_info['subject']}_task-{experiment_info['name']}"
+        self.flush_policy = flush_policy
+        self.per_trial_files = per_trial_files
+        self.journal = journal
+        self.trial_queue = queue.Queue()
+        self.open_files = {}
+        self.blocks_to_save = {}
+        self.error = None
+        self.thread = threading.Thread(target=self.write_queued_trials,
+                                       name="trial-writer",
+                                       daemon=True)
+        self.thread.start()
+        atexit.register(self.close)                                                     # drain the queue even if the script ends early
+
+    def save(self, session_buffer, row, block, data_types, destination_folders):
+        """Queues one trial (already stored in a SessionBuffer) and returns immediately.
+
+        Parameters:
+        session_buffer -- where the trial is stored (type: SessionBuffer)
+        row -- the trial's row in 'session_buffer', which is also its trial number (type: int)
+        block -- the block that the trial belongs to (e.g., 1, or "training") (type: int or str)
+        data_types -- a list of strings that identify the data to save (keys of 'config.output_columns') (type: list[str])
+        destination_folders -- a list of destination folders for the data (type: list[Path])
+        """
+
+        rng_state = get_rng_state() if self.journal is not None else None               # taken now: the next trial's draws come before the write
+        self.trial_queue.put((session_buffer, row, block, data_types, destination_folders, rng_state))
+
+    def end_block(self):
+        """Waits until all queued trials are written, then syncs and closes the block's files.
+        Raises any error met by the writer thread since the last call."""
+
+        self.trial_queue.put("end_block")
+        self.trial_queue.join()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def close(self):
+        """Writes everything still queued and stops the writer thread."""
+
+        if self.thread.is_alive():
+            self.end_block()
+            self.trial_queue.put(None)
+            self.thread.join()
+
+    def write_queued_trials(self):
+        """The writer thread's loop: handles queued trials (and block ends) in order, until it receives None."""
+
+        while True:
+            item = self.trial_queue.get()
+            try:
+                if item is None:
+                    return
+                elif item == "end_block":
+                    self.close_files()
+                else:
+                    self.write_trial(*item)
+            except Exception as error:                                                  # kept for 'end_block()', so that trials keep running
+                self.error = error
+            finally:
+                self.trial_queue.task_done()
+
+    def write_trial(self, session_buffer, row, block, data_types, destination_folders, rng_state):
+        """Writes one trial's rows (to the block's files, or to new per-trial files in compatibility mode)."""
+
+        trial_number = row
+        self.blocks_to_save[block] = (session_buffer, destination_folders[0])
+        for data_type, destination in zip(data_types, destination_folders):
+            data = session_buffer.to_text(row=row,
+                                          data_type=data_type)
+            values = data.values()
+            if self.per_trial_files:
+                with open(destination / f"{self.filename_prefix}_{data_type}_{trial_number}.tsv", "w") as trial_file:
+                    trial_file.write("\t".join(data) + "\n" + "\t".join(values) + "\n")
+                    self.push_to_disk(file=trial_file, at_block_end=False)
+                continue
+            output_file = self.block_file(block=block, data_type=data_type, destination=destination)
+            if output_file not in self.open_files:
+                is_new_file = not output_file.is_file() or output_file.stat().st_size == 0
+                self.open_files[output_file] = open(output_file, "a")
+                if is_new_file:
+                    self.open_files[output_file].write("\t".join(["trial", *data]) + "\n")
+            self.open_files[output_file].write("\t".join([str(trial_number), *values]) + "\n")
+            self.push_to_disk(file=self.open_files[output_file], at_block_end=False)
+        if self.journal is not None:
+            self.journal.record(event="trial",
+                                sync=self.flush_policy == "trial",
+                                block=block,
+                                trial=trial_number,
+                                record=session_buffer.records[row].tolist(),
+                                rng_state=rng_state)
+
+    def block_file(self, block, data_type, destination):
+        """Returns the path of a block's file (e.g., 'destination/sub-01_task-mANT_beh_block-01.tsv')."""
+
+        block_label = f"{block:02d}" if isinstance(block, int) else block
+        return destination / f"{self.filename_prefix}_{data_type}_block-{block_label}.tsv"
+
+    def rewrite_block(self, session_buffer, block, data_types, destination_folders):
+        """Rewrites the files of a resumed block from the rows restored into a SessionBuffer (i.e., from the journal), so
+        that they hold exactly the trials that the journal knows about: a crash can leave a trial on disk before its
+        journal line was written (it would be run and written again), or half a row (the next row would be glued to it).
+        Nothing is rewritten in compatibility mode, where files are overwritten trial by trial.
+
+        Parameters:
+        session_buffer -- where the block's completed trials were restored (type: SessionBuffer)
+        block -- the block about to be resumed (type: int)
+        data_types -- a list of strings that identify the block's data (type: list[str])
+        destination_folders -- a list of destination folders for the data (type: list[Path])
+        """
+
+        if self.per_trial_files:
+            return
+        rows = np.flatnonzero(session_buffer.records["block"] == block)
+        for data_type, destination in zip(data_types, destination_folders):
+            output_file = self.block_file(block=block, data_type=data_type, destination=destination)
+            temporary_file = output_file.with_name(output_file.name + ".tmp")
+            with open(temporary_file, "w") as block_file:
+                for row in rows:
+                    data = session_buffer.to_text(row=row,
+                                                  data_type=data_type)
+                    if row == rows[0]:
+                        block_file.write("\t".join(["trial", *data]) + "\n")
+                    block_file.write("\t".join([str(row), *data.values()]) + "\n")
+                block_file.flush()
+                os.fsync(block_file.fileno())
+            os.replace(temporary_file, output_file)
+
+    def set_aside_block(self, block, data_types, destination_folders):
+        """Renames the files of a block that is about to be run again from its first trial (e.g., those of an interrupted
+        training block) to '<file name>.interrupted-<date and time>', so that the new attempt starts from empty files.
+        Nothing is renamed in compatibility mode, where files are overwritten trial by trial.
+
+        Parameters:
+        block -- the block about to be run (e.g., 1, or "training") (type: int or str)
+        data_types -- a list of strings that identify the block's data (type: list[str])
+        destination_folders -- a list of destination folders for the data (type: list[Path])
+        """
+
+        if self.per_trial_files:
+            return
+        for data_type, destination in zip(data_types, destination_folders):
+            output_file = self.block_file(block=block, data_type=data_type, destination=destination)
+            if output_file.is_file():
+                output_file.rename(output_file.with_name(f"{output_file.name}.interrupted-{time.strftime('%Y%m%d-%H%M%S')}"))
+
+    def push_to_disk(self, file, at_block_end):
+        """Flushes and/or fsyncs a file, as required by the flush policy."""
+
+        if at_block_end or self.flush_policy in ["trial","flush"]:
+            file.flush()
+        if at_block_end or self.flush_policy == "trial":
+            os.fsync(file.fileno())
+
+    def close_files(self):
+        for open_file in self.open_files.values():
+            self.push_to_disk(file=open_file, at_block_end=True)
+            open_file.close()
+        self.open_files = {}
+        for block, (session_buffer, destination) in self.blocks_to_save.items():
+            schema_file = destination / f"{self.filename_prefix}_records.json"
+            if not schema_file.is_file():
+                session_buffer.save_schema(schema_file=schema_file)
+            session_buffer.save_block(block=block,
+                                      records_file=self.block_file(block=block, data_type="records", destination=destination).with_suffix(".npy"))
+        self.blocks_to_save = {}
+
+class SessionJournal:
+    """An append-only record of a session's progress, from which an interrupted session can be resumed
+    (see 'read_session_journal()'). Each event is one line of JSON with its name and time, e.g.:
+    - "session_start": experiment metadata and the fixation durations drawn for the session
+    - "training_end": training is over (it is not run again when the session is resumed)
+    - "block_start": a block's trial order (from 'draw_trial_order()') and the random state after drawing it
+    - "trial": a trial whose data were written to disk, with its record (written by the TrialWriter's thread)
+    - "resume", "session_end"
+
+    Lines are flushed as soon as they are written, so that a crash of PsychoPy never loses a recorded event;
+    with 'sync', they are also synced to disk (i.e., they survive a power loss too).
+
+    Parameters:
+    journal_file -- the path to the journal (e.g., 'sub-01_task-mANT_journal.jsonl'); an existing journal is appended to (type: Path)
+    """
+
+    def __init__(self, journal_file):
+        self.journal_file = journal_file
+        self.lock = threading.Lock()                                                    # trials are recorded from the TrialWriter's thread
+        cut_short = False
+        if journal_file.is_file() and journal_file.stat().st_size > 0:
+            with open(journal_file, "rb") as existing_journal:
+                existing_journal.seek(-1, os.SEEK_END)
+                cut_short = existing_journal.read(1) != b"\n"
+        self.file = open(journal_file, "a")
+        if cut_short:                                                                   # a crash in the middle of a line: start on a new one
+            self.file.write("\n")
+
+    def record(self, event, sync=True, **details):
+        """Appends one event to the journal.
+
+        Parameters:
+        event -- the event's name (e.g., "trial") (type: str)
+        sync -- whether to sync the journal to disk after writing (type: bool)
+        details -- the event's details, which must be JSON-serialisable (e.g., block=1, trial=12)
+        """
+
+        line = json.dumps({"event": event, "time": time.time()} | details)
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+            if sync:
+                os.fsync(self.file.fileno())
+
+    def close(self):
+        with self.lock:
+            self.file.close()
@@ -7,7 +7,8 @@ experiment_info = {"name": "mANT",
                    "session": "mri",
                    "run": "",
                    "date": data.getDateStr(),
-                   "psychopy_version": "2024.2.2"}
+                   "psychopy_version": "2024.2.2",
+                   "resume": False}
 
 dialogue = gui.DlgFromDict(dictionary=experiment_info,
                            title="Enter subject ID & run number (e.g., 01 & 01)",
@@ -23,11 +24,31 @@ if experiment_info["subject"] != "" and experiment_info["run"] != "":
      
     text_folder, beh_data_folder, onset_data_folder = utils.make_directories(experiment_info=experiment_info)  
     
-    conditions = data.importConditions(config.conditions_file)
-    training_conditions = data.importConditions(config.training_conditions_file)
+    journal_file = beh_data_folder / f"sub-{experiment_info['subject']}_task-{experiment_info['name']}_run-{experiment_info['run']}_journal.jsonl"
+    session = utils.read_session_journal(journal_file=journal_file) if experiment_info["resume"] else None
+    journal = utils.SessionJournal(journal_file=journal_file)
+    trial_writer = utils.TrialWriter(experiment_info=experiment_info,
+                                     flush_policy=config.trial_writer_settings["flush_policy"],
+                                     per_trial_files=config.trial_writer_settings["per_trial_files"],
+                                     journal=journal)
+    session_buffer = utils.SessionBuffer(number_of_trials=config.TRIALS_PER_RUN)
+    flip_recorder = utils.FlipRecorder(window=config.window,
+                                       size=config.flip_buffer_size,
+                                       timing_policy=config.timing_policy)
+    conditions = utils.build_stimulus_sets(conditions=utils.load_conditions(conditions_file=config.conditions_file))
+    training_conditions = utils.build_stimulus_sets(conditions=utils.load_conditions(conditions_file=config.training_conditions_file))
 
-    if experiment_info["run"] == "01":           
-        """ Instruction messages and training trials are only for the first run """  
+    if session is None:
+        journal.record(event="session_start",
+                       experiment_info=experiment_info,
+                       jitters=utils.get_jitters())
+    else:                                                                                           # resume: same jitters, same trial order
+        utils.restore_jitters(jitters=session["jitters"])
+        journal.record(event="resume",
+                       experiment_info=experiment_info)
+
+    if experiment_info["run"] == "01" and (session is None or not session["training_done"]):           
+        """ Instruction messages and training trials are only for the first run (and are not repeated when it is resumed) """  
 
         mri_clock = core.Clock()
         subject_clock = core.Clock()
@@ -37,32 +58,38 @@ if experiment_info["subject"] != "" and experiment_info["run"] != "":
                            display_duration=config.frames_per_item["instructions"],
                            keylist=config.keylists["welcome_message"])
 
-        demos_to_display = [config.fixation,
-                            config.asterisk_components,
-                            config.arrows] 
         demos_frames = [config.frames_per_item["fixation_demo"], 
                         config.frames_per_item["cue_demo"], 
                         config.frames_per_item["arrows_demo"]]
         utils.display_demos(trials_pool=conditions,
                             window=config.window,
-                            demos=demos_to_display,
+                            fixation=config.fixation,
                             demos_frames=demos_frames,
                             keylist=config.keylists["demos"])
-        del demos_to_display, demos_frames
+        del demos_frames
 
         _ = utils.display_text(file_to_read=text_folder / "post-demo-message.txt", 
                                window=config.window,
                                display_duration=config.frames_per_item["instructions"], 
                                keylist=config.keylists["post_demos"])
         
+        trial_writer.set_aside_block(block="training",                                         # left by a run interrupted during training
+                                     data_types=["beh","onsets","timing"],
+                                     destination_folders=[beh_data_folder, onset_data_folder, beh_data_folder])
+        training_buffer = utils.SessionBuffer(number_of_trials=len(training_conditions))
         training_trials = data.TrialHandler(trialList=training_conditions, 
                                             nReps=1)
                                             
         utils.run_trials_save_data(trials=training_trials,
                                    mri_clock=mri_clock,
                                    subject_clock=subject_clock,
-                                   destination_folders=[beh_data_folder, onset_data_folder],
-                                   experiment_info=experiment_info)
+                                   destination_folders=[beh_data_folder, onset_data_folder, beh_data_folder],
+                                   trial_writer=trial_writer,
+                                   session_buffer=training_buffer,
+                                   flip_recorder=flip_recorder,
+                                   block="training")
+        trial_writer.end_block()
+        journal.record(event="training_end")
         
         _ = utils.display_text(file_to_read=text_folder / "post-training-message.txt", 
                                window=config.window,
@@ -71,8 +98,23 @@ if experiment_info["subject"] != "" and experiment_info["run"] != "":
     
     """ Now we run the actual experiment (no more instructions, no more training) """
 
-    experimental_trials = data.TrialHandler(trialList=conditions, 
-                                            nReps=int(config.TRIALS_PER_RUN / len(conditions))) 
+    run = int(experiment_info["run"])                                                              # one block per run
+    if session is not None and run in session["blocks"]:
+        """ The scanner sequence cannot be resumed halfway: an interrupted run starts again from its first trial, with the same trial order """
+        trial_order = session["blocks"][run]["trial_order"]
+        utils.set_rng_state(rng_state=session["blocks"][run]["rng_state"])
+    else:
+        trial_order = utils.draw_trial_order(conditions=conditions,
+                                             number_of_trials=config.TRIALS_PER_RUN)
+    trial_writer.set_aside_block(block=run,
+                                 data_types=["beh","onsets","timing"],
+                                 destination_folders=[beh_data_folder, onset_data_folder, beh_data_folder])
+    journal.record(event="block_start",
+                   block=run,
+                   trial_order=trial_order,
+                   rng_state=utils.get_rng_state())
+    experimental_trials = utils.make_trial_handler(conditions=conditions,
+                                                   trial_order=trial_order)
     
     _ = utils.display_text(file_to_read=text_folder / "waiting-for-scanner.txt", 
                            window=config.window,
@@ -85,8 +127,12 @@ if experiment_info["subject"] != "" and experiment_info["run"] != "":
     utils.run_trials_save_data(trials=experimental_trials,
                                mri_clock=mri_clock,
                                subject_clock=subject_clock,
-                               destination_folders=[beh_data_folder, onset_data_folder],
-                               experiment_info=experiment_info)
+                               destination_folders=[beh_data_folder, onset_data_folder, beh_data_folder],
+                               trial_writer=trial_writer,
+                               session_buffer=session_buffer,
+                               flip_recorder=flip_recorder,
+                               block=run)
+    trial_writer.end_block()
     
     if experiment_info["run"] != f"0{config.NUMBER_OF_RUNS}":
         decision_after_block = utils.display_text(file_to_read=text_folder / "end-of-block-message.txt",
@@ -97,4 +143,8 @@ if experiment_info["subject"] != "" and experiment_info["run"] != "":
         _ = utils.display_text(file_to_read=text_folder / "farewell-message.txt", 
                                 window=config.window,
                                 display_duration=config.frames_per_item["instructions"],
-                                keylist=config.keylists["farewell_message"])
\ No newline at end of file
+                                keylist=config.keylists["farewell_message"])
+    trial_writer.close()
+    flip_recorder.save_drift_report(report_file=beh_data_folder / f"{trial_writer.filename_prefix}_drift-report.json")
+    journal.record(event="session_end")
+    journal.close()
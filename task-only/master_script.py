@@ -5,7 +5,8 @@ experiment_info = {"name": "mANT",
                    "subject": "",
                    "session": "beh",
                    "date": data.getDateStr(),
-                   "psychopy_version": "2022.2.5"}
+                   "psychopy_version": "2022.2.5",
+                   "resume": False}
 
 dialogue = gui.DlgFromDict(dictionary=experiment_info,
                            title="Enter subject ID (e.g., 01)",
@@ -20,51 +21,111 @@ if experiment_info["subject"] != "": # start experiment only if subject ID has b
      
     text_folder, beh_data_folder = utils.make_directories(experiment_info=experiment_info)  
     
-    training_conditions = data.importConditions(config.training_conditions_file)
+    journal_file = beh_data_folder / f"sub-{experiment_info['subject']}_task-{experiment_info['name']}_journal.jsonl"
+    session = utils.read_session_journal(journal_file=journal_file) if experiment_info["resume"] else None
+    journal = utils.SessionJournal(journal_file=journal_file)
+    trial_writer = utils.TrialWriter(experiment_info=experiment_info,
+                                     flush_policy=config.trial_writer_settings["flush_policy"],
+                                     per_trial_files=config.trial_writer_settings["per_trial_files"],
+                                     journal=journal)
+    session_buffer = utils.SessionBuffer(number_of_trials=config.NUMBER_OF_BLOCKS*config.TRIALS_PER_BLOCK)
+    flip_recorder = utils.FlipRecorder(window=config.window,
+                                       size=config.flip_buffer_size,
+                                       timing_policy=config.timing_policy)
+    training_conditions = utils.build_stimulus_sets(conditions=utils.load_conditions(conditions_file=config.training_conditions_file))
     response_clock = core.Clock() 
 
-    utils.display_text(file_to_read=text_folder / "welcome-message.txt", 
-                       window=config.window,
-                       display_duration=config.frames_per_item["instructions"])
+    if session is None:
+        journal.record(event="session_start",
+                       experiment_info=experiment_info,
+                       jitters=utils.get_jitters())
+    else:                                                                                           # resume: same jitters, same trial orders and random draws
+        utils.restore_jitters(jitters=session["jitters"])
+        if session["rng_state"] is not None:                                                        # as after the last trial on disk (or the last block start)
+            utils.set_rng_state(rng_state=session["rng_state"])
+        journal.record(event="resume",
+                       experiment_info=experiment_info)
 
-    demos_to_display = [config.fixation,
-                        config.asterisk_components,
-                        config.arrows] 
-    demos_frames = [config.frames_per_item["fixation_demo"], 
-                    config.frames_per_item["cue_demo"], 
-                    config.frames_per_item["arrows_demo"]]
-    utils.display_demos(trials_pool=training_conditions ,
-                        window=config.window,
-                        demos=demos_to_display,
-                        demos_frames = demos_frames)
-    del demos_to_display, demos_frames
-
-    _ = utils.display_text(file_to_read=text_folder / "post-demo-message.txt", 
+    if session is None or not session["training_done"]:
+        utils.display_text(file_to_read=text_folder / "welcome-message.txt", 
                            window=config.window,
                            display_duration=config.frames_per_item["instructions"])
+
+        demos_frames = [config.frames_per_item["fixation_demo"], 
+                        config.frames_per_item["cue_demo"], 
+                        config.frames_per_item["arrows_demo"]]
+        utils.display_demos(trials_pool=training_conditions ,
+                            window=config.window,
+                            fixation=config.fixation,
+                            demos_frames = demos_frames)
+        del demos_frames
+
+        _ = utils.display_text(file_to_read=text_folder / "post-demo-message.txt", 
+                               window=config.window,
+                               display_duration=config.frames_per_item["instructions"])
     
-    training_trials = data.TrialHandler(trialList=training_conditions , 
-                                        nReps=1)
-    utils.run_trials_save_data(trials=training_trials,
-                               elapsed_trials=0,
-                               response_clock=response_clock,
-                               beh_data_folder=beh_data_folder,
-                               experiment_info=experiment_info)
+        trial_writer.set_aside_block(block="training",                                         # left by a session interrupted during training
+                                     data_types=["beh","timing"],
+                                     destination_folders=[beh_data_folder, beh_data_folder])
+        training_buffer = utils.SessionBuffer(number_of_trials=len(training_conditions))
+        training_trials = data.TrialHandler(trialList=training_conditions , 
+                                            nReps=1)
+        utils.run_trials_save_data(trials=training_trials,
+                                   elapsed_trials=0,
+                                   response_clock=response_clock,
+                                   beh_data_folder=beh_data_folder,
+                                   trial_writer=trial_writer,
+                                   session_buffer=training_buffer,
+                                   flip_recorder=flip_recorder,
+                                   block="training")
+        trial_writer.end_block()
+        journal.record(event="training_end")
     
-    _ = utils.display_text(file_to_read=text_folder / "post-training-message.txt", 
-                           window=config.window,
-                           display_duration=config.frames_per_item["instructions"])
+        _ = utils.display_text(file_to_read=text_folder / "post-training-message.txt", 
+                               window=config.window,
+                               display_duration=config.frames_per_item["instructions"])
+    else:
+        _ = utils.display_text(file_to_read=text_folder / "resume-message.txt",
+                               window=config.window,
+                               display_duration=config.frames_per_item["instructions"])
     
-    conditions = data.importConditions(config.conditions_file)
+    conditions = utils.build_stimulus_sets(conditions=utils.load_conditions(conditions_file=config.conditions_file))
     for block_number in range(config.NUMBER_OF_BLOCKS):
-        experimental_trials = data.TrialHandler(trialList=conditions, 
-                                                nReps=int(config.TRIALS_PER_BLOCK / len(conditions)))
-        elapsed_trials = config.TRIALS_PER_BLOCK*(block_number)                                        
+        block = block_number+1
+        if session is not None and block in session["blocks"]:                                      # started before the interruption: skip its completed trials
+            trial_order = session["blocks"][block]["trial_order"]
+            first_trial = session["blocks"][block]["completed_trials"]
+            if first_trial == len(trial_order):
+                continue
+            session_buffer.restore(records=session["blocks"][block]["records"])
+            trial_writer.rewrite_block(session_buffer=session_buffer,                               # drop rows that the journal does not know about
+                                       block=block,
+                                       data_types=["beh","timing"],
+                                       destination_folders=[beh_data_folder, beh_data_folder])
+        else:
+            first_trial = 0
+            trial_writer.set_aside_block(block=block,
+                                         data_types=["beh","timing"],
+                                         destination_folders=[beh_data_folder, beh_data_folder])
+            trial_order = utils.draw_trial_order(conditions=conditions,
+                                                 number_of_trials=config.TRIALS_PER_BLOCK)
+            journal.record(event="block_start",
+                           block=block,
+                           trial_order=trial_order,
+                           rng_state=utils.get_rng_state())
+        experimental_trials = utils.make_trial_handler(conditions=conditions,
+                                                       trial_order=trial_order[first_trial:])
+        elapsed_trials = config.TRIALS_PER_BLOCK*(block_number)
         utils.run_trials_save_data(trials=experimental_trials,
                                    elapsed_trials=elapsed_trials,
                                    response_clock=response_clock,
                                    beh_data_folder=beh_data_folder,
-                                   experiment_info=experiment_info)
+                                   trial_writer=trial_writer,
+                                   session_buffer=session_buffer,
+                                   flip_recorder=flip_recorder,
+                                   block=block,
+                                   first_trial=first_trial)
+        trial_writer.end_block()                                                                       # also reached when the block was ended with escape
         
         decision_after_block = utils.display_text(file_to_read=text_folder / "end-of-block-message.txt",
                                                   window=config.window,
@@ -74,4 +135,8 @@ if experiment_info["subject"] != "": # start experiment only if subject ID has b
 
     _ = utils.display_text(file_to_read=text_folder / "farewell-message.txt", 
                            window=config.window,
-                           display_duration=config.frames_per_item["instructions"])
\ No newline at end of file
+                           display_duration=config.frames_per_item["instructions"])
+    trial_writer.close()
+    flip_recorder.save_drift_report(report_file=beh_data_folder / f"{trial_writer.filename_prefix}_drift-report.json")
+    journal.record(event="session_end")
+    journal.close()